@@ -28,6 +28,17 @@ class BaseCapability:
   def disable_capability(self, docker_node):
     pass
 
+  def abort_capability(self, docker_node):
+    # the node got no container, undo what get_docker_run_args took.
+    pass
+
+  def readiness_probes(self, docker_node):
+    return []
+
   @property
   def description(self):
     return {}
+
+  @property
+  def host_resources(self):
+    return {}
@@ -13,30 +13,35 @@
 # limitations under the License.
 
 from cirque.capabilities.basecapability import BaseCapability
-from cirque.common.utils import manipulate_iptable_src_dst_rule
+from cirque.connectivity.netfilter import Netfilter, owner_of
 
 
 class LanAccessCapability(BaseCapability):
 
   def __init__(self, home_lan):
     self.__home_lan = home_lan
+    self.__owner = None
+    self.__rules = []
 
   @property
   def name(self):
     return 'LanAccess'
 
+  @property
+  def host_resources(self):
+    if not self.__rules:
+      return {}
+    return {Netfilter.backend.name: self.__rules, 'owner': self.__owner}
+
   def enable_capability(self, docker_node):
     node_address = docker_node.description['ipv4_addr']
     subnet = self.__home_lan.subnet
-    manipulate_iptable_src_dst_rule(self.__home_lan.logger, node_address,
-                                    subnet, 'ACCEPT')
-    manipulate_iptable_src_dst_rule(self.__home_lan.logger, subnet,
-                                    node_address, 'ACCEPT')
+    self.__owner = owner_of(self.__home_lan.owner, docker_node.id)
+    self.__rules = Netfilter.access_rules(node_address, subnet)
+    Netfilter.add_rules(self.__owner, self.__rules)
 
   def disable_capability(self, docker_node):
-    node_address = docker_node.description['ipv4_addr']
-    subnet = self.__home_lan.subnet
-    manipulate_iptable_src_dst_rule(
-        self.__home_lan.logger, node_address, subnet, 'ACCEPT', add=False)
-    manipulate_iptable_src_dst_rule(
-        self.__home_lan.logger, subnet, node_address, 'ACCEPT', add=False)
+    if self.__owner is not None:
+      Netfilter.remove_rules(self.__owner)
+    self.__owner = None
+    self.__rules = []
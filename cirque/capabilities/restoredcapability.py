@@ -0,0 +1,78 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import signal
+
+from cirque.capabilities.basecapability import BaseCapability
+from cirque.common.cirquelog import CirqueLog
+from cirque.connectivity.bluetoothhost import BluetoothHost
+from cirque.connectivity.hwsim import Radios
+from cirque.connectivity.netfilter import BACKENDS, Netfilter
+from cirque.connectivity.netlinkhandles import RUNTIME_NAMESPACE
+from cirque.connectivity.threadallocator import ThreadAllocator, recorded_lease
+
+
+# Stands in for the capability of a device reattached after a service restart:
+# it reports the recorded description and releases the host-side resources
+# the original capability held once the device is stopped.
+class RestoredCapability(BaseCapability):
+
+  def __init__(self, name, description, resources):
+    self.__name = name
+    self.__description = description
+    self.resources = resources
+    self.logger = CirqueLog.get_cirque_logger(self.__class__.__name__)
+    if resources.get(Netfilter.backend.name):
+      Netfilter.adopt(resources['owner'], resources[Netfilter.backend.name])
+    elif any(resources.get(backend) for backend in BACKENDS):
+      self.logger.warning(
+          'rules of {} were added by another netfilter backend and are not '
+          'released'.format(resources['owner']))
+    if resources.get('ble_adapt'):
+      BluetoothHost.adopt(resources['ble_bus'], resources['ble_adapt'],
+                          resources.get('btvirt_pid'),
+                          resources.get('bluetoothd_pid'))
+
+  @property
+  def name(self):
+    return self.__name
+
+  @property
+  def description(self):
+    return self.__description
+
+  @property
+  def host_resources(self):
+    return self.resources
+
+  def disable_capability(self, docker_node):
+    for pid in self.resources.get('pids', []):
+      try:
+        os.kill(pid, signal.SIGTERM)
+      except ProcessLookupError:
+        pass
+    if self.resources.get(Netfilter.backend.name):
+      Netfilter.remove_rules(self.resources['owner'])
+    netns = self.resources.get('netns')
+    if netns and os.path.lexists(os.path.join(RUNTIME_NAMESPACE, netns)):
+      # a link to the namespace of the container, nothing is mounted there.
+      os.unlink(os.path.join(RUNTIME_NAMESPACE, netns))
+    if 'petition_id' in self.resources:
+      ThreadAllocator.release(recorded_lease(self.resources))
+    if self.resources.get('ble_adapt'):
+      BluetoothHost.release(self.resources['ble_adapt'])
+    if self.resources.get('phy'):
+      # the radio is back in the host once the container is gone.
+      Radios.release(self.resources['phy'])
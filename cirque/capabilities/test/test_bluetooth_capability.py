@@ -0,0 +1,66 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from unittest import mock
+
+from cirque.capabilities.bluetoothcapability import BlueToothCapability
+from cirque.nodes.dockernode import DockerNode
+
+
+class TestBlueToothCapability(unittest.TestCase):
+
+  def setUp(self):
+    patcher = mock.patch(
+        'cirque.capabilities.bluetoothcapability.BluetoothHost')
+    self.host = patcher.start()
+    self.addCleanup(patcher.stop)
+    self.host.acquire.return_value = 'hci0'
+    patcher = mock.patch('cirque.nodes.dockernode.ContainerPool')
+    patcher.start().claim.return_value = None
+    self.addCleanup(patcher.stop)
+    self.client = mock.MagicMock()
+    self.capability = BlueToothCapability('home0')
+    self.node = DockerNode(
+        self.client, 'generic_node_image', capabilities=[self.capability])
+
+  def test_adapter_is_taken_with_the_container(self):
+    self.host.acquire.assert_not_called()
+    self.node.run()
+    self.host.acquire.assert_called_once_with('home0', 2)
+    env = self.client.containers.run.call_args[1]['environment']
+    self.assertEqual(env['BLE_ADAPT'], 'hci0')
+    self.host.daemon_pids.return_value = (43, 42)
+    self.assertEqual(
+        self.capability.host_resources, {
+            'ble_adapt': 'hci0',
+            'ble_bus': 'home0',
+            'btvirt_pid': 43,
+            'bluetoothd_pid': 42,
+        })
+    self.node.stop()
+    self.host.release.assert_called_once_with('hci0')
+
+  def test_failed_run_releases_adapter(self):
+    self.client.containers.run.side_effect = RuntimeError('no image')
+    with self.assertRaises(RuntimeError):
+      self.node.run()
+    self.node.stop()
+    self.host.release.assert_called_once_with('hci0')
+    self.assertIsNone(self.capability.ble_adapt)
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestBlueToothCapability)
+  unittest.TextTestRunner(verbosity=2).run(suite)
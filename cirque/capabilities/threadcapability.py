@@ -13,6 +13,8 @@
 # limitations under the License.
 
 from cirque.capabilities.basecapability import BaseCapability
+from cirque.common.readiness import ProcessProbe, ThreadStateProbe
+from cirque.connectivity.threadallocator import ThreadAllocator
 from cirque.connectivity.threadsimpipe import ThreadSimPipe
 from cirque.common.cirquelog import CirqueLog
 
@@ -20,12 +22,18 @@ from cirque.common.cirquelog import CirqueLog
 class ThreadCapability(BaseCapability):
 
   def __init__(self,
-               node_id,
-               petition_id,
+               lease,
                daemons=['wpantund', 'otbr-agent'],
-               rcp=False):
-    self.thread_endpoint = ThreadSimPipe(node_id, petition_id, rcp)
-    self.thread_endpoint.open()
+               rcp=False,
+               virtual_time=False):
+    self.lease = lease
+    self.thread_endpoint = ThreadSimPipe(lease, rcp, virtual_time)
+    try:
+      self.thread_endpoint.open()
+    except Exception:
+      self.thread_endpoint.close()
+      ThreadAllocator.release(lease)
+      raise
     self.logger = CirqueLog.get_cirque_logger(self.__class__.__name__)
     self.daemons = daemons
     for daemon in daemons:
@@ -54,8 +62,36 @@ class ThreadCapability(BaseCapability):
         'tty': True,
     }
 
+  def readiness_probes(self, docker_node):
+    # images launch their Thread daemon from the entrypoint, which may not
+    # be the one the device was configured with.
+    probes = [ProcessProbe(*sorted({'wpantund', 'otbr-agent', *self.daemons}))]
+    if 'otbr-agent' in self.daemons:
+      probes.append(ThreadStateProbe())
+    return probes
+
+  @property
+  def host_resources(self):
+    if self.thread_endpoint is None:
+      return {}
+    return {
+        'pids': self.thread_endpoint.pids,
+        'node_id': self.thread_endpoint.node_id,
+        'petition_id': self.thread_endpoint.petition_id,
+        'port_offset': self.thread_endpoint.port_offset,
+        'window': self.thread_endpoint.window,
+    }
+
   def disable_capability(self, docker_node):
     for daemon in self.daemons:
       docker_node.container.exec_run('killall {}'.format(daemon))
-    self.thread_endpoint.close()
-    self.thread_endpoint = None
+    self.__close_endpoint()
+
+  def abort_capability(self, docker_node):
+    self.__close_endpoint()
+
+  def __close_endpoint(self):
+    if self.thread_endpoint is not None:
+      self.thread_endpoint.close()
+      self.thread_endpoint = None
+      ThreadAllocator.release(self.lease)
@@ -13,30 +13,36 @@
 # limitations under the License.
 
 import os
+import re
 import time
 
 from subprocess import PIPE
-from pyroute2 import NetNS
+from pyroute2 import NetlinkError
 
 from cirque.capabilities.basecapability import BaseCapability
 from cirque.common.cirquelog import CirqueLog
+from cirque.common.readiness import ProcessProbe
 from cirque.common.exceptions import (
     ConnectivityError,
     ContainerExecError,
     IpNetnsExecError,
-    LoadKernelError,
     NameSpaceOperatingError,
-    PHYDeviceError,
 )
-import cirque.common.utils as utils
+from cirque.connectivity.hwsim import Radios, interface_of
+from cirque.connectivity.netlinkhandles import NetlinkHandles
+from cirque.connectivity.wifievents import WiFiEvents
+from cirque.connectivity.wpactrl import WPA_SUPPLICANT_CTRL, WpaCtrl
 
 
 class WiFiCapability(BaseCapability):
-  DEFAULT_RADIOS = 16
   RUNTIME_NAMESPACE = "/var/run/netns"
+  CONNECT_TIMEOUT = 30
 
-  def __init__(self):
+  def __init__(self, medium=None):
     self.logger = CirqueLog.get_cirque_logger(self.__class__.__name__)
+    self.medium = medium
+    self.control = None
+    self.__resources = {}
 
   @property
   def name(self):
@@ -48,8 +54,6 @@ class WiFiCapability(BaseCapability):
     }
 
   def enable_capability(self, docker_node):
-    if not WiFiCapability.is_mac80211_hwsim_loaded():
-      WiFiCapability.load_kernel_mac80211_hwsim()
     try:
       self.__get_available_phy_device(docker_node)
       self.__phy_namespace_setup(docker_node)
@@ -57,40 +61,38 @@ class WiFiCapability(BaseCapability):
         self.start_wpa_supplicant_service(docker_node)
     except Exception as e:
       self.logger.exception("{!r}".format(e))
+      if getattr(docker_node, "wlan_phy_device", None):
+        Radios.release(docker_node.wlan_phy_device)
+        docker_node.wlan_phy_device = None
       return -1
+    self.__resources = {
+        "netns": docker_node.name,
+        "phy": docker_node.wlan_phy_device,
+    }
     self.logger.info("Node: {} successfully enabled wifi capability".format(
         docker_node.name))
 
   def disable_capability(self, docker_node):
+    self.unwatch_events(docker_node)
     try:
       docker_node.container.exec_run("killall wpa_supplicant")
       self.__phy_namespace_restore(docker_node)
     except Exception as e:
       self.logger.exception("{!r}".format(e))
+    finally:
+      if getattr(docker_node, "wlan_phy_device", None):
+        Radios.release(docker_node.wlan_phy_device)
     self.logger.info("Node: {} successfully disabled wifi capablility".format(
         docker_node.name))
 
+  def readiness_probes(self, docker_node):
+    if docker_node.type == "wifi_ap":
+      return []
+    return [ProcessProbe("wpa_supplicant")]
+
   def __get_available_phy_device(self, docker_node):
-    ret = utils.host_run(self.logger, "iw dev")
-    if ret.stderr != b"":
-      raise PHYDeviceError("Error:{}".format(ret.stderr))
-
-    if ret.returncode == 1:
-      raise PHYDeviceError("run out of all the phy devices!")
-
-    lines = ret.stdout.decode("utf-8").split("\n")
-    lines = [line.strip() for line in lines]
-    lines = [
-        line for line in lines
-        if line.startswith("phy") or line.startswith("Interface")
-    ]
-    devices = [(l1, l2.split()[-1])
-               for l1, l2 in zip(lines, lines[1:])
-               if l1.startswith("phy")]
-    phy_device, interface = devices.pop()
-    phy_device = "".join(phy_device.split("#"))
-    docker_node.wlan_phy_device = phy_device
-    docker_node.wlan_interface = interface
+    docker_node.wlan_phy_device = Radios.allocate(self.medium)
+    docker_node.wlan_interface = interface_of(docker_node.wlan_phy_device)
     self.logger.info("container {}: phy device {} interface {}".format(
         docker_node.name, docker_node.wlan_phy_device,
         docker_node.wlan_interface))
@@ -110,7 +112,64 @@ class WiFiCapability(BaseCapability):
             -c /etc/wpa_supplicant/wpa_supplicant.conf \
             -f /var/log/wpa_supplicant.log -t -dd"
 
-    return docker_node.container.exec_run(command)
+    ret = docker_node.container.exec_run(command)
+    if ret.exit_code == 0:
+      self.watch_events(docker_node, WPA_SUPPLICANT_CTRL)
+    return ret
+
+  def watch_events(self, docker_node, path):
+    self.unwatch_events(docker_node)
+    pid = docker_node.get_container_pid()
+    try:
+      if path == WPA_SUPPLICANT_CTRL:
+        self.control = WpaCtrl(pid, path, docker_node.name)
+      monitor = WpaCtrl(pid, path, docker_node.name)
+      monitor.attach()
+    except (ConnectivityError, OSError) as e:
+      self.logger.error("no wifi events from {}: {!r}".format(
+          docker_node.name, e))
+      return
+    WiFiEvents.watch(self.medium, docker_node.id, monitor)
+
+  def unwatch_events(self, docker_node):
+    WiFiEvents.unwatch(self.medium, docker_node.id)
+    if self.control is not None:
+      self.control.close()
+      self.control = None
+
+  def connect(self, docker_node, ssid, psk, timeout=CONNECT_TIMEOUT):
+    if self.control is None:
+      raise ConnectivityError("no wpa_supplicant control socket on {}".format(
+          docker_node.name))
+    if any(c in '"\n' for c in ssid + psk):
+      raise ValueError("invalid ssid or psk")
+    events = WiFiEvents.subscribe(self.medium)
+    try:
+      network = self.control.request("ADD_NETWORK")
+      if not network.isdigit():
+        raise ConnectivityError("unable to add a network on {}: {}".format(
+            docker_node.name, network))
+      self.control.expect_ok('SET_NETWORK {} ssid "{}"'.format(network, ssid))
+      self.control.expect_ok('SET_NETWORK {} psk "{}"'.format(network, psk))
+      self.control.expect_ok("SELECT_NETWORK {}".format(network))
+      connected = WiFiEvents.wait(events, docker_node.id,
+                                  "CTRL-EVENT-CONNECTED", timeout)
+    finally:
+      WiFiEvents.unsubscribe(self.medium, events)
+    if connected is None:
+      raise ConnectivityError("{} did not associate with {}".format(
+          docker_node.name, ssid))
+    ipv4_addr = self.__request_lease(docker_node, timeout)
+    WiFiEvents.publish(self.medium, docker_node.id, "DHCP-LEASED", ipv4_addr)
+    return {"ssid": ssid, "ipv4_addr": ipv4_addr}
+
+  def __request_lease(self, docker_node, timeout):
+    ret = docker_node.container.exec_run("dhcpcd -t {} wlan0".format(timeout))
+    leased = re.search(rb"wlan0: leased (\d+\.\d+\.\d+\.\d+)", ret.output)
+    if leased is None:
+      raise ConnectivityError("{} got no dhcp lease: {}".format(
+          docker_node.name, ret.output.decode(errors="replace")))
+    return leased.group(1).decode()
 
   def __mount_container_namespace_to_host(self, docker_node):
     if not os.path.isdir(self.RUNTIME_NAMESPACE):
@@ -129,83 +188,66 @@ class WiFiCapability(BaseCapability):
               docker_node.name))
 
   def __add_phy_device_to_container_namespace(self, docker_node):
-    ret = utils.host_run(
-        docker_node.logger,
-        "iw phy {} set netns name {}".format(docker_node.wlan_phy_device,
-                                             docker_node.name))
-    if ret.returncode != 0:
+    try:
+      moved = NetlinkHandles.move_phy(docker_node.wlan_phy_device,
+                                      docker_node.name)
+    except (NetlinkError, OSError) as e:
       raise NameSpaceOperatingError(
-          "failed adding {} to container namespace: {}".format(
-              docker_node.wlan_phy_device, docker_node.name))
+          "failed adding {} to container namespace {}: {!r}".format(
+              docker_node.wlan_phy_device, docker_node.name, e))
+    if not moved:
+      raise NameSpaceOperatingError("phy device {} is gone".format(
+          docker_node.wlan_phy_device))
 
   def __bring_up_wifi_interface(self, docker_node):
-    commands = [
-        "ip link set {} down".format(docker_node.wlan_interface),
-        "ip link set {} name wlan0".format(docker_node.wlan_interface),
-        "ip link set wlan0 up",
-    ]
-    for command in commands:
-      ret = utils.netns_run(docker_node.logger, command, docker_node.name)
-      if ret.returncode != 0:
-        raise IpNetnsExecError("Error: {} on command: {}".format(
-            ret.stderr, command))
+    try:
+      with NetlinkHandles.ipr(docker_node.name) as ipr:
+        index = ipr.link_lookup(ifname=docker_node.wlan_interface)[0]
+        ipr.link("set", index=index, state="down")
+        ipr.link("set", index=index, ifname="wlan0")
+        ipr.link("set", index=index, state="up")
+    except (IndexError, NetlinkError) as e:
+      raise IpNetnsExecError("Error: {!r} bringing up {} as wlan0".format(
+          e, docker_node.wlan_interface))
 
   def __phy_namespace_restore(self, docker_node):
     self.logger.debug("running phy device namespace restore...")
     if os.path.isfile(os.path.join(self.RUNTIME_NAMESPACE, docker_node.name)):
-      if hasattr(docker_node, "phy_device") and docker_node.phy_device:
-        namespace = NetNS(docker_node.name)
-        # return a list
-        ifidx = namespace.link_lookup(ifname="wlan0")
+      if getattr(docker_node, "wlan_phy_device", None):
+        try:
+          self.__move_phy_device_out(docker_node)
+        finally:
+          NetlinkHandles.close(docker_node.name)
+    # del created namespace
+    self.logger.debug("removing explored namespace: {}".format(
+        docker_node.name))
+    try:
+      os.unlink(os.path.join(self.RUNTIME_NAMESPACE, docker_node.name))
+    except FileNotFoundError:
+      pass
+
+  def __move_phy_device_out(self, docker_node):
+    phy_device = docker_node.wlan_phy_device
+    try:
+      with NetlinkHandles.ipr(docker_node.name) as ipr:
         # find wlan0 in netns
-        if len(ifidx) != 0:
-          phy_device = docker_node.phy_device
-          commands = [
-              "ip addr flush dev wlan0",
-              "ip link set wlan0 down",
-              "ip link set wlan0 name {}".format(docker_node.wlan_interface),
-          ]
-          for command in commands:
-            ret = utils.netns_run(docker_node.logger, command, docker_node.name)
-            if ret.returncode != 0:
-              raise IpNetnsExecError("Error: {} on command: {}".format(
-                  ret.stderr, command))
-
-          self.logger.debug("moving out {} device from namespace:{}".format(
-              phy_device, docker_node.name))
-          ret = utils.netns_run(docker_node.logger,
-                                "iw phy {} set netns 1".format(phy_device),
-                                docker_node.name)
-          if ret.returncode != 0:
-            raise IpNetnsExecError(
-                "Error: {} on removing {} out of namespace".format(
-                    ret.stderr, phy_device))
-      # del created namespace
-      self.logger.debug("removing explored namespace: {}".format(
-          docker_node.name))
-      ret = utils.host_run(docker_node.logger,
-                           "ip netns del {}".format(docker_node.name))
-      if ret.returncode != 0:
-        raise NameSpaceOperatingError("Error: {} on delete netns: {}".format(
-            ret.stderr, docker_node.name))
-
-  @staticmethod
-  def is_mac80211_hwsim_loaded():
-    ret = utils.host_run(CirqueLog.get_cirque_logger(),
-                         "lsmod | grep mac80211_hwsim")
-    return ret.returncode == 0
-
-  @staticmethod
-  def load_kernel_mac80211_hwsim(radios=DEFAULT_RADIOS):
-    logger = CirqueLog.get_cirque_logger()
-    logger.info("kernel module mac80211_hwsim is not loaded, loading now...")
-    ret = utils.host_run(
-        logger, "modprobe mac80211_hwsim \
-                                 radios={}".format(radios))
-    if ret.returncode != 0:
-      raise LoadKernelError("unable to load module mac80211_hwsim!!")
-    utils.sleep_time(logger, 5, "loading mac80211_hwsim module")
+        ifidx = ipr.link_lookup(ifname="wlan0")
+        if len(ifidx) == 0:
+          return
+        ipr.flush_addr(index=ifidx[0])
+        ipr.link("set", index=ifidx[0], state="down")
+        ipr.link("set", index=ifidx[0], ifname=docker_node.wlan_interface)
+      self.logger.debug("moving out {} device from namespace:{}".format(
+          phy_device, docker_node.name))
+      NetlinkHandles.move_phy(phy_device, None, source=docker_node.name)
+    except (NetlinkError, OSError) as e:
+      raise IpNetnsExecError("Error: {!r} on removing {} out of {}".format(
+          e, phy_device, docker_node.name))
 
   @property
   def description(self):
     return {}
+
+  @property
+  def host_resources(self):
+    return self.__resources
@@ -37,7 +37,7 @@ class XvncCapability(BaseCapability):
     if self.localhost:
       xvnc_args.append('-localhost')
     xvnc_args.append(':{}'.format(self.__display_id))
-    self.xvnc_proces = subprocess.Popen(xvnc_args)
+    self.__xvnc_process = subprocess.Popen(xvnc_args)
 
   def __get_next_display_id(self):
     if not os.path.exists(self.X_SOCKET_PATH) or \
@@ -67,10 +67,19 @@ class XvncCapability(BaseCapability):
         ]
     }
 
+  @property
+  def host_resources(self):
+    if self.__xvnc_process is None:
+      return {}
+    return {'pids': [self.__xvnc_process.pid]}
+
   def enable_capability(self, docker_node):
     pass
 
   def disable_capability(self, docker_node):
+    self.abort_capability(docker_node)
+
+  def abort_capability(self, docker_node):
     if self.__xvnc_process:
       self.__xvnc_process.kill()
       self.__xvnc_process = None
@@ -39,3 +39,25 @@ class NameSpaceOperatingError(BaseException):
 
 class PHYDeviceError(BaseException):
   pass
+
+
+class HomeBringupError(BaseException):
+
+  def __init__(self, message, results=None):
+    super().__init__(message)
+    self.results = {} if results is None else results
+
+
+class NoDockerEndpointError(BaseException):
+  pass
+
+
+class AdmissionError(BaseException):
+
+  def __init__(self, message, position=None):
+    super().__init__(message)
+    self.position = position
+
+
+class BluetoothError(BaseException):
+  pass
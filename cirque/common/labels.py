@@ -0,0 +1,44 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import uuid
+
+SERVICE_LABEL = 'cirque.service_id'
+HOME_LABEL = 'cirque.home_id'
+# what every service labelled its objects with before ids were per instance.
+LEGACY_SERVICE_ID = 'default'
+
+# no two service instances may share an id, the sweep of one would remove
+# the homes of the other; a service with a registry keeps the id it stored.
+SERVICE_ID = os.environ.get('CIRQUE_SERVICE_ID') or uuid.uuid4().hex
+
+
+def use_service_id(service_id):
+  global SERVICE_ID
+  SERVICE_ID = service_id
+
+
+def service_labels():
+  return {SERVICE_LABEL: SERVICE_ID}
+
+
+def home_labels(home_id):
+  return {SERVICE_LABEL: SERVICE_ID, HOME_LABEL: home_id}
+
+
+def label_filters(labels):
+  return {
+      'label': ['{}={}'.format(key, value) for key, value in labels.items()]
+  }
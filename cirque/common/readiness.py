@@ -0,0 +1,133 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+
+import docker
+
+from cirque.common.utils import wait_until
+
+THREAD_ROLES = ('disabled', 'detached', 'child', 'router', 'leader')
+
+
+class Probe:
+
+  @property
+  def name(self):
+    return ''
+
+  def check(self, docker_node):
+    return True
+
+
+class ProcessProbe(Probe):
+
+  def __init__(self, *processes):
+    self.processes = processes
+
+  @property
+  def name(self):
+    return 'process:{}'.format('|'.join(self.processes))
+
+  def check(self, docker_node):
+    processes = docker_node.container.top()['Processes']
+    return any(p[-1].find(name) != -1
+               for p in processes
+               for name in self.processes)
+
+
+class CommandProbe(Probe):
+
+  def __init__(self, command, pattern=None):
+    self.command = command
+    self.pattern = pattern
+
+  @property
+  def name(self):
+    return 'command:{}'.format(self.command)
+
+  def check(self, docker_node):
+    ret = docker_node.container.exec_run(self.command)
+    if ret.exit_code != 0:
+      return False
+    return self.pattern is None or \
+        re.search(self.pattern, ret.output.decode()) is not None
+
+
+class SocketProbe(Probe):
+
+  TCP_LISTEN = '0A'
+
+  def __init__(self, port, protocol='tcp'):
+    self.port = port
+    self.protocol = protocol
+
+  @property
+  def name(self):
+    return 'socket:{}/{}'.format(self.port, self.protocol)
+
+  def check(self, docker_node):
+    ret = docker_node.container.exec_run(
+        'cat /proc/net/{0} /proc/net/{0}6'.format(self.protocol))
+    port = ':{:04X}'.format(self.port)
+    for line in ret.output.decode().splitlines()[1:]:
+      fields = line.split()
+      if len(fields) < 4 or not fields[1].endswith(port):
+        continue
+      if self.protocol != 'tcp' or fields[3] == self.TCP_LISTEN:
+        return True
+    return False
+
+
+class HostapdProbe(CommandProbe):
+
+  def __init__(self, interface='wlan0'):
+    super().__init__('hostapd_cli -i {} ping'.format(interface), 'PONG')
+
+
+class ThreadStateProbe(CommandProbe):
+
+  def __init__(self, roles=THREAD_ROLES):
+    unknown = set(roles) - set(THREAD_ROLES)
+    if unknown:
+      raise ValueError('unknown thread roles: {}'.format(sorted(unknown)))
+    self.roles = roles
+    super().__init__('ot-ctl state',
+                     r'(?m)^(?:{})\s*$'.format('|'.join(roles)))
+
+  @property
+  def name(self):
+    if tuple(self.roles) == THREAD_ROLES:
+      return super().name
+    return 'thread:{}'.format('|'.join(self.roles))
+
+
+def probe_passes(docker_node, probe):
+  try:
+    return probe.check(docker_node)
+  except docker.errors.DockerException as e:
+    docker_node.logger.debug('probe {} failed: {!r}'.format(probe.name, e))
+    return False
+
+
+def wait_ready(docker_node, probes, timeout):
+  pending = list(probes)
+
+  def ready():
+    pending[:] = [p for p in pending if not probe_passes(docker_node, p)]
+    return not pending
+
+  wait_until(docker_node.logger, ready, timeout,
+             'readiness of {}'.format(docker_node.name))
+  return [probe.name for probe in pending]
@@ -0,0 +1,82 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from unittest import mock
+
+from cirque.common.readiness import (CommandProbe, ProcessProbe, SocketProbe,
+                                     ThreadStateProbe, wait_ready)
+
+PROC_NET_TCP = b'''\
+  sl  local_address rem_address   st tx_queue rx_queue
+   0: 00000000:1F90 00000000:0000 0A 00000000:00000000
+   1: 0100007F:0035 0100007F:9C40 01 00000000:00000000
+'''
+
+
+class TestReadiness(unittest.TestCase):
+
+  def setUp(self):
+    self.node = mock.MagicMock()
+    self.node.name = 'node'
+
+  def test_process_probe(self):
+    self.node.container.top.return_value = {
+        'Processes': [['root', '1', '/usr/sbin/otbr-agent -I wpan0']]
+    }
+    self.assertTrue(ProcessProbe('wpantund', 'otbr-agent').check(self.node))
+    self.assertFalse(ProcessProbe('wpa_supplicant').check(self.node))
+
+  def test_socket_probe(self):
+    self.node.container.exec_run.return_value = mock.Mock(
+        exit_code=0, output=PROC_NET_TCP)
+    self.assertTrue(SocketProbe(8080).check(self.node))
+    # port 53 is only an established connection, not a listener
+    self.assertFalse(SocketProbe(53).check(self.node))
+
+  def test_thread_state_probe_roles(self):
+    self.node.container.exec_run.return_value = mock.Mock(
+        exit_code=0, output=b'detached\r\nDone\r\n')
+    self.assertTrue(ThreadStateProbe().check(self.node))
+    attached = ThreadStateProbe(['leader', 'router', 'child'])
+    self.assertFalse(attached.check(self.node))
+    self.assertEqual(attached.name, 'thread:leader|router|child')
+    self.node.container.exec_run.return_value = mock.Mock(
+        exit_code=0, output=b'router\r\nDone\r\n')
+    self.assertTrue(attached.check(self.node))
+    with self.assertRaises(ValueError):
+      ThreadStateProbe(['coordinator'])
+
+  def test_wait_ready_retries_until_ready(self):
+    self.node.container.exec_run.side_effect = [
+        mock.Mock(exit_code=1, output=b''),
+        mock.Mock(exit_code=0, output=b'detached\nDone\n'),
+    ]
+    probe = CommandProbe('ot-ctl state', 'detached')
+    self.assertEqual(wait_ready(self.node, [probe], 5), [])
+    self.assertEqual(self.node.container.exec_run.call_count, 2)
+
+  @mock.patch('time.sleep')
+  def test_wait_ready_reports_pending_probes(self, sleep):
+    self.node.container.exec_run.return_value = mock.Mock(
+        exit_code=1, output=b'')
+    probe = CommandProbe('hostapd_cli -i wlan0 ping', 'PONG')
+    with mock.patch('time.monotonic', side_effect=[0, 1, 2, 100]):
+      pending = wait_ready(self.node, [probe], 10)
+    self.assertEqual(pending, ['command:hostapd_cli -i wlan0 ping'])
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestReadiness)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,86 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from unittest import mock
+
+from cirque.capabilities.interactivecapability import InteractiveCapability
+from cirque.common.timing import BUCKETS, Histograms, PhaseTimer
+from cirque.nodes.dockernode import DockerNode
+
+
+class TestTiming(unittest.TestCase):
+
+  def setUp(self):
+    Histograms.reset()
+
+  @mock.patch('cirque.common.timing.time')
+  def test_phases_are_recorded_in_order(self, clock):
+    clock.monotonic.side_effect = [0, 1.5, 2, 2.25]
+    timer = PhaseTimer()
+    with timer.phase('ThreadCapability.enable'):
+      pass
+    with timer.phase('DockerNode.container_run'):
+      pass
+    self.assertEqual(timer.as_list(), [
+        {
+            'phase': 'ThreadCapability.enable',
+            'seconds': 1.5
+        },
+        {
+            'phase': 'DockerNode.container_run',
+            'seconds': 0.25
+        },
+    ])
+
+  def test_failed_phase_is_recorded(self):
+    timer = PhaseTimer()
+    with self.assertRaises(RuntimeError):
+      with timer.phase('WiFiCapability.enable'):
+        raise RuntimeError()
+    self.assertEqual([t['phase'] for t in timer.as_list()],
+                     ['WiFiCapability.enable'])
+
+  def test_histograms_aggregate_across_devices(self):
+    for seconds in (0.001, 0.3, 0.3, 100):
+      PhaseTimer().record('ThreadCapability.enable', seconds)
+    histogram = Histograms.snapshot()['ThreadCapability.enable']
+    self.assertEqual(histogram['count'], 4)
+    self.assertAlmostEqual(histogram['sum'], 100.601)
+    self.assertEqual(len(histogram['buckets']), len(BUCKETS) + 1)
+    self.assertEqual(histogram['buckets'][0], 1)
+    self.assertEqual(histogram['buckets'][BUCKETS.index(0.5)], 2)
+    self.assertEqual(histogram['buckets'][-1], 1)
+
+  def test_docker_node_run_is_instrumented(self):
+    client = mock.MagicMock()
+    client.containers.run.return_value = mock.Mock(id='c0')
+    node = DockerNode(client, 'generic_node_image', [InteractiveCapability()])
+    node.run()
+    node.stop()
+    self.assertEqual([t['phase'] for t in node.timings.as_list()], [
+        'InteractiveCapability.run_args',
+        'DockerNode.merge_run_args',
+        'DockerNode.container_run',
+        'DockerNode.refresh_state',
+        'InteractiveCapability.enable',
+        'InteractiveCapability.disable',
+        'DockerNode.container_stop',
+    ])
+    self.assertIn('DockerNode.container_run', Histograms.snapshot())
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestTiming)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,82 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import unittest
+from concurrent import futures
+from unittest import mock
+
+from cirque.common.tracing import TracedContainer, Tracer, bind, span
+from cirque.common.utils import host_run
+
+
+class TestTracing(unittest.TestCase):
+
+  def setUp(self):
+    self.logger = logging.getLogger('test_tracing')
+    self.addCleanup(Tracer.discard, 'home0')
+
+  def __events(self):
+    trace = json.loads(json.dumps(Tracer.chrome_trace('home0')))
+    return {event['name']: event for event in trace['traceEvents']}
+
+  def test_host_run_is_traced_under_its_operation(self):
+    with span('create_home', 'home', home='home0'):
+      with span('ThreadCapability.enable', 'phase'):
+        host_run(self.logger, 'true')
+    events = self.__events()
+    self.assertEqual(events['host_run']['args']['command'], 'true')
+    self.assertEqual(events['host_run']['args']['exit_code'], 0)
+    self.assertEqual(events['host_run']['args']['parent'],
+                     'ThreadCapability.enable')
+    self.assertEqual(events['ThreadCapability.enable']['args']['parent'],
+                     'create_home')
+    self.assertEqual(events['host_run']['ph'], 'X')
+    self.assertGreaterEqual(events['host_run']['ts'],
+                            events['create_home']['ts'])
+
+  def test_spans_outside_of_homes_are_dropped(self):
+    host_run(self.logger, 'true')
+    self.assertEqual(Tracer.chrome_trace(None)['traceEvents'], [])
+
+  def test_exec_run_is_traced(self):
+    container = mock.Mock()
+    container.name = 'node0'
+    container.exec_run.return_value = mock.Mock(exit_code=1)
+    traced = TracedContainer(container)
+    with span('add_device', 'device', home='home0'):
+      self.assertEqual(traced.exec_run('pidof hostapd').exit_code, 1)
+    self.assertEqual(traced.name, 'node0')
+    event = self.__events()['exec_run']
+    self.assertEqual(event['args']['container'], 'node0')
+    self.assertEqual(event['args']['command'], 'pidof hostapd')
+    self.assertEqual(event['args']['exit_code'], 1)
+
+  def test_bound_functions_keep_their_parent(self):
+    def stage(name):
+      with span(name, 'device'):
+        pass
+
+    with span('create_home', 'home', home='home0'):
+      with futures.ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(bind(stage), ['device0', 'device1']))
+    events = self.__events()
+    self.assertEqual(events['device0']['args']['parent'], 'create_home')
+    self.assertEqual(events['device1']['args']['parent'], 'create_home')
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestTracing)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,90 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+from cirque.common.tracing import span
+
+# upper bounds in seconds, the last bucket counts everything slower.
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _Histograms:
+
+  def __init__(self):
+    self.__lock = Lock()
+    self.__histograms = {}
+
+  def observe(self, phase, seconds):
+    with self.__lock:
+      histogram = self.__histograms.setdefault(phase, {
+          'count': 0,
+          'sum': 0.0,
+          'buckets': [0] * (len(BUCKETS) + 1),
+      })
+      histogram['count'] += 1
+      histogram['sum'] += seconds
+      histogram['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+
+  def snapshot(self):
+    with self.__lock:
+      return {
+          phase: {
+              'count': histogram['count'],
+              'sum': histogram['sum'],
+              'buckets': list(histogram['buckets']),
+          } for phase, histogram in self.__histograms.items()
+      }
+
+  def reset(self):
+    with self.__lock:
+      self.__histograms = {}
+
+
+Histograms = _Histograms()
+
+
+def phase_name(component, operation):
+  return '{}.{}'.format(type(component).__name__, operation)
+
+
+class PhaseTimer:
+
+  def __init__(self):
+    self.__lock = Lock()
+    self.__phases = []
+
+  @contextmanager
+  def phase(self, name):
+    start = time.monotonic()
+    try:
+      with span(name, 'phase'):
+        yield
+    finally:
+      self.record(name, time.monotonic() - start)
+
+  def record(self, name, seconds):
+    with self.__lock:
+      self.__phases.append((name, seconds))
+    Histograms.observe(name, seconds)
+
+  def as_list(self):
+    with self.__lock:
+      return [{
+          'phase': name,
+          'seconds': seconds
+      } for name, seconds in self.__phases]
@@ -0,0 +1,124 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# spans kept per home, the oldest are dropped first.
+MAX_SPANS = 100000
+
+_current_span = contextvars.ContextVar('cirque_span', default=None)
+
+
+class Span:
+
+  def __init__(self, name, category, home, parent, args):
+    self.name = name
+    self.category = category
+    self.home = home
+    self.parent = parent
+    self.args = args
+    self.thread = threading.get_ident()
+    self.start = time.monotonic()
+    self.end = None
+
+  def to_event(self):
+    args = dict(self.args)
+    if self.parent is not None:
+      args['parent'] = self.parent.name
+    return {
+        'name': self.name,
+        'cat': self.category,
+        'ph': 'X',
+        'ts': int(self.start * 1e6),
+        'dur': int((self.end - self.start) * 1e6),
+        'pid': os.getpid(),
+        'tid': self.thread,
+        'args': args,
+    }
+
+
+class _Tracer:
+
+  def __init__(self):
+    self.__lock = threading.Lock()
+    self.__spans = {}
+
+  def record(self, span):
+    with self.__lock:
+      spans = self.__spans.setdefault(span.home, deque(maxlen=MAX_SPANS))
+      spans.append(span)
+
+  def chrome_trace(self, home_id):
+    with self.__lock:
+      spans = list(self.__spans.get(home_id, []))
+    return {
+        'traceEvents': [span.to_event() for span in spans],
+        'displayTimeUnit': 'ms',
+    }
+
+  def discard(self, home_id):
+    with self.__lock:
+      self.__spans.pop(home_id, None)
+
+
+Tracer = _Tracer()
+
+
+@contextmanager
+def span(name, category='operation', home=None, **args):
+  parent = _current_span.get()
+  if home is None and parent is not None:
+    home = parent.home
+  current = Span(name, category, home, parent, args)
+  token = _current_span.set(current)
+  try:
+    yield current
+  finally:
+    _current_span.reset(token)
+    current.end = time.monotonic()
+    # work done outside of any home, e.g. service start-up, is not kept.
+    if current.home is not None:
+      Tracer.record(current)
+
+
+def bind(fn):
+  # runs fn in a copy of the caller's context, so that spans opened on
+  # executor threads keep their parent operation.
+  context = contextvars.copy_context()
+  return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+class TracedContainer:
+
+  def __init__(self, container):
+    self.__dict__['_container'] = container
+
+  def __getattr__(self, name):
+    return getattr(self._container, name)
+
+  def __setattr__(self, name, value):
+    setattr(self._container, name, value)
+
+  def exec_run(self, cmd, *args, **kwargs):
+    command = ' '.join(cmd) if isinstance(cmd, list) else cmd
+    with span('exec_run', 'exec', command=command,
+              container=self._container.name) as current:
+      ret = self._container.exec_run(cmd, *args, **kwargs)
+      current.args['exit_code'] = ret.exit_code
+      return ret
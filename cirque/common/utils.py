@@ -16,6 +16,8 @@ import time
 import shlex
 import subprocess
 
+from cirque.common.tracing import span
+
 
 class Return:
 
@@ -37,7 +39,8 @@ def host_run(logger,
              namespace=None,
              stdin=None,
              stdout=subprocess.PIPE,
-             stderr=subprocess.PIPE):
+             stderr=subprocess.PIPE,
+             input=None):
   if not isinstance(command, (list, str)):
     logger.error(
         'unable to parse desired commands..Supporting only list or str!')
@@ -49,13 +52,25 @@ def host_run(logger,
   if namespace and 'ip netns exec' not in exec_command:
     exec_command = 'ip netns exec {} '.format(namespace) + exec_command
 
-  process = None
-  for command in exec_command.split('|'):
-    stdin = process.stdout if process else None
-    process = subprocess.Popen(
-        shlex.split(command), stdin=stdin, stdout=stdout, stderr=stderr)
-  stdout, stderr = process.communicate()
-  returncode = process.returncode
+  with span('host_run', 'subprocess', command=exec_command,
+            namespace=namespace) as current:
+    process = None
+    first_process = None
+    for command in exec_command.split('|'):
+      if process:
+        stdin = process.stdout
+      else:
+        stdin = subprocess.PIPE if input is not None else None
+      process = subprocess.Popen(
+          shlex.split(command), stdin=stdin, stdout=stdout, stderr=stderr)
+      first_process = first_process or process
+    if input is not None and first_process is not process:
+      first_process.stdin.write(input)
+      first_process.stdin.close()
+      input = None
+    stdout, stderr = process.communicate(input=input)
+    returncode = process.returncode
+    current.args['exit_code'] = returncode
   logger.debug('CMD RESULT: \n'
                'ReturnCode: {},\nStdout: {},\nStdin: {}'.format(
                    returncode, stdout, stderr))
@@ -72,15 +87,20 @@ def netns_run(logger,
   return host_run(logger, command, namespace, stdin, stdout, stderr)
 
 
-def manipulate_iptable_src_dst_rule(logger, src, dst, action, add=True):
-  chain = 'DOCKER-USER'
-  manipulate_action = '-I' if add else '-D'
-  ret = host_run(logger, 'iptables -L DOCKER-USER')
-  if b'No chain/target/match by that name' in ret.stderr:
-    chain = 'INPUT'
-  cmd = [
-      'iptables', manipulate_action, chain, '-s', src, '-d', dst, '-j', action
-  ]
-  ret = host_run(logger, cmd)
-  if ret.returncode != 0:
-    logger.error('Failed to add iptables rule %s', ' '.join(cmd))
+def wait_until(logger,
+               predicate,
+               timeout,
+               reason=None,
+               interval=0.1,
+               max_interval=2.0):
+  deadline = time.monotonic() + timeout
+  while True:
+    if predicate():
+      return True
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+      logger.warning('timed out after {}s waiting for {}'.format(
+          timeout, reason if reason else predicate))
+      return False
+    time.sleep(min(interval, remaining))
+    interval = min(interval * 2, max_interval)
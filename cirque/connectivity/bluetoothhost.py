@@ -0,0 +1,333 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import re
+import signal
+import subprocess
+import time
+from os.path import abspath, dirname
+from threading import Lock
+
+from cirque.common.cirquelog import CirqueLog
+from cirque.common.exceptions import BluetoothError
+import cirque.common.labels as labels
+import cirque.common.utils as utils
+
+CIRQUE_ROOT = dirname(dirname(dirname(abspath(__file__))))
+BLUEZ_DIR = os.path.join(CIRQUE_ROOT, 'bluez')
+BLUETOOTHD = os.path.join(BLUEZ_DIR, 'src/bluetoothd')
+BTVIRT = os.path.join(BLUEZ_DIR, 'emulator/btvirt')
+HCI_SYSFS = '/sys/class/bluetooth'
+# the daemons a service started, so a restarted service can stop the ones
+# left behind without touching the system bluetoothd or other services.
+PID_DIR = '/var/run/cirque'
+DAEMON_TIMEOUT = 5
+DEFAULT_CONTROLLERS = 2
+
+
+def hci_adapters():
+  try:
+    names = os.listdir(HCI_SYSFS)
+  except FileNotFoundError:
+    return set()
+  # hci0:64 style entries are connections, not controllers.
+  return {name for name in names if re.fullmatch(r'hci\d+', name)}
+
+
+def adapter_index(adapter):
+  return int(adapter[3:])
+
+
+def bluez_owned(logger):
+  try:
+    ret = utils.host_run(logger, [
+        'dbus-send', '--system', '--print-reply',
+        '--dest=org.freedesktop.DBus', '/org/freedesktop/DBus',
+        'org.freedesktop.DBus.NameHasOwner', 'string:org.bluez'
+    ])
+  except OSError:
+    return False
+  return ret.returncode == 0 and b'boolean true' in ret.stdout
+
+
+def pid_file():
+  return os.path.join(PID_DIR, 'bluetooth-{}.pids'.format(labels.SERVICE_ID))
+
+
+def is_daemon(pid):
+  try:
+    with open('/proc/{}/cmdline'.format(pid), 'rb') as cmdline:
+      command = cmdline.read().split(b'\0')[0].decode()
+  except (OSError, UnicodeDecodeError):
+    return False
+  return command in (BLUETOOTHD, BTVIRT)
+
+
+class _AdoptedProcess:
+
+  # a daemon started by an earlier run of the service, which restored homes
+  # still use; it is not a child of this run.
+  def __init__(self, pid):
+    self.pid = pid
+    self.returncode = None
+
+  def poll(self):
+    if self.returncode is None and not is_daemon(self.pid):
+      # the exit status went to the parent of the earlier run.
+      self.returncode = 0
+    return self.returncode
+
+  def send_signal(self, signum):
+    try:
+      os.kill(self.pid, signum)
+    except ProcessLookupError:
+      pass
+
+  def kill(self):
+    self.send_signal(signal.SIGKILL)
+
+  def wait(self, timeout=None):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while self.poll() is None:
+      if deadline is not None and time.monotonic() >= deadline:
+        raise subprocess.TimeoutExpired(str(self.pid), timeout)
+      time.sleep(0.1)
+    return self.returncode
+
+
+# Controllers of one btvirt only hear each other, so every home gets a bus of
+# its own; bluetoothd needs AF_BLUETOOTH, which the kernel only offers in the
+# initial network namespace, and is shared by all buses over D-Bus.
+class _BluetoothHost:
+
+  def __init__(self):
+    self.logger = CirqueLog.get_cirque_logger('bluetoothhost')
+    self.__lock = Lock()
+    self.__bluetoothd = None
+    self.__btvirts = {}
+    self.__free = {}
+    self.__in_use = {}
+    self.__stale_stopped = False
+    self.__shared_bluez = False
+
+  def acquire(self, bus, controllers=DEFAULT_CONTROLLERS):
+    with self.__lock:
+      self.__supervise()
+      free = self.__free.setdefault(bus, [])
+      if not free:
+        self.__add_controllers(bus, max(1, controllers))
+      free.sort(key=adapter_index)
+      adapter = free.pop(0)
+      self.__in_use[adapter] = bus
+    self.logger.info('assigned ble adapter {} on bus {}'.format(adapter, bus))
+    return adapter
+
+  def reserve(self, bus, count):
+    with self.__lock:
+      self.__supervise()
+      missing = count - len(self.__free.get(bus, []))
+      if missing > 0:
+        self.__add_controllers(bus, missing)
+
+  def release(self, adapter):
+    with self.__lock:
+      bus = self.__in_use.pop(adapter, None)
+      if bus is None:
+        return
+      if bus in self.__in_use.values():
+        self.__free[bus].append(adapter)
+        return
+      # the last device of the bus is gone, its btvirts go with it.
+      self.__stop_bus(bus)
+      self.__stop_idle_bluetoothd()
+
+  def close(self, bus):
+    with self.__lock:
+      if bus in self.__in_use.values():
+        return
+      self.__stop_bus(bus)
+      self.__stop_idle_bluetoothd()
+
+  def daemon_pids(self, adapter):
+    with self.__lock:
+      bus = self.__in_use.get(adapter)
+      btvirt = next((process.pid
+                     for process, adapters in self.__btvirts.get(bus, [])
+                     if adapter in adapters), None)
+      bluetoothd = None if self.__bluetoothd is None else \
+          self.__bluetoothd.pid
+    return btvirt, bluetoothd
+
+  def adopt(self, bus, adapter, btvirt, bluetoothd):
+    with self.__lock:
+      if self.__bluetoothd is None and bluetoothd and is_daemon(bluetoothd):
+        self.__bluetoothd = _AdoptedProcess(bluetoothd)
+      if not btvirt or not is_daemon(btvirt) or \
+         adapter not in hci_adapters():
+        self.logger.warning('ble adapter {} of bus {} is gone'.format(
+            adapter, bus))
+        return False
+      btvirts = self.__btvirts.setdefault(bus, [])
+      adapters = next((adapters for process, adapters in btvirts
+                       if process.pid == btvirt), None)
+      if adapters is None:
+        adapters = set()
+        btvirts.append((_AdoptedProcess(btvirt), adapters))
+      adapters.add(adapter)
+      self.__free.setdefault(bus, [])
+      self.__in_use[adapter] = bus
+    self.logger.info('adopted ble adapter {} on bus {}'.format(adapter, bus))
+    return True
+
+  @property
+  def adapters(self):
+    with self.__lock:
+      buses = set(self.__free) | set(self.__in_use.values())
+      return {
+          bus: {
+              'free':
+                  sorted(self.__free.get(bus, []), key=adapter_index),
+              'in_use':
+                  sorted((a for a, b in self.__in_use.items() if b == bus),
+                         key=adapter_index),
+          } for bus in buses
+      }
+
+  def __supervise(self):
+    for bus, btvirts in self.__btvirts.items():
+      for process, adapters in list(btvirts):
+        if process.poll() is None:
+          continue
+        self.logger.error(
+            'btvirt {} of bus {} exited with {}, lost adapters {}'.format(
+                process.pid, bus, process.returncode, sorted(adapters)))
+        btvirts.remove((process, adapters))
+        self.__free[bus] = [a for a in self.__free[bus] if a not in adapters]
+    # a bluetoothd left behind by an earlier run owns the adapters otherwise.
+    self.__stop_stale_daemons()
+    if self.__bluetoothd is not None and self.__bluetoothd.poll() is None:
+      return
+    if self.__bluetoothd is not None:
+      self.logger.error('bluetoothd exited with {}'.format(
+          self.__bluetoothd.returncode))
+      self.__bluetoothd = None
+    if bluez_owned(self.logger):
+      # a second bluetoothd can not take the bus name and would exit at
+      # once, the one already serving org.bluez, e.g. the host's, is used.
+      if not self.__shared_bluez:
+        self.logger.info('using the bluetoothd which owns org.bluez')
+      self.__shared_bluez = True
+      return
+    self.__shared_bluez = False
+    self.logger.info('bringing up bluetoothd')
+    self.__bluetoothd = subprocess.Popen(
+        [BLUETOOTHD, '--experimental', '--debug', '--nodetach'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL)
+    self.__record_pids()
+
+  def __owned_pids(self):
+    pids = [
+        process.pid for btvirts in self.__btvirts.values()
+        for process, _ in btvirts
+    ]
+    if self.__bluetoothd is not None:
+      pids.append(self.__bluetoothd.pid)
+    return pids
+
+  def __stop_stale_daemons(self):
+    # runs once, before this run starts a daemon or rewrites the pid file;
+    # the daemons restored homes adopted are owned and kept.
+    if self.__stale_stopped:
+      return
+    self.__stale_stopped = True
+    try:
+      with open(pid_file()) as pids:
+        recorded = {int(pid) for pid in pids.read().split()}
+    except (OSError, ValueError):
+      return
+    stale = [
+        pid for pid in recorded - set(self.__owned_pids()) if is_daemon(pid)
+    ]
+    for pid in stale:
+      self.logger.info('stopping stale bluetooth daemon {}'.format(pid))
+      try:
+        os.kill(pid, signal.SIGTERM)
+      except ProcessLookupError:
+        pass
+    utils.wait_until(self.logger,
+                     lambda: not any(is_daemon(pid) for pid in stale),
+                     DAEMON_TIMEOUT, 'stale bluetooth daemons to exit')
+
+  def __record_pids(self):
+    self.__stop_stale_daemons()
+    try:
+      os.makedirs(PID_DIR, exist_ok=True)
+      with open(pid_file(), 'w') as pids:
+        pids.write(''.join('{}\n'.format(pid) for pid in self.__owned_pids()))
+    except OSError as e:
+      self.logger.warning('failed to record bluetooth daemons: {}'.format(e))
+
+  def __add_controllers(self, bus, count):
+    before = hci_adapters()
+    self.logger.info('creating {} virtual ble controllers on bus {}'.format(
+        count, bus))
+    process = subprocess.Popen([BTVIRT, '-L', '-l{}'.format(count)],
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    new = set()
+
+    def registered():
+      new.update(hci_adapters() - before)
+      return len(new) >= count or process.poll() is not None
+
+    utils.wait_until(self.logger, registered, DAEMON_TIMEOUT,
+                     'virtual ble controllers')
+    if not new:
+      process.terminate()
+      raise BluetoothError('btvirt registered no controllers')
+    self.__btvirts.setdefault(bus, []).append((process, new))
+    self.__free.setdefault(bus, []).extend(sorted(new, key=adapter_index))
+    self.__record_pids()
+
+  @staticmethod
+  def __terminate(processes):
+    for process in processes:
+      if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+    for process in processes:
+      try:
+        process.wait(timeout=DAEMON_TIMEOUT)
+      except subprocess.TimeoutExpired:
+        process.kill()
+
+  def __stop_bus(self, bus):
+    self.__free.pop(bus, None)
+    if bus not in self.__btvirts:
+      return
+    self.__terminate([process for process, _ in self.__btvirts.pop(bus)])
+    self.__record_pids()
+
+  def __stop_idle_bluetoothd(self):
+    # other buses may still hold reserved adapters with no device on them.
+    if any(self.__btvirts.values()) or self.__bluetoothd is None:
+      return
+    self.__terminate([self.__bluetoothd])
+    self.__bluetoothd = None
+    self.__record_pids()
+
+
+BluetoothHost = _BluetoothHost()
@@ -16,34 +16,50 @@ import ipaddress
 import json
 
 from cirque.common.cirquelog import CirqueLog
-from cirque.common.utils import host_run, manipulate_iptable_src_dst_rule
+from cirque.common.utils import host_run
+from cirque.connectivity.netfilter import Netfilter
 
 IPV6_SUBNET = "2001:470:9a1a::/48"
 IPV6_GATEWAY = "2001:470:9a1a::1"
 
 class HomeLan:
 
-  def __init__(self, name, internal=False, ipv6=False):
+  def __init__(self,
+               name,
+               internal=False,
+               ipv6=False,
+               labels=None,
+               create=True,
+               docker_host=None,
+               owner=None):
     self.logger = CirqueLog.get_cirque_logger('lan_{}'.format(name))
     self.__name = name
+    self.owner = name if owner is None else owner
+    self.__docker_host = docker_host
+    self.__labels = {} if labels is None else labels
     self.__internal = internal
     self.__ipv6 = ipv6
     self.subnet = None
     self.gateway = None
-    if 'ipvlan' in self.__name:
+    if not create:
+      # reattaching to a network created by a previous service instance,
+      # its isolation rules are still in place.
+      self.__inspect_network_properties()
+      if self.__isolated and self.subnet:
+        Netfilter.adopt(self.owner, self.__isolation_rules())
+    elif 'ipvlan' in self.__name:
       self.__create_ipvlan_network()
     else:
       self.__create_docker_network()
-      # bypass disable mutual access for ipv4
-      # in ipv6 feature.
-      if 'ipv6' not in self.__name:
+      if self.__isolated:
         self.__disable_container_mutual_access()
 
   def __create_docker_network(self):
     # The docker-py library will add a weird route which disconnects
     # the host when creating networks. The `docker network inspect`isn't
     # supported neither so we use bash commands directly.
-    cmd = ['docker', 'network', 'create', self.__name]
+    cmd = self.__docker_command('network', 'create', self.__name)
+    cmd += self.__label_args()
     if self.__internal:
       cmd.append('--internal')
     elif self.__ipv6:
@@ -75,23 +91,39 @@ class HomeLan:
       self.logger.error('Failed to retrieve gateway for create '
                         'ipvalen %s: %s' % (self.__name, ret.stderr))
     gateway = ret.stdout.rstrip().decode('utf-8')
-    ipvlan_command = 'docker network create -d ipvlan --subnet=%s'\
-        ' --gateway=%s -o parent=%s %s' % (
-            subnet, gateway, interface, self.__name)
+    ipvlan_command = '%s network create -d ipvlan --subnet=%s'\
+        ' --gateway=%s -o parent=%s %s %s' % (
+            ' '.join(self.__docker_command()), subnet, gateway, interface,
+            ' '.join(self.__label_args()), self.__name)
     ret = host_run(self.logger, ipvlan_command)
     if ret.returncode != 0:
       self.logger.error('Failed to create ipvlan %s: %s' %
                         (self.__name, ret.stderr))
     self.__inspect_network_properties()
 
+  def __docker_command(self, *args):
+    cmd = ['docker']
+    if self.__docker_host:
+      cmd += ['-H', self.__docker_host]
+    return cmd + list(args)
+
+  def __label_args(self):
+    return [
+        '--label={}={}'.format(key, value)
+        for key, value in self.__labels.items()
+    ]
+
+  @property
+  def __isolated(self):
+    # bypass disable mutual access for ipv4 in ipv6 feature.
+    return all(nwk not in self.__name for nwk in ('ipv6', 'ipvlan'))
+
+  def __isolation_rules(self):
+    return Netfilter.lan_rules(self.subnet, self.gateway)
+
   def __disable_container_mutual_access(self):
     self.__inspect_network_properties()
-    manipulate_iptable_src_dst_rule(self.logger, self.subnet, self.subnet,
-                                    'DROP')
-    manipulate_iptable_src_dst_rule(self.logger, self.gateway, self.subnet,
-                                    'ACCEPT')
-    manipulate_iptable_src_dst_rule(self.logger, self.subnet, self.gateway,
-                                    'ACCEPT')
+    Netfilter.add_rules(self.owner, self.__isolation_rules())
 
   def __disable_ipv6_external_access(self):
     flush_command = "ip6tables -t nat -F"
@@ -108,7 +140,8 @@ class HomeLan:
       self.logger.error('Fail to setup ipv6 external access in ip6tables')
 
   def __inspect_network_properties(self):
-    ret = host_run(self.logger, ['docker', 'network', 'inspect', self.__name])
+    ret = host_run(self.logger,
+                   self.__docker_command('network', 'inspect', self.__name))
     if ret.returncode != 0:
       self.logger.error('Failed to inspect home lan %s' % self.__name)
       return
@@ -126,18 +159,13 @@ class HomeLan:
   def close(self):
     if not self.subnet:
       return
-    cmd = ['docker', 'network', 'rm', self.__name]
+    cmd = self.__docker_command('network', 'rm', self.__name)
     if host_run(self.logger, cmd).returncode != 0:
       self.logger.error('Failed to remove home lan %s', self.__name)
     if self.__ipv6:
       self.__disable_ipv6_external_access()
-    if all(nwk not in self.__name for nwk in ('ipv6', 'ipvlan')):
-      manipulate_iptable_src_dst_rule(
-          self.logger, self.subnet, self.subnet, 'DROP', add=False)
-      manipulate_iptable_src_dst_rule(
-          self.logger, self.gateway, self.subnet, 'ACCEPT', add=False)
-      manipulate_iptable_src_dst_rule(
-          self.logger, self.subnet, self.gateway, 'ACCEPT', add=False)
+    if self.__isolated:
+      Netfilter.remove_rules(self.owner, self.__isolation_rules())
     self.gateway = None
     self.subnet = None
 
@@ -149,5 +177,9 @@ class HomeLan:
   def internal(self):
     return self.__internal
 
+  @property
+  def ipv6(self):
+    return self.__ipv6
+
   def __del__(self):
     self.close()
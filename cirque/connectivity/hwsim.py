@@ -0,0 +1,298 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import errno
+import itertools
+import os
+from threading import Lock
+
+from pyroute2.netlink import NLM_F_ACK, NLM_F_DUMP, NLM_F_REQUEST, genlmsg
+from pyroute2.netlink.exceptions import NetlinkError
+from pyroute2.netlink.generic import GenericNetlinkSocket
+from pyroute2 import netns
+
+from cirque.common.cirquelog import CirqueLog
+from cirque.common.exceptions import (
+    LoadKernelError,
+    NameSpaceOperatingError,
+    PHYDeviceError,
+)
+from cirque.connectivity.netlinkhandles import (
+    RUNTIME_NAMESPACE,
+    NetlinkHandles,
+)
+import cirque.common.utils as utils
+
+HWSIM_FAMILY = 'MAC80211_HWSIM'
+HWSIM_CMD_NEW_RADIO = 4
+HWSIM_CMD_DEL_RADIO = 5
+HWSIM_CMD_GET_RADIO = 6
+PHY_SYSFS = '/sys/class/ieee80211'
+RADIO_PREFIX = 'cirque'
+MEDIUM_PREFIX = 'cirque-medium-'
+# radios preloaded when the kernel has no hwsim netlink family and the
+# module has to be loaded the old way.
+STATIC_RADIOS = 16
+MAX_RADIOS = 64
+
+
+class hwsimmsg(genlmsg):
+  nla_map = (
+      ('HWSIM_ATTR_UNSPEC', 'none'),
+      ('HWSIM_ATTR_ADDR_RECEIVER', 'hex'),
+      ('HWSIM_ATTR_ADDR_TRANSMITTER', 'hex'),
+      ('HWSIM_ATTR_FRAME', 'hex'),
+      ('HWSIM_ATTR_FLAGS', 'uint32'),
+      ('HWSIM_ATTR_RX_RATE', 'uint32'),
+      ('HWSIM_ATTR_SIGNAL', 'uint32'),
+      ('HWSIM_ATTR_TX_INFO', 'hex'),
+      ('HWSIM_ATTR_COOKIE', 'uint64'),
+      ('HWSIM_ATTR_CHANNELS', 'uint32'),
+      ('HWSIM_ATTR_RADIO_ID', 'uint32'),
+      ('HWSIM_ATTR_REG_HINT_ALPHA2', 'asciiz'),
+      ('HWSIM_ATTR_REG_CUSTOM_REG', 'uint32'),
+      ('HWSIM_ATTR_REG_STRICT_REG', 'flag'),
+      ('HWSIM_ATTR_SUPPORT_P2P_DEVICE', 'flag'),
+      ('HWSIM_ATTR_USE_CHANCTX', 'flag'),
+      ('HWSIM_ATTR_DESTROY_RADIO_ON_CLOSE', 'flag'),
+      ('HWSIM_ATTR_RADIO_NAME', 'asciiz'),
+  )
+
+
+class HwsimSocket(GenericNetlinkSocket):
+
+  def __init__(self, namespace=None):
+    if namespace is None:
+      super().__init__()
+    else:
+      super().__init__(netns=namespace)
+    try:
+      self.bind(HWSIM_FAMILY, hwsimmsg)
+    except NetlinkError:
+      self.close()
+      raise
+
+  def radio_names(self):
+    msg = hwsimmsg()
+    msg['cmd'] = HWSIM_CMD_GET_RADIO
+    msg['version'] = 1
+    # hwsim only lists the radios of the network namespace of the socket.
+    return {
+        radio.get_attr('HWSIM_ATTR_RADIO_NAME')
+        for radio in self.nlm_request(
+            msg, msg_type=self.prid, msg_flags=NLM_F_REQUEST | NLM_F_DUMP)
+    }
+
+  def radio_request(self, cmd, name):
+    if cmd == HWSIM_CMD_NEW_RADIO and name in self.radio_names():
+      raise NetlinkError(errno.EEXIST, 'radio {} exists'.format(name))
+    msg = hwsimmsg()
+    msg['cmd'] = cmd
+    msg['version'] = 1
+    msg['attrs'] = [('HWSIM_ATTR_RADIO_NAME', name)]
+    try:
+      self.nlm_request(
+          msg, msg_type=self.prid, msg_flags=NLM_F_REQUEST | NLM_F_ACK)
+    except NetlinkError:
+      # NEW_RADIO acks with the positive index of the new radio, which
+      # pyroute2 reports as an error with the sign dropped. Only a radio
+      # that now exists tells it apart from a real errno.
+      if cmd != HWSIM_CMD_NEW_RADIO or name not in self.radio_names():
+        raise
+
+
+def medium_namespace(medium):
+  return '{}{}'.format(MEDIUM_PREFIX, medium)
+
+
+def interface_of(phy):
+  net = os.path.join(PHY_SYSFS, phy, 'device', 'net')
+  interfaces = os.listdir(net) if os.path.isdir(net) else []
+  if not interfaces:
+    raise PHYDeviceError('phy device {} has no interface'.format(phy))
+  return sorted(interfaces)[0]
+
+
+class _Radios:
+
+  def __init__(self):
+    self.logger = CirqueLog.get_cirque_logger('hwsim')
+    self.spares = int(os.environ.get('CIRQUE_HWSIM_SPARE_RADIOS', 2))
+    self.__lock = Lock()
+    self.__dynamic = None
+    self.__names = itertools.count()
+    self.__spare = {}
+    self.__in_use = {}
+
+  @property
+  def dynamic(self):
+    with self.__lock:
+      self.__setup()
+      return self.__dynamic
+
+  def __setup(self):
+    if self.__dynamic is not None:
+      return
+    loaded = utils.host_run(self.logger,
+                            'lsmod | grep mac80211_hwsim').returncode == 0
+    if not loaded:
+      self.__load(0)
+    try:
+      HwsimSocket().close()
+      self.__dynamic = True
+    except NetlinkError as e:
+      self.logger.warning(
+          'hwsim netlink family unavailable, using preloaded radios: '
+          '{!r}'.format(e))
+      self.__dynamic = False
+      if not loaded:
+        utils.host_run(self.logger, 'modprobe -r mac80211_hwsim')
+        self.__load(STATIC_RADIOS)
+    if self.__dynamic:
+      # radios left in the host by a previous service instance, the medium
+      # they were created for is unknown.
+      for phy in self.__host_phys():
+        if phy.startswith(RADIO_PREFIX):
+          self.__del_radio(phy)
+
+  def __load(self, radios):
+    self.logger.info('loading mac80211_hwsim with {} radios'.format(radios))
+    ret = utils.host_run(self.logger,
+                         'modprobe mac80211_hwsim radios={}'.format(radios))
+    if ret.returncode != 0:
+      raise LoadKernelError('unable to load module mac80211_hwsim!!')
+
+    def radios_registered():
+      return len(self.__host_phys()) >= radios
+
+    if not utils.wait_until(self.logger, radios_registered, 5,
+                            'mac80211_hwsim radios'):
+      raise LoadKernelError('mac80211_hwsim radios did not show up!!')
+
+  @staticmethod
+  def __host_phys():
+    # wiphys moved into a container namespace are not listed here.
+    return sorted(os.listdir(PHY_SYSFS)) if os.path.isdir(PHY_SYSFS) else []
+
+  def allocate(self, medium=None):
+    with self.__lock:
+      self.__setup()
+      if self.__dynamic:
+        phy = self.__take_spare(medium) or self.__new_radio(medium)
+      else:
+        phy = self.__take_static()
+      self.__in_use[phy] = medium
+    self.logger.info('allocated radio {} on medium {}'.format(phy, medium))
+    return phy
+
+  def __take_spare(self, medium):
+    spare = self.__spare.get(medium, [])
+    while spare:
+      phy = spare.pop()
+      if phy in self.__host_phys():
+        return phy
+      # never made it back from the namespace it was lent to.
+      self.__del_radio(phy)
+    return None
+
+  def __take_static(self):
+    for phy in self.__host_phys():
+      if phy not in self.__in_use:
+        return phy
+    raise PHYDeviceError('run out of all the phy devices!')
+
+  def __new_radio(self, medium):
+    phys = self.__host_phys()
+    phy = '{}{}'.format(RADIO_PREFIX, next(self.__names))
+    while phy in phys:
+      phy = '{}{}'.format(RADIO_PREFIX, next(self.__names))
+    if medium is None:
+      self.__radio_request(HWSIM_CMD_NEW_RADIO, phy)
+    else:
+      # hwsim only delivers frames between radios created in the same
+      # network namespace, wherever they are moved afterwards.
+      namespace = self.__open_medium(medium)
+      self.__radio_request(HWSIM_CMD_NEW_RADIO, phy, namespace)
+      try:
+        NetlinkHandles.move_phy(phy, None, source=namespace)
+      except (NetlinkError, OSError) as e:
+        raise PHYDeviceError('failed to move radio {} out of {}: {!r}'.format(
+            phy, namespace, e))
+    if phy not in self.__host_phys():
+      raise PHYDeviceError('failed to create radio {}'.format(phy))
+    return phy
+
+  def __open_medium(self, medium):
+    namespace = medium_namespace(medium)
+    if not os.path.lexists(os.path.join(RUNTIME_NAMESPACE, namespace)):
+      try:
+        netns.create(namespace)
+      except OSError as e:
+        raise NameSpaceOperatingError(
+            'failed to create medium {}: {!r}'.format(namespace, e))
+    return namespace
+
+  @staticmethod
+  def __radio_request(cmd, phy, namespace=None):
+    with HwsimSocket(namespace) as hwsim:
+      hwsim.radio_request(cmd, phy)
+
+  def __del_radio(self, phy):
+    try:
+      self.__radio_request(HWSIM_CMD_DEL_RADIO, phy)
+      self.logger.info('deleted radio {}'.format(phy))
+    except NetlinkError as e:
+      self.logger.error('failed to delete radio {}: {!r}'.format(phy, e))
+
+  def release(self, phy):
+    with self.__lock:
+      if not phy.startswith(RADIO_PREFIX):
+        self.__in_use.pop(phy, None)
+        return
+      if any(phy in spare for spare in self.__spare.values()):
+        return
+      if phy not in self.__in_use:
+        # handed out before a service restart, its medium is unknown.
+        self.__del_radio(phy)
+        return
+      spare = self.__spare.setdefault(self.__in_use.pop(phy), [])
+      if len(spare) < self.spares:
+        spare.append(phy)
+        return
+      self.__del_radio(phy)
+
+  def close_medium(self, medium):
+    with self.__lock:
+      for phy in self.__spare.pop(medium, []):
+        self.__del_radio(phy)
+    namespace = medium_namespace(medium)
+    NetlinkHandles.close(namespace)
+    if os.path.lexists(os.path.join(RUNTIME_NAMESPACE, namespace)):
+      try:
+        netns.remove(namespace)
+      except OSError as e:
+        self.logger.error('failed to remove medium {}: {!r}'.format(
+            namespace, e))
+
+  def in_use(self):
+    with self.__lock:
+      return sorted(self.__in_use)
+
+  def spare(self, medium=None):
+    with self.__lock:
+      return list(self.__spare.get(medium, []))
+
+
+Radios = _Radios()
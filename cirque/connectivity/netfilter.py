@@ -0,0 +1,237 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from threading import Lock
+
+from cirque.common.cirquelog import CirqueLog
+from cirque.common.utils import host_run
+
+DOCKER_USER_CHAIN = 'DOCKER-USER'
+FALLBACK_CHAIN = 'INPUT'
+NFT_TABLE = 'ip cirque'
+# A fixed rule set: isolation and access grants are set elements, so the
+# number of rules a packet walks does not grow with homes or devices.
+NFT_RULESET = '''table {table} {{
+  set isolated {{ type ipv4_addr . ipv4_addr; flags interval; }}
+  set gateways {{ type ipv4_addr; }}
+  set allowed {{ type ipv4_addr . ipv4_addr; flags interval; }}
+  chain forward {{
+    type filter hook forward priority -1; policy accept;
+    ip saddr . ip daddr @allowed accept
+    ip saddr @gateways accept
+    ip daddr @gateways accept
+    ip saddr . ip daddr @isolated drop
+  }}
+}}
+'''
+
+
+def owner_of(home_id, *parts):
+  return '/'.join([home_id, *parts])
+
+
+class _IptablesBackend:
+
+  name = 'iptables'
+
+  def __init__(self, logger):
+    self.logger = logger
+    self.__lock = Lock()
+    self.__chain = None
+
+  @property
+  def chain(self):
+    with self.__lock:
+      if self.__chain is None:
+        ret = host_run(self.logger, ['iptables', '-S', DOCKER_USER_CHAIN])
+        self.__chain = DOCKER_USER_CHAIN if ret.returncode == 0 \
+            else FALLBACK_CHAIN
+      return self.__chain
+
+  def lan_rules(self, subnet, gateway):
+    return [
+        (subnet, subnet, 'DROP'),
+        (gateway, subnet, 'ACCEPT'),
+        (subnet, gateway, 'ACCEPT'),
+    ]
+
+  def access_rules(self, address, subnet):
+    return [
+        (address, subnet, 'ACCEPT'),
+        (subnet, address, 'ACCEPT'),
+    ]
+
+  def rule_args(self, rule):
+    src, dst, action = rule
+    return ['-s', src, '-d', dst, '-j', action]
+
+  def __restore(self, operation, rules):
+    lines = ['*filter']
+    lines += [
+        ' '.join([operation, self.chain] + self.rule_args(rule))
+        for rule in rules
+    ]
+    lines.append('COMMIT\n')
+    ret = host_run(
+        self.logger, ['iptables-restore', '--noflush'],
+        input='\n'.join(lines).encode())
+    return ret.returncode == 0
+
+  def add(self, rules):
+    # -I inserts at the head of the chain, the rules end up in reverse
+    # order just like inserting them one at a time would.
+    return self.__restore('-I', rules)
+
+  def delete(self, rules):
+    if self.__restore('-D', rules):
+      return
+    # one of the rules is already gone, which fails the whole transaction.
+    for rule in rules:
+      host_run(self.logger,
+               ['iptables', '-D', self.chain] + self.rule_args(rule))
+
+
+class _NftBackend:
+
+  name = 'nft'
+
+  def __init__(self, logger):
+    self.logger = logger
+    self.__lock = Lock()
+    self.__ready = False
+
+  def __setup(self):
+    with self.__lock:
+      if self.__ready:
+        return True
+      ret = host_run(self.logger,
+                     ['nft', 'list', 'chain'] + NFT_TABLE.split() +
+                     ['forward'])
+      if ret.returncode != 0:
+        ret = host_run(self.logger, ['nft', '-f', '-'],
+                       input=NFT_RULESET.format(table=NFT_TABLE).encode())
+      self.__ready = ret.returncode == 0
+      return self.__ready
+
+  def lan_rules(self, subnet, gateway):
+    return [
+        ('isolated', '{} . {}'.format(subnet, subnet)),
+        ('gateways', gateway),
+    ]
+
+  def access_rules(self, address, subnet):
+    # scoped to the LAN of the device like the iptables rules.
+    return [
+        ('allowed', '{} . {}'.format(address, subnet)),
+        ('allowed', '{} . {}'.format(subnet, address)),
+    ]
+
+  def element_command(self, operation, element):
+    set_name, value = element
+    return '{} element {} {} {{ {} }}'.format(operation, NFT_TABLE, set_name,
+                                              value)
+
+  def __batch(self, operation, elements):
+    lines = [self.element_command(operation, element) for element in elements]
+    ret = host_run(self.logger, ['nft', '-f', '-'],
+                   input='\n'.join(lines + ['']).encode())
+    return ret.returncode == 0
+
+  def add(self, elements):
+    return self.__setup() and self.__batch('add', elements)
+
+  def delete(self, elements):
+    if self.__batch('delete', elements):
+      return
+    # one of the elements is already gone, which fails the whole batch.
+    for element in elements:
+      host_run(self.logger,
+               ['nft'] + self.element_command('delete', element).split())
+
+
+BACKENDS = {
+    backend.name: backend for backend in (_IptablesBackend, _NftBackend)
+}
+
+
+class _Netfilter:
+
+  def __init__(self, backend=None):
+    self.logger = CirqueLog.get_cirque_logger('netfilter')
+    if backend is None:
+      backend = os.environ.get('CIRQUE_NETFILTER_BACKEND', 'iptables')
+    if backend not in BACKENDS:
+      self.logger.error('unknown netfilter backend {}, using iptables'.format(
+          backend))
+      backend = 'iptables'
+    self.backend = BACKENDS[backend](self.logger)
+    self.__lock = Lock()
+    self.__rules = {}
+
+  def lan_rules(self, subnet, gateway):
+    return self.backend.lan_rules(subnet, gateway)
+
+  def access_rules(self, address, subnet):
+    return self.backend.access_rules(address, subnet)
+
+  def add_rules(self, owner, rules):
+    rules = [tuple(rule) for rule in rules]
+    if not rules:
+      return True
+    if not self.backend.add(rules):
+      self.logger.error('failed to add rules of {}: {}'.format(owner, rules))
+      return False
+    self.adopt(owner, rules)
+    return True
+
+  def adopt(self, owner, rules):
+    with self.__lock:
+      self.__rules.setdefault(owner, []).extend(
+          tuple(rule) for rule in rules)
+
+  def remove_rules(self, owner, rules=None):
+    with self.__lock:
+      owned = self.__rules.get(owner, [])
+      if rules is None:
+        removed = list(owned)
+      else:
+        removed = [tuple(rule) for rule in rules if tuple(rule) in owned]
+      for rule in removed:
+        owned.remove(rule)
+      if not owned:
+        self.__rules.pop(owner, None)
+    self.__delete(removed)
+
+  def release(self, home_id):
+    with self.__lock:
+      owners = [
+          owner for owner in self.__rules
+          if owner == home_id or owner.startswith(home_id + '/')
+      ]
+      removed = [rule for owner in owners for rule in self.__rules.pop(owner)]
+    self.__delete(removed)
+
+  def __delete(self, rules):
+    if rules:
+      self.backend.delete(rules)
+
+  def owned_rules(self, owner=None):
+    with self.__lock:
+      if owner is not None:
+        return list(self.__rules.get(owner, []))
+      return {owner: list(rules) for owner, rules in self.__rules.items()}
+
+
+Netfilter = _Netfilter()
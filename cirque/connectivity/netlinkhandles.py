@@ -0,0 +1,84 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+from contextlib import contextmanager
+from threading import Lock
+
+from pyroute2 import IW, IPRoute
+
+RUNTIME_NAMESPACE = '/var/run/netns'
+# the namespace of the service itself, where spare radios are kept.
+HOST_NETNS = '/proc/self/ns/net'
+
+
+def wiphy_index(iw, phy):
+  for wiphy in iw.list_wiphy():
+    if wiphy.get_attr('NL80211_ATTR_WIPHY_NAME') == phy:
+      return wiphy.get_attr('NL80211_ATTR_WIPHY')
+  return None
+
+
+class _NetlinkHandles:
+
+  def __init__(self):
+    self.__lock = Lock()
+    self.__handles = {}
+
+  def __get(self, kind, namespace):
+    with self.__lock:
+      key = (kind, namespace)
+      if key not in self.__handles:
+        handle = kind() if namespace is None else kind(netns=namespace)
+        self.__handles[key] = (handle, Lock())
+      return self.__handles[key]
+
+  @contextmanager
+  def __use(self, kind, namespace):
+    handle, lock = self.__get(kind, namespace)
+    with lock:
+      yield handle
+
+  def ipr(self, namespace=None):
+    return self.__use(IPRoute, namespace)
+
+  def iw(self, namespace=None):
+    return self.__use(IW, namespace)
+
+  def move_phy(self, phy, namespace, source=None):
+    # moves the wiphy from the source namespace into the target, None
+    # standing for the namespace of the service.
+    with self.iw(source) as iw, \
+        open(HOST_NETNS if namespace is None
+             else os.path.join(RUNTIME_NAMESPACE, namespace)) as target:
+      index = wiphy_index(iw, phy)
+      if index is None:
+        return False
+      iw.set_wiphy_netns_by_fd(index, target.fileno())
+      return True
+
+  def close(self, namespace):
+    with self.__lock:
+      handles = [
+          self.__handles.pop(key)
+          for key in list(self.__handles)
+          if key[1] == namespace
+      ]
+    for handle, lock in handles:
+      with lock:
+        handle.close()
+
+
+NetlinkHandles = _NetlinkHandles()
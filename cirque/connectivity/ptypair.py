@@ -0,0 +1,70 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tty
+
+from cirque.common.cirquelog import CirqueLog
+from cirque.connectivity.socatpipepair import SocatPipePair
+
+
+class PtyPair:
+
+  def __init__(self):
+    self.master = None
+    self.slave = None
+    self.pipe0 = None
+    self.pipe1 = None
+
+  def open(self):
+    self.master, self.slave = os.openpty()
+    # the line discipline is shared by both ends, raw mode keeps the spinel
+    # frames intact in both directions.
+    tty.setraw(self.slave)
+    self.pipe0 = os.ttyname(self.slave)
+
+  @property
+  def pids(self):
+    return []
+
+  def radio_fd(self):
+    # the radio talks to the master directly, holding the slave open keeps
+    # the master readable while the container has not opened its end yet.
+    return os.dup(self.master)
+
+  def close(self):
+    for fd in (self.master, self.slave):
+      if fd is not None:
+        os.close(fd)
+    self.master = None
+    self.slave = None
+
+  def __del__(self):
+    self.close()
+
+
+def open_pipe_pair():
+  if os.environ.get('CIRQUE_THREAD_PIPE', 'pty') == 'pty':
+    pair = PtyPair()
+    try:
+      pair.open()
+      return pair
+    except OSError as e:
+      pair.close()
+      CirqueLog.get_cirque_logger('ptypair').warning(
+          'failed to open a pty pair, falling back to socat: {!r}'.format(e))
+  pair = SocatPipePair()
+  pair.open()
+  return pair
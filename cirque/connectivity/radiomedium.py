@@ -0,0 +1,355 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import heapq
+import itertools
+import os
+import random
+import socket
+import struct
+import threading
+import time
+from array import array
+
+from cirque.common.cirquelog import CirqueLog
+
+SIM_PORT_BASE = 9000
+THREAD_GROUP_SIZE = 34
+# struct Event of the OpenThread simulation platform built with
+# OPENTHREAD_SIMULATION_VIRTUAL_TIME: delay in us, event type, data length.
+EVENT_HEADER = struct.Struct('<QBH')
+EVENT_ALARM_FIRED = 0
+EVENT_RADIO_RECEIVED = 1
+EVENT_UART_WRITE = 2
+# what the simulation platform reports for every received frame.
+DEFAULT_RSSI = -20
+RX_SENSITIVITY = -100
+NO_LINK = -128
+POLL_INTERVAL = 0.5
+
+
+class NeighborTable:
+
+  def __init__(self, size=THREAD_GROUP_SIZE):
+    self.size = size
+    self.__rssi = array('b', [DEFAULT_RSSI]) * (size * size)
+    self.__loss = array('f', [0.0]) * (size * size)
+
+  def __index(self, source, destination):
+    if not (0 < source < self.size and 0 < destination < self.size):
+      raise ValueError('thread node id out of range: {} -> {}'.format(
+          source, destination))
+    return source * self.size + destination
+
+  def set_link(self, source, destination, rssi=None, loss=None):
+    index = self.__index(source, destination)
+    if rssi is not None:
+      self.__rssi[index] = max(NO_LINK, min(127, int(rssi)))
+    if loss is not None:
+      if not 0.0 <= loss <= 1.0:
+        raise ValueError('loss must be within [0, 1]: {}'.format(loss))
+      self.__loss[index] = loss
+
+  def link(self, source, destination):
+    index = self.__index(source, destination)
+    return {'rssi': self.__rssi[index], 'loss': self.__loss[index]}
+
+  def receivers(self, source, nodes):
+    row = source * self.size
+    return [(node, self.__loss[row + node])
+            for node in nodes
+            if node != source and self.__rssi[row + node] >= RX_SENSITIVITY]
+
+
+class VirtualClock:
+
+  def __init__(self, speed=1.0):
+    if speed < 0:
+      raise ValueError('speed must not be negative: {}'.format(speed))
+    self.__lock = threading.Lock()
+    self.__now = 0
+    self.__wall = time.monotonic()
+    # 0 runs as fast as the radios go: time jumps to the next event as
+    # soon as every node is waiting for one.
+    self.__speed = speed
+    self.__paused = False
+    self.__budget = 0
+
+  def __elapsed(self):
+    if self.__paused or not self.__speed:
+      return 0
+    return int((time.monotonic() - self.__wall) * self.__speed * 1e6)
+
+  def __anchor(self):
+    self.__now += self.__elapsed()
+    self.__wall = time.monotonic()
+
+  def now(self):
+    with self.__lock:
+      return self.__now + self.__elapsed()
+
+  def state(self):
+    with self.__lock:
+      return {
+          'now_us': self.__now + self.__elapsed(),
+          'speed': self.__speed,
+          'paused': self.__paused,
+      }
+
+  def set_speed(self, speed):
+    if speed < 0:
+      raise ValueError('speed must not be negative: {}'.format(speed))
+    with self.__lock:
+      self.__anchor()
+      self.__speed = speed
+
+  def pause(self):
+    with self.__lock:
+      self.__anchor()
+      self.__paused = True
+      self.__budget = 0
+
+  def resume(self):
+    with self.__lock:
+      self.__anchor()
+      self.__paused = False
+
+  def step(self, duration):
+    with self.__lock:
+      if not self.__paused:
+        raise ValueError('the clock only steps while paused')
+      self.__budget += duration
+
+  def advance(self, target):
+    with self.__lock:
+      if self.__paused:
+        if not self.__budget:
+          return False
+        move = self.__budget if target is None else \
+            max(0, min(target - self.__now, self.__budget))
+        self.__budget -= move
+        self.__now += move
+        return True
+      if self.__speed or target is None or target <= self.__now:
+        return False
+      self.__now = target
+      self.__wall = time.monotonic()
+      return True
+
+  def wall_delay(self, target):
+    with self.__lock:
+      if self.__paused or not self.__speed:
+        return None
+      return max(0, target - self.__now - self.__elapsed()) / \
+          self.__speed / 1e6
+
+
+class RadioMedium:
+
+  def __init__(self,
+               petition_id,
+               port_offset=None,
+               window=THREAD_GROUP_SIZE,
+               speed=1.0):
+    self.petition_id = petition_id
+    if port_offset is None:
+      port_offset = petition_id * THREAD_GROUP_SIZE
+    self.port = SIM_PORT_BASE + port_offset
+    self.table = NeighborTable(window)
+    self.clock = VirtualClock(speed)
+    self.logger = CirqueLog.get_cirque_logger('radiomedium')
+    self.stats = {'transmitted': 0, 'delivered': 0, 'lost': 0}
+    self.__lock = threading.Lock()
+    self.__nodes = {}
+    self.__alarms = {}
+    # nodes handling an event, time stands still for them until they ask
+    # to sleep again.
+    self.__busy = set()
+    self.__taps = []
+    self.__queue = []
+    self.__seq = itertools.count()
+    self.__sock = None
+    self.__thread = None
+
+  def now(self):
+    return self.clock.now()
+
+  def open(self):
+    self.__sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self.__sock.bind(('127.0.0.1', self.port))
+    self.__thread = threading.Thread(target=self.__run, daemon=True)
+    self.__thread.start()
+
+  def close(self):
+    sock, self.__sock = self.__sock, None
+    if sock is not None:
+      sock.close()
+    with self.__lock:
+      taps, self.__taps = self.__taps, []
+    for tap in taps:
+      tap.close()
+    if self.__thread is not None and \
+        self.__thread is not threading.current_thread():
+      self.__thread.join(timeout=2 * POLL_INTERVAL)
+    self.__thread = None
+
+  def add_node(self, node_id):
+    with self.__lock:
+      self.__nodes.setdefault(node_id, self.now())
+      self.__busy.add(node_id)
+
+  def remove_node(self, node_id):
+    with self.__lock:
+      self.__nodes.pop(node_id, None)
+      self.__alarms.pop(node_id, None)
+      self.__busy.discard(node_id)
+    return self.nodes
+
+  def add_tap(self, tap):
+    with self.__lock:
+      self.__taps = self.__taps + [tap]
+
+  def remove_tap(self, tap):
+    with self.__lock:
+      self.__taps = [t for t in self.__taps if t is not tap]
+
+  @property
+  def nodes(self):
+    with self.__lock:
+      return sorted(self.__nodes)
+
+  def __schedule(self, at, node_id, event, data=b''):
+    seq = next(self.__seq)
+    heapq.heappush(self.__queue, (at, seq, node_id, event, data))
+    return seq
+
+  def handle(self, data, node_id):
+    delay, event, length = EVENT_HEADER.unpack_from(data)
+    payload = data[EVENT_HEADER.size:EVENT_HEADER.size + length]
+    with self.__lock:
+      node_now = self.__nodes.setdefault(node_id, self.now())
+      at = node_now + delay
+      if event == EVENT_ALARM_FIRED:
+        # a node only sleeps until its next alarm, a newer one replaces it.
+        self.__alarms[node_id] = self.__schedule(at, node_id, event)
+        self.__busy.discard(node_id)
+      elif event == EVENT_RADIO_RECEIVED:
+        self.stats['transmitted'] += 1
+        for tap in self.__taps:
+          tap.offer(node_id, at, payload)
+        for receiver, loss in self.table.receivers(node_id, self.__nodes):
+          if loss and random.random() < loss:
+            self.stats['lost'] += 1
+            continue
+          self.__schedule(at, receiver, event, payload)
+      else:
+        self.logger.debug('ignoring event {} from node {}'.format(
+            event, node_id))
+
+  def due_events(self, now):
+    events = []
+    with self.__lock:
+      while self.__queue and self.__queue[0][0] <= now:
+        at, seq, node_id, event, data = heapq.heappop(self.__queue)
+        if node_id not in self.__nodes:
+          continue
+        if event == EVENT_ALARM_FIRED and self.__alarms.get(node_id) != seq:
+          continue
+        if event == EVENT_RADIO_RECEIVED:
+          self.stats['delivered'] += 1
+        node_now = self.__nodes[node_id]
+        self.__nodes[node_id] = max(node_now, at)
+        self.__busy.add(node_id)
+        events.append((node_id,
+                       EVENT_HEADER.pack(max(0, at - node_now), event,
+                                         len(data)) + data))
+    return events
+
+  def idle(self):
+    with self.__lock:
+      return not self.__busy
+
+  def next_event_time(self):
+    with self.__lock:
+      return self.__queue[0][0] if self.__queue else None
+
+  def next_timeout(self):
+    target = self.next_event_time()
+    delay = None if target is None else self.clock.wall_delay(target)
+    return POLL_INTERVAL if delay is None else min(POLL_INTERVAL, delay)
+
+  def __run(self):
+    sock = self.__sock
+    while self.__sock is sock:
+      try:
+        events = self.due_events(self.now())
+        for node_id, message in events:
+          sock.sendto(message, ('127.0.0.1', self.port + node_id))
+        if not events and self.idle() and \
+            self.clock.advance(self.next_event_time()):
+          continue
+        sock.settimeout(self.next_timeout())
+        data, (_, port) = sock.recvfrom(EVENT_HEADER.size + 0xffff)
+      except socket.timeout:
+        continue
+      except OSError as e:
+        if self.__sock is sock:
+          self.logger.error('radio medium {} failed: {!r}'.format(
+              self.petition_id, e))
+        return
+      if 0 < port - self.port < self.table.size and \
+          len(data) >= EVENT_HEADER.size:
+        self.handle(data, port - self.port)
+
+
+class _RadioMediums:
+
+  def __init__(self):
+    self.logger = CirqueLog.get_cirque_logger('radiomedium')
+    self.speed = float(os.environ.get('CIRQUE_THREAD_SPEED', 1))
+    self.__lock = threading.Lock()
+    self.__mediums = {}
+
+  @property
+  def enabled(self):
+    return os.environ.get('CIRQUE_THREAD_MEDIUM') == 'broker'
+
+  def attach(self, petition_id, node_id, port_offset=None,
+             window=THREAD_GROUP_SIZE):
+    with self.__lock:
+      medium = self.__mediums.get(petition_id)
+      if medium is None:
+        medium = RadioMedium(petition_id, port_offset, window, self.speed)
+        medium.open()
+        self.__mediums[petition_id] = medium
+        self.logger.info('radio medium for petition {} on port {}'.format(
+            petition_id, medium.port))
+      medium.add_node(node_id)
+      return medium
+
+  def detach(self, petition_id, node_id):
+    with self.__lock:
+      medium = self.__mediums.get(petition_id)
+      if medium is None or medium.remove_node(node_id):
+        return
+      del self.__mediums[petition_id]
+    medium.close()
+
+  def get(self, petition_id):
+    with self.__lock:
+      return self.__mediums.get(petition_id)
+
+
+RadioMediums = _RadioMediums()
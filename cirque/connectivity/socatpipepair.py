@@ -16,6 +16,8 @@ import os
 import re
 import subprocess
 
+from cirque.common.exceptions import ConnectivityError
+
 
 class SocatPipePair:
 
@@ -28,7 +30,7 @@ class SocatPipePair:
       match = r.search(line)
       if match:
         return match.group()
-    return ''
+    raise ConnectivityError('socat did not report its pts')
 
   def __init__(self):
     self.socat = None
@@ -39,8 +41,19 @@ class SocatPipePair:
     self.socat = subprocess.Popen(
         ['socat', '-d', '-d', 'pty,raw,echo=0', 'pty,raw,echo=0'],
         stderr=subprocess.PIPE)
-    self.pipe0 = SocatPipePair.__find_socat_pts(self.socat.stderr)
-    self.pipe1 = SocatPipePair.__find_socat_pts(self.socat.stderr)
+    try:
+      self.pipe0 = SocatPipePair.__find_socat_pts(self.socat.stderr)
+      self.pipe1 = SocatPipePair.__find_socat_pts(self.socat.stderr)
+    except ConnectivityError:
+      self.close()
+      raise
+
+  @property
+  def pids(self):
+    return [] if self.socat is None else [self.socat.pid]
+
+  def radio_fd(self):
+    return os.open(self.pipe1, os.O_RDWR)
 
   def close(self):
     if self.socat is not None:
@@ -0,0 +1,62 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import ipaddress
+import os
+from threading import Lock
+
+from cirque.common.exceptions import ConnectivityError
+
+WIFI_SUBNET_POOL = '10.0.0.0/16'
+WIFI_SUBNET_PREFIX = 24
+
+
+class SubnetPool:
+
+  def __init__(self, network, prefixlen):
+    self.network = ipaddress.ip_network(network)
+    self.prefixlen = prefixlen
+    self.__lock = Lock()
+    self.__in_use = set()
+
+  def allocate(self):
+    with self.__lock:
+      for subnet in self.network.subnets(new_prefix=self.prefixlen):
+        if subnet not in self.__in_use:
+          self.__in_use.add(subnet)
+          return subnet
+    raise ConnectivityError('no free /{} subnet left in {}'.format(
+        self.prefixlen, self.network))
+
+  def reserve(self, subnet):
+    subnet = ipaddress.ip_network(subnet)
+    if not subnet.subnet_of(self.network):
+      return subnet
+    with self.__lock:
+      self.__in_use.add(subnet)
+    return subnet
+
+  def release(self, subnet):
+    with self.__lock:
+      self.__in_use.discard(ipaddress.ip_network(subnet))
+
+  def in_use(self):
+    with self.__lock:
+      return sorted(self.__in_use)
+
+
+WiFiSubnets = SubnetPool(
+    os.environ.get('CIRQUE_WIFI_SUBNET_POOL', WIFI_SUBNET_POOL),
+    WIFI_SUBNET_PREFIX)
@@ -0,0 +1,195 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from cirque.common.exceptions import BluetoothError
+from cirque.connectivity import bluetoothhost
+from cirque.connectivity.bluetoothhost import BTVIRT, _BluetoothHost
+
+
+class FakeProcesses:
+
+  def __init__(self, sysfs):
+    self.sysfs = sysfs
+    self.started = []
+    self.next_index = 0
+    self.register = True
+
+  def popen(self, command, **kwargs):
+    process = mock.MagicMock()
+    process.pid = 1000 + len(self.started)
+    process.poll.return_value = None
+    self.started.append((command, process))
+    if command[0] == BTVIRT and self.register:
+      for _ in range(int(command[2][2:])):
+        os.mkdir(os.path.join(self.sysfs, 'hci{}'.format(self.next_index)))
+        self.next_index += 1
+    return process
+
+  def commands(self):
+    return [command for command, _ in self.started]
+
+
+class TestBluetoothHost(unittest.TestCase):
+
+  def setUp(self):
+    sysfs = tempfile.mkdtemp()
+    os.mkdir(os.path.join(sysfs, 'hci0:64'))
+    self.processes = FakeProcesses(sysfs)
+    self.pid_dir = tempfile.mkdtemp()
+    patchers = [
+        mock.patch.object(bluetoothhost, 'HCI_SYSFS', sysfs),
+        mock.patch.object(bluetoothhost, 'PID_DIR', self.pid_dir),
+        mock.patch.object(bluetoothhost, 'DAEMON_TIMEOUT', 0.2),
+        mock.patch.object(bluetoothhost.subprocess, 'Popen',
+                          side_effect=self.processes.popen),
+        mock.patch.object(bluetoothhost.utils, 'host_run',
+                          return_value=mock.Mock(returncode=1)),
+    ]
+    for patcher in patchers:
+      patcher.start()
+      self.addCleanup(patcher.stop)
+    self.host = _BluetoothHost()
+
+  def test_controllers_are_created_from_demand(self):
+    self.host.reserve('home', 5)
+    self.assertEqual([self.host.acquire('home') for _ in range(5)],
+                     ['hci0', 'hci1', 'hci2', 'hci3', 'hci4'])
+    btvirts = [c for c in self.processes.commands() if c[0] == BTVIRT]
+    self.assertEqual(btvirts, [[BTVIRT, '-L', '-l5']])
+
+  def test_concurrent_devices_get_distinct_adapters(self):
+    adapters = []
+
+    def acquire():
+      adapters.append(self.host.acquire('home', 1))
+
+    threads = [threading.Thread(target=acquire) for _ in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(len(set(adapters)), 8)
+    self.assertEqual(
+        sum(1 for c in self.processes.commands() if c[0] != BTVIRT), 1)
+
+  def test_released_adapter_is_reused_and_last_release_stops_daemons(self):
+    first = self.host.acquire('home', 1)
+    second = self.host.acquire('home', 1)
+    self.host.release(first)
+    self.assertEqual(self.host.acquire('home', 1), first)
+    self.host.release(first)
+    self.host.release(second)
+    for _, process in self.processes.started:
+      process.send_signal.assert_called_once()
+    self.assertEqual(self.host.adapters, {})
+
+  def test_dead_btvirt_loses_its_adapters(self):
+    self.host.reserve('home', 2)
+    held = self.host.acquire('home')
+    self.processes.started[1][1].poll.return_value = 1
+    self.assertNotEqual(self.host.acquire('home'), 'hci1')
+    self.assertIn(held, self.host.adapters['home']['in_use'])
+
+  def test_btvirt_without_controllers(self):
+    self.processes.register = False
+    with self.assertRaises(BluetoothError):
+      self.host.acquire('home')
+
+  def test_homes_get_their_own_bus(self):
+    self.host.reserve('home0', 2)
+    self.host.reserve('home1', 2)
+    first = [self.host.acquire('home0') for _ in range(2)]
+    second = [self.host.acquire('home1') for _ in range(2)]
+    self.assertEqual(first, ['hci0', 'hci1'])
+    self.assertEqual(second, ['hci2', 'hci3'])
+    btvirts = [(c, p) for c, p in self.processes.started if c[0] == BTVIRT]
+    self.assertEqual(len(btvirts), 2)
+    for adapter in first:
+      self.host.release(adapter)
+    btvirts[0][1].send_signal.assert_called_once()
+    btvirts[1][1].send_signal.assert_not_called()
+    self.assertEqual(list(self.host.adapters), ['home1'])
+
+  def test_close_stops_reserved_bus(self):
+    self.host.reserve('home', 2)
+    self.host.close('home')
+    for _, process in self.processes.started:
+      process.send_signal.assert_called_once()
+    self.assertEqual(self.host.adapters, {})
+
+  def test_reserved_bus_keeps_bluetoothd(self):
+    self.host.reserve('homeA', 2)
+    self.host.release(self.host.acquire('homeB'))
+    self.assertEqual(self.host.acquire('homeA'), 'hci0')
+    bluetoothd, btvirt = self.processes.started[:2]
+    bluetoothd[1].send_signal.assert_not_called()
+    btvirt[1].send_signal.assert_not_called()
+    self.assertEqual(
+        sum(1 for c in self.processes.commands() if c[0] != BTVIRT), 1)
+    self.assertFalse(
+        any('killall' in str(call)
+            for call in bluetoothhost.utils.host_run.call_args_list))
+
+  def test_only_recorded_stale_daemons_are_stopped(self):
+    with open(bluetoothhost.pid_file(), 'w') as pids:
+      pids.write('42\n43\n')
+    running = {42}
+    with mock.patch.object(bluetoothhost, 'is_daemon',
+                           side_effect=lambda pid: pid in running), \
+        mock.patch.object(bluetoothhost.os, 'kill',
+                          side_effect=lambda pid, _: running.discard(pid)) \
+        as kill:
+      self.host.acquire('home')
+    kill.assert_called_once_with(42, bluetoothhost.signal.SIGTERM)
+    with open(bluetoothhost.pid_file()) as pids:
+      self.assertEqual(sorted(pids.read().split()), ['1000', '1001'])
+
+  def test_restored_adapters_keep_their_daemons(self):
+    os.mkdir(os.path.join(self.processes.sysfs, 'hci0'))
+    self.processes.next_index = 1
+    with open(bluetoothhost.pid_file(), 'w') as pids:
+      pids.write('42\n43\n44\n')
+    running = {42, 43, 44}
+    with mock.patch.object(bluetoothhost, 'is_daemon',
+                           side_effect=lambda pid: pid in running), \
+        mock.patch.object(bluetoothhost.os, 'kill',
+                          side_effect=lambda pid, _: running.discard(pid)) \
+        as kill:
+      self.assertTrue(self.host.adopt('home0', 'hci0', 43, 42))
+      self.assertEqual(self.host.daemon_pids('hci0'), (43, 42))
+      self.assertEqual(self.host.acquire('home1'), 'hci1')
+      kill.assert_called_once_with(44, bluetoothhost.signal.SIGTERM)
+      self.host.release('hci0')
+    kill.assert_called_with(43, bluetoothhost.signal.SIGTERM)
+    self.assertEqual(self.processes.commands(), [[BTVIRT, '-L', '-l2']])
+    self.assertEqual(running, {42})
+
+  def test_bluetoothd_owning_bluez_is_used(self):
+    bluetoothhost.utils.host_run.return_value = mock.Mock(
+        returncode=0, stdout=b'method return\n   boolean true\n')
+    self.host.acquire('home')
+    self.host.acquire('home')
+    self.assertEqual(self.processes.commands(), [[BTVIRT, '-L', '-l2']])
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestBluetoothHost)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,195 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import errno
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from pyroute2.netlink.exceptions import NetlinkError
+
+from cirque.common.exceptions import PHYDeviceError
+from cirque.common.utils import Return
+from cirque.connectivity import hwsim
+
+
+class FakeSysfs:
+
+  def __init__(self, path):
+    self.path = path
+    self.interfaces = 0
+
+  def add(self, phy):
+    self.interfaces += 1
+    os.makedirs(
+        os.path.join(self.path, phy, 'device', 'net',
+                     'wlan{}'.format(self.interfaces)))
+
+  def remove(self, phy):
+    shutil.rmtree(os.path.join(self.path, phy), ignore_errors=True)
+
+
+class TestRadios(unittest.TestCase):
+
+  def setUp(self):
+    self.sysfs = FakeSysfs(tempfile.mkdtemp())
+    self.addCleanup(shutil.rmtree, self.sysfs.path)
+    for patcher in (mock.patch.object(hwsim, 'PHY_SYSFS', self.sysfs.path),
+                    mock.patch('cirque.common.utils.host_run')):
+      patcher.start()
+      self.addCleanup(patcher.stop)
+    hwsim.utils.host_run.return_value = Return(0, b'', b'')
+    patcher = mock.patch.object(hwsim, 'HwsimSocket')
+    self.socket = patcher.start()
+    self.addCleanup(patcher.stop)
+    self.requests = []
+    self.socket.return_value.__enter__.return_value.radio_request = \
+        self.__radio_request
+    self.radios = hwsim._Radios()
+    self.radios.spares = 1
+
+  def __radio_request(self, cmd, name):
+    self.requests.append((cmd, name))
+    if cmd == hwsim.HWSIM_CMD_NEW_RADIO:
+      self.sysfs.add(name)
+    else:
+      self.sysfs.remove(name)
+
+  def test_radios_are_created_on_demand(self):
+    phys = [self.radios.allocate() for _ in range(20)]
+    self.assertEqual(len(set(phys)), 20)
+    self.assertEqual(self.radios.in_use(), sorted(phys))
+    self.assertEqual(hwsim.interface_of(phys[0]), 'wlan1')
+
+  def test_released_radio_is_kept_as_spare(self):
+    first = self.radios.allocate()
+    second = self.radios.allocate()
+    self.radios.release(first)
+    self.radios.release(second)
+    self.assertEqual(self.radios.spare(), [first])
+    self.assertEqual(self.requests[-1], (hwsim.HWSIM_CMD_DEL_RADIO, second))
+    self.assertEqual(self.radios.allocate(), first)
+    self.assertEqual(len(self.requests), 3)
+
+  def test_spare_lost_in_a_namespace_is_replaced(self):
+    phy = self.radios.allocate()
+    self.radios.release(phy)
+    # the phy is still in the namespace of a container.
+    self.sysfs.remove(phy)
+    self.assertNotEqual(self.radios.allocate(), phy)
+    self.assertIn((hwsim.HWSIM_CMD_DEL_RADIO, phy), self.requests)
+
+  @mock.patch.object(hwsim, 'NetlinkHandles')
+  @mock.patch.object(hwsim, 'netns')
+  def test_radios_of_a_home_share_a_medium(self, netns, handles):
+    first = self.radios.allocate('home0')
+    second = self.radios.allocate('home0')
+    netns.create.assert_called_with('cirque-medium-home0')
+    # the first socket only probes for the hwsim family.
+    self.assertEqual(self.socket.call_args_list[1:],
+                     [mock.call('cirque-medium-home0')] * 2)
+    handles.move_phy.assert_called_with(
+        second, None, source='cirque-medium-home0')
+    self.radios.release(first)
+    self.assertEqual(self.radios.spare('home0'), [first])
+    self.assertEqual(self.radios.spare(), [])
+
+  @mock.patch.object(hwsim, 'NetlinkHandles')
+  @mock.patch.object(hwsim, 'netns')
+  def test_close_medium_deletes_its_spares(self, netns, handles):
+    phy = self.radios.allocate('home0')
+    self.radios.release(phy)
+    self.radios.close_medium('home0')
+    self.assertEqual(self.requests[-1], (hwsim.HWSIM_CMD_DEL_RADIO, phy))
+    self.assertEqual(self.radios.spare('home0'), [])
+
+  def test_concurrent_allocations_do_not_collide(self):
+    phys = []
+    threads = [
+        threading.Thread(target=lambda: phys.append(self.radios.allocate()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(len(set(phys)), 8)
+
+  def test_fallback_to_preloaded_radios(self):
+    self.socket.side_effect = NetlinkError(2)
+    for index in range(2):
+      self.sysfs.add('phy{}'.format(index))
+    self.assertFalse(self.radios.dynamic)
+    phys = {self.radios.allocate(), self.radios.allocate()}
+    self.assertEqual(phys, {'phy0', 'phy1'})
+    with self.assertRaises(PHYDeviceError):
+      self.radios.allocate()
+    self.radios.release('phy1')
+    self.assertEqual(self.radios.allocate(), 'phy1')
+
+
+class FakeHwsimSocket(hwsim.HwsimSocket):
+
+  prid = 0x20
+
+  def __init__(self, request):
+    self.nlm_request = mock.Mock(side_effect=request)
+
+
+class TestHwsimSocket(unittest.TestCase):
+
+  def setUp(self):
+    self.radios = set()
+    self.hwsim = FakeHwsimSocket(self.__request)
+    self.error = None
+
+  def __request(self, msg, msg_type, msg_flags):
+    if msg['cmd'] == hwsim.HWSIM_CMD_GET_RADIO:
+      radios = []
+      for name in sorted(self.radios):
+        radio = hwsim.hwsimmsg()
+        radio['attrs'] = [('HWSIM_ATTR_RADIO_NAME', name)]
+        radios.append(radio)
+      return radios
+    if self.error is None:
+      self.radios.add(msg.get_attr('HWSIM_ATTR_RADIO_NAME'))
+    raise NetlinkError(self.error or 3)
+
+  def test_radio_index_ack_is_not_an_error(self):
+    self.hwsim.radio_request(hwsim.HWSIM_CMD_NEW_RADIO, 'cirque0')
+    self.assertEqual(self.radios, {'cirque0'})
+
+  def test_new_radio_errors_are_raised(self):
+    self.error = 12
+    with self.assertRaises(NetlinkError) as raised:
+      self.hwsim.radio_request(hwsim.HWSIM_CMD_NEW_RADIO, 'cirque0')
+    self.assertEqual(raised.exception.code, 12)
+
+  def test_existing_radio_is_an_error(self):
+    self.radios.add('cirque0')
+    with self.assertRaises(NetlinkError) as raised:
+      self.hwsim.radio_request(hwsim.HWSIM_CMD_NEW_RADIO, 'cirque0')
+    self.assertEqual(raised.exception.code, errno.EEXIST)
+    self.assertEqual(self.hwsim.nlm_request.call_count, 1)
+
+
+if __name__ == '__main__':
+  suite = unittest.TestSuite()
+  for case in (TestRadios, TestHwsimSocket):
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(case))
+  unittest.TextTestRunner(verbosity=2).run(suite)
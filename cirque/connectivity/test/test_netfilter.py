@@ -0,0 +1,193 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+from unittest import mock
+
+from cirque.common.utils import Return, host_run
+from cirque.connectivity.netfilter import _Netfilter, owner_of
+
+LAN_RULES = [
+    ('172.18.0.0/16', '172.18.0.0/16', 'DROP'),
+    ('172.18.0.1', '172.18.0.0/16', 'ACCEPT'),
+    ('172.18.0.0/16', '172.18.0.1', 'ACCEPT'),
+]
+GRANT_RULES = [
+    ('172.18.0.2', '172.18.0.0/16', 'ACCEPT'),
+    ('172.18.0.0/16', '172.18.0.2', 'ACCEPT'),
+]
+
+
+class TestNetfilter(unittest.TestCase):
+
+  def setUp(self):
+    patcher = mock.patch('cirque.connectivity.netfilter.host_run')
+    self.host_run = patcher.start()
+    self.addCleanup(patcher.stop)
+    self.host_run.return_value = Return(0, b'', b'')
+    self.netfilter = _Netfilter('iptables')
+
+  def __transactions(self):
+    return [
+        call.kwargs['input'].decode()
+        for call in self.host_run.call_args_list
+        if 'input' in call.kwargs
+    ]
+
+  def test_chain_detection_is_cached(self):
+    self.netfilter.add_rules('home0', LAN_RULES)
+    self.netfilter.add_rules(owner_of('home0', 'node0'), GRANT_RULES)
+    chain_probes = [
+        call for call in self.host_run.call_args_list
+        if call.args[1][0] == 'iptables'
+    ]
+    self.assertEqual(len(chain_probes), 1)
+
+  def test_fallback_chain(self):
+    self.host_run.side_effect = [Return(1, b'', b'No chain'),
+                                 Return(0, b'', b'')]
+    self.netfilter.add_rules('home0', LAN_RULES)
+    self.assertEqual(self.netfilter.backend.chain, 'INPUT')
+
+  def test_rules_are_added_in_one_transaction(self):
+    self.netfilter.add_rules('home0', LAN_RULES)
+    self.assertEqual(self.__transactions(), [
+        '*filter\n'
+        '-I DOCKER-USER -s 172.18.0.0/16 -d 172.18.0.0/16 -j DROP\n'
+        '-I DOCKER-USER -s 172.18.0.1 -d 172.18.0.0/16 -j ACCEPT\n'
+        '-I DOCKER-USER -s 172.18.0.0/16 -d 172.18.0.1 -j ACCEPT\n'
+        'COMMIT\n'
+    ])
+    self.assertEqual(self.netfilter.owned_rules('home0'), LAN_RULES)
+
+  def test_lan_rules(self):
+    self.assertEqual(
+        self.netfilter.lan_rules('172.18.0.0/16', '172.18.0.1'), LAN_RULES)
+    self.assertEqual(
+        self.netfilter.access_rules('172.18.0.2', '172.18.0.0/16'),
+        GRANT_RULES)
+
+  def test_failed_transaction_is_not_indexed(self):
+    self.host_run.side_effect = [Return(0, b'', b''),
+                                 Return(1, b'', b'error')]
+    self.assertFalse(self.netfilter.add_rules('home0', LAN_RULES))
+    self.assertEqual(self.netfilter.owned_rules(), {})
+
+  def test_only_owned_rules_are_removed(self):
+    self.netfilter.add_rules('home0', LAN_RULES)
+    self.netfilter.remove_rules('home0', LAN_RULES[:1] + GRANT_RULES)
+    self.assertIn('-D DOCKER-USER -s 172.18.0.0/16 -d 172.18.0.0/16 -j DROP',
+                  self.__transactions()[-1])
+    self.assertNotIn('172.18.0.2', self.__transactions()[-1])
+    self.assertEqual(self.netfilter.owned_rules('home0'), LAN_RULES[1:])
+
+  def test_release_removes_a_home_in_one_shot(self):
+    self.netfilter.add_rules('home0', LAN_RULES)
+    self.netfilter.add_rules(owner_of('home0', 'node0'), GRANT_RULES)
+    self.netfilter.add_rules('home01', LAN_RULES)
+    self.host_run.reset_mock()
+    self.netfilter.release('home0')
+    self.assertEqual(len(self.__transactions()), 1)
+    self.assertEqual(self.__transactions()[0].count('-D DOCKER-USER'), 5)
+    self.assertEqual(list(self.netfilter.owned_rules()), ['home01'])
+
+  def test_delete_falls_back_to_single_rules(self):
+    self.netfilter.adopt('home0', LAN_RULES)
+    self.host_run.side_effect = [Return(0, b'', b''),
+                                 Return(1, b'', b'Bad rule')] + \
+        [Return(0, b'', b'')] * 3
+    self.netfilter.remove_rules('home0')
+    self.assertEqual(self.host_run.call_count, 5)
+    self.assertEqual(self.host_run.call_args_list[-1].args[1], [
+        'iptables', '-D', 'DOCKER-USER', '-s', '172.18.0.0/16', '-d',
+        '172.18.0.1', '-j', 'ACCEPT'
+    ])
+
+  def test_host_run_input(self):
+    logger = logging.getLogger('test_netfilter')
+    self.assertEqual(host_run(logger, 'cat', input=b'rules').stdout, b'rules')
+    self.assertEqual(
+        host_run(logger, 'cat | tr a-z A-Z', input=b'rules').stdout, b'RULES')
+
+
+class TestNftNetfilter(unittest.TestCase):
+
+  def setUp(self):
+    patcher = mock.patch('cirque.connectivity.netfilter.host_run')
+    self.host_run = patcher.start()
+    self.addCleanup(patcher.stop)
+    self.host_run.return_value = Return(0, b'', b'')
+    self.netfilter = _Netfilter('nft')
+
+  def __batches(self):
+    return [
+        call.kwargs['input'].decode()
+        for call in self.host_run.call_args_list
+        if 'input' in call.kwargs
+    ]
+
+  def test_ruleset_is_created_once(self):
+    self.host_run.side_effect = [Return(1, b'', b'No such chain')] + \
+        [Return(0, b'', b'')] * 3
+    self.netfilter.add_rules(
+        'home0', self.netfilter.lan_rules('172.18.0.0/16', '172.18.0.1'))
+    self.netfilter.add_rules(
+        'home1', self.netfilter.lan_rules('172.19.0.0/16', '172.19.0.1'))
+    batches = self.__batches()
+    self.assertEqual(len(batches), 3)
+    self.assertIn('chain forward', batches[0])
+    self.assertNotIn('chain forward', batches[2])
+
+  def test_rule_count_is_constant(self):
+    for index in range(100):
+      subnet = '10.{}.0.0/16'.format(index)
+      self.netfilter.add_rules(
+          'home{}'.format(index),
+          self.netfilter.lan_rules(subnet, '10.{}.0.1'.format(index)))
+    self.assertEqual(self.host_run.call_count, 101)
+    self.assertTrue(
+        all('chain' not in batch for batch in self.__batches()))
+
+  def test_lan_access_is_a_set_element(self):
+    rules = self.netfilter.access_rules('172.18.0.2', '172.18.0.0/16')
+    self.netfilter.add_rules(owner_of('home0', 'node0'), rules)
+    self.assertEqual(
+        self.__batches()[-1],
+        'add element ip cirque allowed { 172.18.0.2 . 172.18.0.0/16 }\n'
+        'add element ip cirque allowed { 172.18.0.0/16 . 172.18.0.2 }\n')
+
+  def test_release_deletes_elements_in_one_batch(self):
+    self.netfilter.add_rules(
+        'home0', self.netfilter.lan_rules('172.18.0.0/16', '172.18.0.1'))
+    self.netfilter.add_rules(
+        owner_of('home0', 'node0'),
+        self.netfilter.access_rules('172.18.0.2', '172.18.0.0/16'))
+    self.host_run.reset_mock()
+    self.netfilter.release('home0')
+    self.assertEqual(self.__batches(), [
+        'delete element ip cirque isolated '
+        '{ 172.18.0.0/16 . 172.18.0.0/16 }\n'
+        'delete element ip cirque gateways { 172.18.0.1 }\n'
+        'delete element ip cirque allowed { 172.18.0.2 . 172.18.0.0/16 }\n'
+        'delete element ip cirque allowed { 172.18.0.0/16 . 172.18.0.2 }\n'
+    ])
+    self.assertEqual(self.netfilter.owned_rules(), {})
+
+
+if __name__ == '__main__':
+  suite = unittest.TestSuite()
+  for case in (TestNetfilter, TestNftNetfilter):
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(case))
+  unittest.TextTestRunner(verbosity=2).run(suite)
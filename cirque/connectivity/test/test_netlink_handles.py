@@ -0,0 +1,80 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+from unittest import mock
+
+from cirque.connectivity import netlinkhandles
+from cirque.connectivity.netlinkhandles import _NetlinkHandles
+
+
+def wiphy(index, name):
+  msg = mock.Mock()
+  msg.get_attr.side_effect = {
+      'NL80211_ATTR_WIPHY': index,
+      'NL80211_ATTR_WIPHY_NAME': name,
+  }.get
+  return msg
+
+
+class TestNetlinkHandles(unittest.TestCase):
+
+  def setUp(self):
+    for name in ('IW', 'IPRoute'):
+      patcher = mock.patch.object(netlinkhandles, name)
+      setattr(self, name, patcher.start())
+      self.addCleanup(patcher.stop)
+    self.handles = _NetlinkHandles()
+
+  def test_handles_are_cached_per_namespace(self):
+    with self.handles.ipr('node0') as first:
+      pass
+    with self.handles.ipr('node0') as second:
+      pass
+    with self.handles.ipr() as host:
+      pass
+    self.assertIs(first, second)
+    self.assertEqual(self.IPRoute.call_args_list,
+                     [mock.call(netns='node0'), mock.call()])
+
+  def test_close_drops_the_namespace_handles(self):
+    with self.handles.ipr('node0'), self.handles.iw('node0'), \
+        self.handles.iw('node1'):
+      pass
+    self.handles.close('node0')
+    self.assertEqual(self.IPRoute.return_value.close.call_count, 1)
+    self.assertEqual(self.IW.return_value.close.call_count, 1)
+    with self.handles.ipr('node0'):
+      pass
+    self.assertEqual(self.IPRoute.call_count, 2)
+
+  @mock.patch.object(netlinkhandles, 'open', create=True)
+  def test_move_phy(self, open_netns):
+    iw = self.IW.return_value
+    iw.list_wiphy.return_value = [wiphy(3, 'cirque0'), wiphy(4, 'cirque1')]
+    netns = open_netns.return_value.__enter__.return_value
+    self.assertTrue(self.handles.move_phy('cirque1', 'node0'))
+    open_netns.assert_called_with('/var/run/netns/node0')
+    iw.set_wiphy_netns_by_fd.assert_called_with(4, netns.fileno())
+    self.assertFalse(
+        self.handles.move_phy('cirque2', None, source='medium'))
+    open_netns.assert_called_with(netlinkhandles.HOST_NETNS)
+    self.assertEqual(self.IW.call_args_list,
+                     [mock.call(), mock.call(netns='medium')])
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestNetlinkHandles)
+  unittest.TextTestRunner(verbosity=2).run(suite)
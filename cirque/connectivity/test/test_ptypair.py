@@ -0,0 +1,56 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import unittest
+from unittest import mock
+
+from cirque.connectivity import ptypair
+from cirque.connectivity.ptypair import PtyPair, open_pipe_pair
+
+
+class TestPtyPair(unittest.TestCase):
+
+  def setUp(self):
+    self.pair = PtyPair()
+    self.pair.open()
+    self.addCleanup(self.pair.close)
+
+  def test_frames_pass_through_unchanged(self):
+    radio = self.pair.radio_fd()
+    user = os.open(self.pair.pipe0, os.O_RDWR | os.O_NOCTTY)
+    try:
+      os.write(radio, b'\x7e\x81\n\x03\r')
+      self.assertEqual(os.read(user, 16), b'\x7e\x81\n\x03\r')
+      os.write(user, b'\x7e\x00\n\x7e')
+      self.assertEqual(os.read(radio, 16), b'\x7e\x00\n\x7e')
+    finally:
+      os.close(user)
+      os.close(radio)
+
+  def test_no_process_is_spawned(self):
+    self.assertTrue(self.pair.pipe0.startswith('/dev/pts/'))
+    self.assertEqual(self.pair.pids, [])
+
+  def test_falls_back_to_socat(self):
+    with mock.patch.object(ptypair.os, 'openpty', side_effect=OSError), \
+        mock.patch.object(ptypair, 'SocatPipePair') as socat:
+      self.assertIs(open_pipe_pair(), socat.return_value)
+    socat.return_value.open.assert_called_once_with()
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestPtyPair)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,167 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import socket
+import unittest
+from unittest import mock
+
+from cirque.connectivity import radiomedium
+from cirque.connectivity.radiomedium import (
+    EVENT_ALARM_FIRED,
+    EVENT_HEADER,
+    EVENT_RADIO_RECEIVED,
+    NeighborTable,
+    RadioMedium,
+    VirtualClock,
+)
+
+
+def event(kind, data=b'', delay=0):
+  return EVENT_HEADER.pack(delay, kind, len(data)) + data
+
+
+class TestNeighborTable(unittest.TestCase):
+
+  def test_everyone_hears_everyone_by_default(self):
+    table = NeighborTable()
+    self.assertEqual(table.receivers(1, [1, 2, 3]), [(2, 0.0), (3, 0.0)])
+
+  def test_link_settings(self):
+    table = NeighborTable()
+    table.set_link(1, 3, rssi=-110)
+    table.set_link(1, 2, loss=0.25)
+    self.assertEqual(table.receivers(1, [1, 2, 3]), [(2, 0.25)])
+    self.assertEqual(table.link(1, 2), {'rssi': -20, 'loss': 0.25})
+    self.assertEqual(table.link(2, 1), {'rssi': -20, 'loss': 0.0})
+    with self.assertRaises(ValueError):
+      table.set_link(1, 2, loss=2)
+    with self.assertRaises(ValueError):
+      table.set_link(1, 34)
+
+
+class TestVirtualClock(unittest.TestCase):
+
+  def test_unthrottled_clock_jumps_to_events(self):
+    clock = VirtualClock(0)
+    self.assertEqual(clock.now(), 0)
+    self.assertTrue(clock.advance(5000))
+    self.assertEqual(clock.now(), 5000)
+    self.assertFalse(clock.advance(None))
+    self.assertIsNone(clock.wall_delay(6000))
+
+  def test_paused_clock_only_moves_by_steps(self):
+    clock = VirtualClock(0)
+    clock.pause()
+    self.assertFalse(clock.advance(5000))
+    clock.step(3000)
+    self.assertTrue(clock.advance(1000))
+    self.assertTrue(clock.advance(5000))
+    self.assertFalse(clock.advance(5000))
+    self.assertEqual(clock.state(), {
+        'now_us': 3000,
+        'speed': 0,
+        'paused': True
+    })
+    clock.resume()
+    with self.assertRaises(ValueError):
+      clock.step(1000)
+
+  def test_speed_scales_wall_time(self):
+    clock = VirtualClock(4)
+    self.assertAlmostEqual(clock.wall_delay(clock.now() + 4000000), 1, 1)
+
+
+class TestRadioMedium(unittest.TestCase):
+
+  def setUp(self):
+    self.medium = RadioMedium(0)
+    patcher = mock.patch.object(self.medium, 'now', return_value=0)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    for node_id in (1, 2, 3):
+      self.medium.add_node(node_id)
+
+  def test_frames_reach_nodes_in_range(self):
+    self.medium.table.set_link(1, 3, rssi=-110)
+    self.medium.handle(event(EVENT_RADIO_RECEIVED, b'\x0bframe', 100), 1)
+    self.assertEqual(self.medium.due_events(99), [])
+    self.assertEqual(self.medium.due_events(100),
+                     [(2, event(EVENT_RADIO_RECEIVED, b'\x0bframe', 100))])
+
+  def test_lossy_link_drops_frames(self):
+    self.medium.table.set_link(1, 2, loss=1.0)
+    self.medium.handle(event(EVENT_RADIO_RECEIVED, b'\x0b'), 1)
+    self.assertEqual([node for node, _ in self.medium.due_events(0)], [3])
+    self.assertEqual(self.medium.stats, {
+        'transmitted': 1,
+        'delivered': 1,
+        'lost': 1
+    })
+
+  def test_newer_alarm_replaces_pending_one(self):
+    self.medium.handle(event(EVENT_ALARM_FIRED, delay=1000), 1)
+    self.medium.handle(event(EVENT_ALARM_FIRED, delay=5000), 1)
+    self.assertEqual(self.medium.due_events(1000), [])
+    self.assertEqual(self.medium.due_events(5000),
+                     [(1, event(EVENT_ALARM_FIRED, delay=5000))])
+    # the node's clock moved with the alarm.
+    self.medium.handle(event(EVENT_ALARM_FIRED, delay=10), 1)
+    self.assertEqual(self.medium.due_events(5010),
+                     [(1, event(EVENT_ALARM_FIRED, delay=10))])
+
+
+class TestRadioMediumSocket(unittest.TestCase):
+
+  def test_relays_between_node_ports(self):
+    medium = RadioMedium(700)
+    medium.open()
+    self.addCleanup(medium.close)
+    nodes = {}
+    for node_id in (1, 2):
+      nodes[node_id] = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+      nodes[node_id].bind(('127.0.0.1', medium.port + node_id))
+      nodes[node_id].settimeout(2)
+      self.addCleanup(nodes[node_id].close)
+      medium.add_node(node_id)
+    nodes[1].sendto(
+        event(EVENT_RADIO_RECEIVED, b'\x0bframe'), ('127.0.0.1', medium.port))
+    data = nodes[2].recv(1024)
+    self.assertEqual(data[EVENT_HEADER.size:], b'\x0bframe')
+    self.assertEqual(radiomedium.EVENT_HEADER.unpack_from(data)[1],
+                     EVENT_RADIO_RECEIVED)
+
+  def test_unthrottled_medium_skips_idle_time(self):
+    medium = RadioMedium(701, speed=0)
+    medium.open()
+    self.addCleanup(medium.close)
+    node = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    node.bind(('127.0.0.1', medium.port + 1))
+    node.settimeout(2)
+    self.addCleanup(node.close)
+    medium.add_node(1)
+    # an hour of sleep is over as soon as the node asks for it.
+    node.sendto(event(EVENT_ALARM_FIRED, delay=3600 * 10**6),
+                ('127.0.0.1', medium.port))
+    self.assertEqual(node.recv(1024),
+                     event(EVENT_ALARM_FIRED, delay=3600 * 10**6))
+    self.assertEqual(medium.clock.now(), 3600 * 10**6)
+
+
+if __name__ == '__main__':
+  suite = unittest.TestSuite()
+  for case in (TestNeighborTable, TestVirtualClock, TestRadioMedium,
+               TestRadioMediumSocket):
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(case))
+  unittest.TextTestRunner(verbosity=2).run(suite)
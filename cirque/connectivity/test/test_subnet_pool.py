@@ -0,0 +1,50 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import ipaddress
+import unittest
+
+from cirque.common.exceptions import ConnectivityError
+from cirque.connectivity.subnetpool import SubnetPool
+
+
+class TestSubnetPool(unittest.TestCase):
+
+  def setUp(self):
+    self.pool = SubnetPool('10.0.0.0/22', 24)
+
+  def test_allocations_do_not_collide(self):
+    subnets = [self.pool.allocate() for _ in range(4)]
+    self.assertEqual(len(set(subnets)), 4)
+    with self.assertRaises(ConnectivityError):
+      self.pool.allocate()
+
+  def test_released_subnet_is_handed_out_again(self):
+    first = self.pool.allocate()
+    self.pool.allocate()
+    self.pool.release(first)
+    self.assertEqual(self.pool.allocate(), first)
+
+  def test_reserved_subnet_is_skipped(self):
+    self.pool.reserve('10.0.0.0/24')
+    self.assertEqual(self.pool.allocate(),
+                     ipaddress.ip_network('10.0.1.0/24'))
+    self.pool.reserve('192.168.0.0/24')
+    self.assertEqual(len(self.pool.in_use()), 2)
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestSubnetPool)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,70 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import socket
+import unittest
+
+from cirque.common.exceptions import ConnectivityError
+from cirque.connectivity.threadallocator import (SIM_PORT_BASE, ThreadLease,
+                                                 _ThreadAllocator)
+
+
+class TestThreadAllocator(unittest.TestCase):
+
+  def setUp(self):
+    self.allocator = _ThreadAllocator()
+
+  def test_node_ids_are_recycled(self):
+    leases = self.allocator.lease_many(('home', 0), 3)
+    self.assertEqual([lease.node_id for lease in leases], [1, 2, 3])
+    self.allocator.release(leases[1])
+    self.assertEqual(self.allocator.lease(('home', 0)).node_id, 2)
+    with self.assertRaises(ConnectivityError):
+      self.allocator.lease(('home', 0), node_id=3)
+
+  def test_petitions_get_disjoint_port_windows(self):
+    first = self.allocator.lease(('home0', 0))
+    second = self.allocator.lease(('home1', 0))
+    self.assertNotEqual(first.petition_id, second.petition_id)
+    self.assertGreaterEqual(second.port_offset,
+                            first.port_offset + first.window)
+    self.allocator.close('home0')
+    third = self.allocator.lease(('home2', 0))
+    self.assertEqual((third.petition_id, third.port_offset),
+                     (first.petition_id, first.port_offset))
+
+  def test_windows_with_busy_ports_are_skipped(self):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+      sock.bind(('127.0.0.1', SIM_PORT_BASE + 5))
+      lease = self.allocator.lease(('home', 0))
+    self.assertGreater(lease.port_offset, 5)
+
+  def test_wide_networks(self):
+    leases = self.allocator.lease_many(('home', 0), 100, network_size=100)
+    self.assertEqual(leases[-1].node_id, 100)
+    self.assertEqual(leases[-1].window, 101)
+    with self.assertRaises(ConnectivityError):
+      self.allocator.lease(('home', 0))
+
+  def test_last_release_frees_the_petition(self):
+    self.allocator.restore(('home', 1), ThreadLease(7, 4, 340, 34))
+    self.assertEqual(self.allocator.leases(), {('home', 1): [4]})
+    self.allocator.release(ThreadLease(7, 4, 340, 34))
+    self.assertEqual(self.allocator.leases(), {})
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestThreadAllocator)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,102 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import struct
+import tempfile
+import unittest
+
+from cirque.connectivity.radiomedium import (EVENT_HEADER,
+                                             EVENT_RADIO_RECEIVED,
+                                             RadioMedium)
+from cirque.connectivity.threadcapture import (
+    BLOCK_CUSTOM_NO_COPY,
+    BLOCK_ENHANCED_PACKET,
+    BLOCK_SECTION_HEADER,
+    LINKTYPE_IEEE802_15_4_WITHFCS,
+    RingWriter,
+    ThreadTap,
+    capture_header,
+    keep_alive,
+)
+
+
+def blocks(data):
+  while data:
+    block_type, length = struct.unpack_from('<II', data)
+    yield block_type, data[8:length - 4]
+    data = data[length:]
+
+
+class TestThreadCapture(unittest.TestCase):
+
+  def test_capture_header(self):
+    (shb_type, shb), (idb_type, idb) = blocks(capture_header())
+    self.assertEqual(shb_type, BLOCK_SECTION_HEADER)
+    self.assertEqual(struct.unpack_from('<I', shb)[0], 0x1A2B3C4D)
+    self.assertEqual(idb_type, 1)
+    self.assertEqual(
+        struct.unpack_from('<H', idb)[0], LINKTYPE_IEEE802_15_4_WITHFCS)
+
+  def test_keep_alive_is_a_custom_block(self):
+    [(block_type, body)] = blocks(keep_alive())
+    self.assertEqual(block_type, BLOCK_CUSTOM_NO_COPY)
+    self.assertEqual(len(keep_alive()) % 4, 0)
+
+  def test_tap_filters_and_counts_drops(self):
+    tap = ThreadTap(nodes=[2], queue_size=2)
+    for timestamp in range(4):
+      tap.offer(2, (1 << 32) + timestamp, b'\x0b\x41\x88\x01')
+    tap.offer(3, 0, b'\x0b\x41\x88\x02')
+    tap.close()
+    packets = [block for block in tap.packets() if block is not None]
+    self.assertEqual(tap.stats, {'captured': 1, 'dropped': 3})
+    self.assertEqual(len(packets), 1)
+    [(block_type, body)] = blocks(packets[0])
+    self.assertEqual(block_type, BLOCK_ENHANCED_PACKET)
+    _, high, low, captured, _ = struct.unpack_from('<IIIII', body)
+    self.assertEqual(((high << 32) | low, captured), ((1 << 32) + 1, 3))
+    self.assertEqual(body[20:23], b'\x41\x88\x01')
+    self.assertIn(b'node 2 channel 11', body)
+
+  def test_ring_keeps_the_newest_files(self):
+    directory = tempfile.mkdtemp()
+    writer = RingWriter(directory, file_size=64, files=2)
+    for _ in range(5):
+      writer.write(b'\0' * 64)
+    writer.close()
+    self.assertEqual(sorted(os.listdir(directory)),
+                     ['capture-000004.pcapng', 'capture-000005.pcapng'])
+    self.assertEqual(writer.paths,
+                     [os.path.join(directory, name) for name in
+                      ('capture-000004.pcapng', 'capture-000005.pcapng')])
+    with open(writer.paths[0], 'rb') as f:
+      self.assertEqual(f.read(len(capture_header())), capture_header())
+
+  def test_medium_feeds_its_taps(self):
+    medium = RadioMedium(0)
+    tap = ThreadTap()
+    medium.add_tap(tap)
+    medium.handle(
+        EVENT_HEADER.pack(0, EVENT_RADIO_RECEIVED, 3) + b'\x0f\x41\x88', 4)
+    medium.close()
+    packets = list(tap.packets())
+    self.assertEqual(len(packets), 1)
+    self.assertIn(b'node 4 channel 15', packets[0])
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestThreadCapture)
+  unittest.TextTestRunner(verbosity=2).run(suite)
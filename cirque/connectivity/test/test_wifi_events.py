@@ -0,0 +1,128 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from cirque.capabilities.wificapability import WiFiCapability
+from cirque.common.exceptions import ConnectivityError
+from cirque.connectivity import wpactrl
+from cirque.connectivity.wifievents import WiFiEvents
+from cirque.connectivity.wpactrl import WpaCtrl, parse_event
+
+CONNECTED = '<3>CTRL-EVENT-CONNECTED - Connection to 02:00:00:00:01:00 ' \
+    'completed [id=0 id_str=]'
+
+
+class FakeWpaSupplicant:
+
+  def __init__(self, path):
+    self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    self.socket.bind(path)
+    self.commands = []
+    self.attached = []
+    self.thread = threading.Thread(target=self.serve, daemon=True)
+    self.thread.start()
+
+  def serve(self):
+    while True:
+      try:
+        command, client = self.socket.recvfrom(4096)
+      except OSError:
+        return
+      command = command.decode()
+      self.commands.append(command)
+      reply = 'OK'
+      if command == 'ATTACH':
+        self.attached.append(client)
+      elif command == 'ADD_NETWORK':
+        reply = '0'
+      self.socket.sendto(reply.encode(), client)
+      if command.startswith('SELECT_NETWORK'):
+        for attached in self.attached:
+          self.socket.sendto(CONNECTED.encode(), attached)
+
+  def close(self):
+    self.socket.close()
+
+
+class TestWiFiEvents(unittest.TestCase):
+
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.root)
+    self.path = os.path.join(self.root, 'wlan0')
+    self.daemon = FakeWpaSupplicant(self.path)
+    self.addCleanup(self.daemon.close)
+    patcher = mock.patch.object(
+        wpactrl, 'namespace_socket',
+        lambda namespace: socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM))
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    self.node = mock.Mock()
+    self.node.id = 'node0'
+    self.node.name = 'node0'
+    self.node.get_container_pid.return_value = os.getpid()
+    self.node.container.exec_run.return_value = mock.Mock(
+        exit_code=0, output=b'wlan0: leased 10.0.1.53 for 43200 seconds\n')
+
+  def test_parse_event(self):
+    self.assertEqual(
+        parse_event('<3>AP-STA-CONNECTED 02:00:00:00:00:00'),
+        ('AP-STA-CONNECTED', '02:00:00:00:00:00'))
+    self.assertIsNone(parse_event('OK\n'))
+
+  def test_request_skips_events(self):
+    ctrl = WpaCtrl(os.getpid(), self.path, 'node0')
+    self.addCleanup(ctrl.close)
+    ctrl.attach()
+    self.assertEqual(ctrl.request('SELECT_NETWORK 0'), 'OK')
+    self.assertEqual(ctrl.request('ADD_NETWORK'), '0')
+
+  def test_missing_socket(self):
+    with mock.patch.object(wpactrl, 'OPEN_TIMEOUT', 0.1):
+      with self.assertRaises(ConnectivityError):
+        WpaCtrl(os.getpid(), self.path + '.missing', 'node0')
+
+  def test_connect_waits_for_association_and_lease(self):
+    capability = WiFiCapability(medium='home0')
+    with mock.patch('cirque.capabilities.wificapability.WPA_SUPPLICANT_CTRL',
+                    self.path):
+      capability.watch_events(self.node, self.path)
+    self.addCleanup(capability.unwatch_events, self.node)
+    events = WiFiEvents.subscribe('home0')
+    self.addCleanup(WiFiEvents.unsubscribe, 'home0', events)
+    self.assertEqual(
+        capability.connect(self.node, 'wifiap-ABCDE', 'password', timeout=5),
+        {'ssid': 'wifiap-ABCDE', 'ipv4_addr': '10.0.1.53'})
+    self.assertIn('SET_NETWORK 0 ssid "wifiap-ABCDE"', self.daemon.commands)
+    received = [events.get(timeout=1)['event'] for _ in range(2)]
+    self.assertEqual(received, ['CTRL-EVENT-CONNECTED', 'DHCP-LEASED'])
+
+  def test_close_ends_the_home_streams(self):
+    events = WiFiEvents.subscribe('home1')
+    WiFiEvents.close('home1')
+    self.assertIsNone(events.get(timeout=1))
+    self.assertIsNone(WiFiEvents.wait(events, 'node0', 'X', timeout=0.1))
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestWiFiEvents)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,182 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import collections
+import os
+import socket
+from threading import Lock
+
+from cirque.common.exceptions import ConnectivityError
+from cirque.connectivity.radiomedium import SIM_PORT_BASE, THREAD_GROUP_SIZE
+
+MAX_PORT = 65535
+
+# port_offset is the PORT_OFFSET of the radios, a node binds
+# SIM_PORT_BASE + port_offset + node_id and the window covers the ports of
+# every node id of the petition plus the simulator port at node id 0.
+ThreadLease = collections.namedtuple(
+    'ThreadLease', ['petition_id', 'node_id', 'port_offset', 'window'])
+
+
+def port_in_use(port):
+  with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+    try:
+      sock.bind(('127.0.0.1', port))
+    except OSError:
+      return True
+  return False
+
+
+def recorded_lease(resources):
+  # records made before port windows were leased only hold the petition id.
+  return ThreadLease(
+      resources['petition_id'], resources['node_id'],
+      resources.get('port_offset',
+                    resources['petition_id'] * THREAD_GROUP_SIZE),
+      resources.get('window', THREAD_GROUP_SIZE))
+
+
+class _Petition:
+
+  def __init__(self, petition_id, port_offset, window):
+    self.petition_id = petition_id
+    self.port_offset = port_offset
+    self.window = window
+    self.nodes = set()
+
+  def lease(self, node_id):
+    return ThreadLease(self.petition_id, node_id, self.port_offset,
+                       self.window)
+
+
+class _ThreadAllocator:
+
+  def __init__(self):
+    # node ids past the OPENTHREAD_SIMULATION_MAX_NETWORK_SIZE the sim
+    # binaries were built with are rejected by the nodes, wider windows
+    # need rebuilt binaries.
+    self.network_size = int(
+        os.environ.get('CIRQUE_THREAD_NETWORK_SIZE', THREAD_GROUP_SIZE - 1))
+    self.__lock = Lock()
+    self.__petitions = {}
+
+  def __free_petition_id(self):
+    used = {petition.petition_id for petition in self.__petitions.values()}
+    return next(i for i in range(1, len(used) + 2) if i not in used)
+
+  def __free_port_offset(self, window):
+    windows = sorted((petition.port_offset, petition.window)
+                     for petition in self.__petitions.values())
+    offset = 0
+    while SIM_PORT_BASE + offset + window - 1 <= MAX_PORT:
+      overlap = next(((start, size) for start, size in windows
+                      if start < offset + window and offset < start + size),
+                     None)
+      if overlap is not None:
+        offset = overlap[0] + overlap[1]
+        continue
+      busy = next((port for port in range(SIM_PORT_BASE + offset,
+                                          SIM_PORT_BASE + offset + window)
+                   if port_in_use(port)), None)
+      if busy is None:
+        return offset
+      # something outside of cirque holds a port of this window.
+      offset = busy - SIM_PORT_BASE + 1
+    raise ConnectivityError(
+        'no free port window of {} for a thread petition'.format(window))
+
+  def __petition(self, key, network_size):
+    petition = self.__petitions.get(key)
+    if petition is None:
+      window = (network_size or self.network_size) + 1
+      petition = _Petition(self.__free_petition_id(),
+                           self.__free_port_offset(window), window)
+      self.__petitions[key] = petition
+    return petition
+
+  def lease(self, key, node_id=None, network_size=None):
+    return self.lease_many(key, 1, node_id, network_size)[0]
+
+  def lease_many(self, key, count, first_node_id=None, network_size=None):
+    with self.__lock:
+      petition = self.__petition(key, network_size)
+      try:
+        node_ids = self.__free_node_ids(petition, count, first_node_id)
+      except ConnectivityError:
+        if not petition.nodes:
+          del self.__petitions[key]
+        raise
+      petition.nodes.update(node_ids)
+      return [petition.lease(node_id) for node_id in node_ids]
+
+  @staticmethod
+  def __free_node_ids(petition, count, first_node_id):
+    if first_node_id is None:
+      node_ids = [
+          node_id for node_id in range(1, petition.window)
+          if node_id not in petition.nodes and
+          not port_in_use(SIM_PORT_BASE + petition.port_offset + node_id)
+      ][:count]
+      if len(node_ids) < count:
+        raise ConnectivityError(
+            'thread petition {} has no room for {} more nodes'.format(
+                petition.petition_id, count))
+      return node_ids
+    node_ids = list(range(first_node_id, first_node_id + count))
+    taken = [
+        node_id for node_id in node_ids
+        if node_id in petition.nodes or not 0 < node_id < petition.window or
+        port_in_use(SIM_PORT_BASE + petition.port_offset + node_id)
+    ]
+    if taken:
+      raise ConnectivityError(
+          'thread node ids {} of petition {} are not available'.format(
+              taken, petition.petition_id))
+    return node_ids
+
+  def restore(self, key, lease):
+    with self.__lock:
+      petition = self.__petitions.setdefault(
+          key, _Petition(lease.petition_id, lease.port_offset, lease.window))
+      petition.nodes.add(lease.node_id)
+
+  def release(self, lease):
+    with self.__lock:
+      for key, petition in list(self.__petitions.items()):
+        if petition.petition_id != lease.petition_id:
+          continue
+        petition.nodes.discard(lease.node_id)
+        if not petition.nodes:
+          del self.__petitions[key]
+
+  def close(self, home_id):
+    with self.__lock:
+      for key in [key for key in self.__petitions if key[0] == home_id]:
+        del self.__petitions[key]
+
+  def petition_id(self, key):
+    with self.__lock:
+      petition = self.__petitions.get(key)
+      return None if petition is None else petition.petition_id
+
+  def leases(self):
+    with self.__lock:
+      return {
+          key: sorted(petition.nodes)
+          for key, petition in self.__petitions.items()
+      }
+
+
+ThreadAllocator = _ThreadAllocator()
@@ -0,0 +1,214 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import queue
+import struct
+import threading
+
+from cirque.common.cirquelog import CirqueLog
+
+LINKTYPE_IEEE802_15_4_WITHFCS = 195
+CAPTURE_DIR = '/var/lib/cirque/captures'
+QUEUE_SIZE = 4096
+RING_FILE_SIZE = 1 << 20
+RING_FILES = 8
+
+BLOCK_SECTION_HEADER = 0x0A0D0D0A
+BLOCK_INTERFACE_DESCRIPTION = 0x00000001
+BLOCK_ENHANCED_PACKET = 0x00000006
+# a custom block which readers skip and must not copy.
+BLOCK_CUSTOM_NO_COPY = 0x40000BAD
+BYTE_ORDER_MAGIC = 0x1A2B3C4D
+OPT_END = 0
+OPT_COMMENT = 1
+OPT_IF_TSRESOL = 9
+
+
+def _pad(data):
+  return data + b'\0' * (-len(data) % 4)
+
+
+def _option(code, value):
+  return struct.pack('<HH', code, len(value)) + _pad(value)
+
+
+def _block(block_type, body):
+  length = 12 + len(body)
+  return struct.pack('<II', block_type, length) + body + \
+      struct.pack('<I', length)
+
+
+def section_header():
+  return _block(
+      BLOCK_SECTION_HEADER,
+      struct.pack('<IHHq', BYTE_ORDER_MAGIC, 1, 0, -1))
+
+
+def interface_description(linktype=LINKTYPE_IEEE802_15_4_WITHFCS):
+  # timestamps are in microseconds of the medium clock, virtual or not.
+  return _block(
+      BLOCK_INTERFACE_DESCRIPTION,
+      struct.pack('<HHI', linktype, 0, 0) +
+      _option(OPT_IF_TSRESOL, b'\x06') + _option(OPT_END, b''))
+
+
+def enhanced_packet(timestamp_us, frame, comment=None):
+  options = b''
+  if comment:
+    options = _option(OPT_COMMENT, comment.encode()) + _option(OPT_END, b'')
+  return _block(
+      BLOCK_ENHANCED_PACKET,
+      struct.pack('<IIIII', 0, timestamp_us >> 32, timestamp_us & 0xffffffff,
+                  len(frame), len(frame)) + _pad(frame) + options)
+
+
+def capture_header():
+  return section_header() + interface_description()
+
+
+def keep_alive():
+  # an empty custom block with no enterprise number, for streams which can
+  # only notice a gone reader by writing to it.
+  return _block(BLOCK_CUSTOM_NO_COPY, struct.pack('<I', 0))
+
+
+class ThreadTap:
+
+  def __init__(self, nodes=None, queue_size=QUEUE_SIZE):
+    self.nodes = None if not nodes else set(nodes)
+    self.captured = 0
+    self.dropped = 0
+    self.__queue = queue.Queue(maxsize=queue_size)
+
+  def offer(self, node_id, timestamp_us, message):
+    # called from the medium with each transmitted frame, it never blocks
+    # the radios: frames a slow reader did not take are counted and lost.
+    if self.nodes is not None and node_id not in self.nodes:
+      return
+    try:
+      self.__queue.put_nowait((node_id, timestamp_us, message))
+      self.captured += 1
+    except queue.Full:
+      self.dropped += 1
+
+  def close(self):
+    try:
+      self.__queue.put_nowait(None)
+    except queue.Full:
+      # the reader is gone or far behind, the oldest frame makes room.
+      self.__queue.get_nowait()
+      self.__queue.put_nowait(None)
+      self.captured -= 1
+      self.dropped += 1
+
+  def packets(self, timeout=None):
+    while True:
+      try:
+        item = self.__queue.get(timeout=timeout)
+      except queue.Empty:
+        yield None
+        continue
+      if item is None:
+        return
+      node_id, timestamp_us, message = item
+      if not message:
+        continue
+      # a sim radio message is the channel followed by the psdu.
+      yield enhanced_packet(timestamp_us, message[1:],
+                            'node {} channel {}'.format(node_id, message[0]))
+
+  @property
+  def stats(self):
+    return {'captured': self.captured, 'dropped': self.dropped}
+
+
+class RingWriter:
+
+  def __init__(self, directory, file_size=RING_FILE_SIZE, files=RING_FILES):
+    self.directory = directory
+    self.file_size = file_size
+    self.files = files
+    self.__index = 0
+    self.__file = None
+    os.makedirs(directory, exist_ok=True)
+
+  def __path(self, index):
+    return os.path.join(self.directory, 'capture-{:06d}.pcapng'.format(index))
+
+  def __rotate(self):
+    if self.__file is not None:
+      self.__file.close()
+    self.__index += 1
+    self.__file = open(self.__path(self.__index), 'wb')
+    self.__file.write(capture_header())
+    stale = self.__path(self.__index - self.files)
+    if os.path.exists(stale):
+      os.unlink(stale)
+
+  def write(self, block):
+    if self.__file is None or self.__file.tell() >= self.file_size:
+      self.__rotate()
+    self.__file.write(block)
+
+  def flush(self):
+    if self.__file is not None:
+      self.__file.flush()
+
+  def close(self):
+    if self.__file is not None:
+      self.__file.close()
+      self.__file = None
+
+  @property
+  def paths(self):
+    return [
+        self.__path(index)
+        for index in range(max(1, self.__index - self.files + 1),
+                           self.__index + 1)
+    ]
+
+
+class ThreadRecording:
+
+  def __init__(self, medium, writer, nodes=None):
+    self.logger = CirqueLog.get_cirque_logger('threadcapture')
+    self.medium = medium
+    self.writer = writer
+    self.tap = ThreadTap(nodes)
+    self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+  def start(self):
+    self.medium.add_tap(self.tap)
+    self.__thread.start()
+    return self
+
+  def stop(self):
+    self.medium.remove_tap(self.tap)
+    self.tap.close()
+    self.__thread.join(timeout=5)
+    self.writer.close()
+    return dict(self.tap.stats, files=self.writer.paths)
+
+  def __run(self):
+    try:
+      for block in self.tap.packets(timeout=1):
+        if block is None:
+          self.writer.flush()
+          continue
+        self.writer.write(block)
+    except OSError as e:
+      self.logger.error('thread recording to {} failed: {!r}'.format(
+          self.writer.directory, e))
@@ -15,32 +15,27 @@
 import os
 import subprocess
 import shutil
-from threading import Lock
 
 from cirque.common.cirquelog import CirqueLog
 from cirque.common.taskrunner import TaskRunner
-from cirque.connectivity.socatpipepair import SocatPipePair
+from cirque.connectivity.ptypair import open_pipe_pair
+from cirque.connectivity.radiomedium import RadioMediums
 
 
 class ThreadSimPipe:
-  __next_petition_id = 0
-  __THREAD_GROUP_SIZE = 34
-  __petition_mutex = Lock()
 
-  @classmethod
-  def get_next_petition(cls):
-    with cls.__petition_mutex:
-      cls.__next_petition_id += 1
-      return cls.__next_petition_id
-
-  def __init__(self, node_id, petition_id=0, rcp=False):
-    self._socat_pipe = SocatPipePair()
+  def __init__(self, lease, rcp=False, virtual_time=False):
+    self._pipe_pair = None
     self.pipe_path_for_user = None
     self.pipe_path_for_ncp = None
-    self.node_id = node_id
+    self.node_id = lease.node_id
     self.radio_fd = None
     self.radio_process = None
-    self.petition_id = petition_id
+    self.medium = None
+    self.petition_id = lease.petition_id
+    self.port_offset = lease.port_offset
+    self.window = lease.window
+    self.virtual_time = virtual_time
     self.logger = CirqueLog.get_cirque_logger(self.__class__.__name__)
     if rcp:
       self.radio_command = 'ot-rcp'
@@ -48,12 +43,18 @@ class ThreadSimPipe:
       self.radio_command = 'ot-ncp-ftd'
 
   def open(self):
-    self._socat_pipe.open()
-    self.pipe_path_for_user = self._socat_pipe.pipe0
-    self.pipe_path_for_ncp = self._socat_pipe.pipe1
-    self.radio_fd = os.open(self.pipe_path_for_ncp, os.O_RDWR)
-    env = os.environ
-    env['PORT_OFFSET'] = str(self.petition_id * self.__THREAD_GROUP_SIZE)
+    self._pipe_pair = open_pipe_pair()
+    self.pipe_path_for_user = self._pipe_pair.pipe0
+    self.pipe_path_for_ncp = self._pipe_pair.pipe1
+    self.radio_fd = self._pipe_pair.radio_fd()
+    if self.virtual_time or RadioMediums.enabled:
+      # radios built with virtual time send their frames to the medium
+      # instead of every other node of the petition, and wait for it to
+      # move their clock.
+      self.medium = RadioMediums.attach(self.petition_id, self.node_id,
+                                        self.port_offset, self.window)
+    # a copy, radios of other petitions may be started at the same time.
+    env = dict(os.environ, PORT_OFFSET=str(self.port_offset))
     command = [self.radio_command, '{}'.format(self.node_id)]
     self.logger.info("-> Start virtual OpenThread Radio: command=%s, env=%s", command, env)
     self.radio_process = TaskRunner.post_task(lambda:subprocess.Popen(
@@ -63,6 +64,15 @@ class ThreadSimPipe:
         stdin=self.radio_fd,
         stderr=subprocess.PIPE)).wait()
 
+  @property
+  def pids(self):
+    pids = []
+    if self._pipe_pair is not None:
+      pids += self._pipe_pair.pids
+    if self.radio_process is not None:
+      pids.append(self.radio_process.pid)
+    return pids
+
   def close(self):
     if self.radio_fd is not None:
       os.close(self.radio_fd)
@@ -70,9 +80,12 @@ class ThreadSimPipe:
     if self.radio_process is not None:
       self.radio_process.terminate()
       self.radio_process = None
-    if self._socat_pipe is not None:
-      self._socat_pipe.close()
-      self._socat_pipe = None
+    if self.medium is not None:
+      RadioMediums.detach(self.petition_id, self.node_id)
+      self.medium = None
+    if self._pipe_pair is not None:
+      self._pipe_pair.close()
+      self._pipe_pair = None
     if os.path.exists('./tmp'):
       shutil.rmtree('./tmp')
 
@@ -0,0 +1,121 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import queue
+import selectors
+import time
+from threading import Lock, Thread
+
+from cirque.common.cirquelog import CirqueLog
+
+SELECT_INTERVAL = 0.5
+
+
+class _WiFiEvents:
+
+  def __init__(self):
+    self.logger = CirqueLog.get_cirque_logger('wifievents')
+    self.__lock = Lock()
+    self.__selector = selectors.DefaultSelector()
+    self.__monitors = {}
+    self.__subscribers = {}
+    self.__thread = None
+
+  def watch(self, home_id, device_id, monitor):
+    with self.__lock:
+      self.__monitors[(home_id, device_id)] = monitor
+      self.__selector.register(monitor, selectors.EVENT_READ,
+                               (home_id, device_id))
+      if self.__thread is None:
+        self.__thread = Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+  def unwatch(self, home_id, device_id):
+    with self.__lock:
+      monitor = self.__monitors.pop((home_id, device_id), None)
+      if monitor is not None:
+        self.__selector.unregister(monitor)
+    if monitor is not None:
+      monitor.close()
+
+  def subscribe(self, home_id):
+    events = queue.Queue()
+    with self.__lock:
+      self.__subscribers.setdefault(home_id, []).append(events)
+    return events
+
+  def unsubscribe(self, home_id, events):
+    with self.__lock:
+      subscribers = self.__subscribers.get(home_id, [])
+      if events in subscribers:
+        subscribers.remove(events)
+
+  def publish(self, home_id, device_id, event, data=''):
+    message = {
+        'device_id': device_id,
+        'event': event,
+        'data': data,
+        'timestamp': time.time(),
+    }
+    with self.__lock:
+      subscribers = list(self.__subscribers.get(home_id, []))
+    for events in subscribers:
+      events.put(message)
+
+  @staticmethod
+  def wait(events, device_id, event, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+      remaining = deadline - time.monotonic()
+      if remaining <= 0:
+        return None
+      try:
+        message = events.get(timeout=remaining)
+      except queue.Empty:
+        return None
+      if message is None:
+        return None
+      if message['device_id'] == device_id and message['event'] == event:
+        return message
+
+  def close(self, home_id):
+    with self.__lock:
+      devices = [key[1] for key in self.__monitors if key[0] == home_id]
+      subscribers = self.__subscribers.pop(home_id, [])
+    for device_id in devices:
+      self.unwatch(home_id, device_id)
+    # tells every open stream of the home that it is over.
+    for events in subscribers:
+      events.put(None)
+
+  def __run(self):
+    while True:
+      with self.__lock:
+        if not self.__monitors:
+          self.__thread = None
+          return
+      for key, _ in self.__selector.select(timeout=SELECT_INTERVAL):
+        home_id, device_id = key.data
+        try:
+          event = key.fileobj.recv_event()
+        except OSError as e:
+          self.logger.error('lost events of {}: {!r}'.format(device_id, e))
+          self.unwatch(home_id, device_id)
+          continue
+        if event is not None:
+          self.publish(home_id, device_id, *event)
+
+
+WiFiEvents = _WiFiEvents()
@@ -0,0 +1,115 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import re
+import socket
+from threading import Lock, Thread
+
+from pyroute2 import netns
+
+from cirque.common.cirquelog import CirqueLog
+from cirque.common.exceptions import ConnectivityError
+from cirque.connectivity.netlinkhandles import RUNTIME_NAMESPACE
+import cirque.common.utils as utils
+
+WPA_SUPPLICANT_CTRL = '/run/wpa_supplicant/wlan0'
+HOSTAPD_CTRL = '/run/hostapd/wlan0'
+OPEN_TIMEOUT = 5
+REQUEST_TIMEOUT = 5
+BUFFER_SIZE = 4096
+
+
+def parse_event(message):
+  # unsolicited messages look like "<3>CTRL-EVENT-CONNECTED - Connection..."
+  match = re.match(r'<\d+>(\S+)\s*(.*)', message, re.S)
+  if match is None:
+    return None
+  return match.group(1), match.group(2).strip()
+
+
+def namespace_socket(namespace):
+  # the client address is abstract, and abstract unix addresses are scoped
+  # to a network namespace: the daemon can only answer a client created in
+  # its own namespace. setns only moves the calling thread.
+  created = {}
+
+  def create():
+    try:
+      netns.setns(os.path.join(RUNTIME_NAMESPACE, namespace), flags=0)
+      created['socket'] = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    except OSError as e:
+      created['error'] = e
+
+  thread = Thread(target=create)
+  thread.start()
+  thread.join()
+  if 'error' in created:
+    raise created['error']
+  return created['socket']
+
+
+class WpaCtrl:
+
+  def __init__(self, pid, path, namespace):
+    self.logger = CirqueLog.get_cirque_logger('wpactrl_{}'.format(namespace))
+    # the container's control socket, reached through its root.
+    self.path = '/proc/{}/root{}'.format(pid, path)
+    self.__lock = Lock()
+    self.__socket = namespace_socket(namespace)
+    try:
+      if not utils.wait_until(self.logger, lambda: os.path.exists(self.path),
+                              OPEN_TIMEOUT, self.path):
+        raise ConnectivityError('no control socket at {}'.format(path))
+      self.__socket.bind('')
+      self.__socket.connect(self.path)
+    except (ConnectivityError, OSError):
+      self.__socket.close()
+      raise
+
+  def fileno(self):
+    return self.__socket.fileno()
+
+  def request(self, command, timeout=REQUEST_TIMEOUT):
+    with self.__lock:
+      self.__socket.settimeout(timeout)
+      try:
+        self.__socket.send(command.encode())
+        while True:
+          reply = self.__socket.recv(BUFFER_SIZE).decode(errors='replace')
+          # an attached socket also receives events between replies.
+          if parse_event(reply) is None:
+            return reply.strip()
+      except socket.timeout:
+        raise ConnectivityError('{} timed out on {}'.format(
+            command.split()[0], self.path))
+      finally:
+        self.__socket.settimeout(None)
+
+  def expect_ok(self, command):
+    reply = self.request(command)
+    if reply != 'OK':
+      raise ConnectivityError('{} failed on {}: {}'.format(
+          command.split()[0], self.path, reply))
+
+  def attach(self):
+    self.expect_ok('ATTACH')
+
+  def recv_event(self):
+    message = self.__socket.recv(BUFFER_SIZE).decode(errors='replace')
+    return parse_event(message)
+
+  def close(self):
+    self.__socket.close()
@@ -27,7 +27,6 @@ import cirque.proto.service_pb2 as service_pb2
 from cirque.proto.device_pb2 import DeviceSpecification
 
 from cirque.common.cirquelog import CirqueLog
-from cirque.common.utils import sleep_time
 from cirque.proto.capability_pb2 import (WeaveCapability, ThreadCapability,
                                          WiFiCapability, XvncCapability,
                                          InteractiveCapability,
@@ -42,7 +41,8 @@ def client_sample(weave_cert_path):
   with grpc.insecure_channel('localhost:50051') as channel:
     stub = service_pb2_grpc.CirqueServiceStub(channel)
     home_id = stub.CreateCirqueHome(
-        service_pb2.CreateCirqueHomeRequest()).home_id
+        service_pb2.CreateCirqueHomeRequest(
+            local_endpoint=True)).home_id
     mount_capability = MountCapability()
     mount_capability.mount_pairs.append(
         MountPair(
@@ -74,7 +74,10 @@ def client_sample(weave_cert_path):
             home_id=home_id, device_id=device_1_id))
     logger.info(device_info)
     logger.info('Waiting for device to fully launch')
-    sleep_time(logger, 10)
+    readiness = stub.WaitCirqueDeviceReady(
+        service_pb2.WaitCirqueDeviceReadyRequest(
+            home_id=home_id, device_id=device_0_id, timeout_sec=10))
+    logger.info(readiness)
     logs = stub.GetCirqueDeviceLog(
         service_pb2.GetCirqueDeviceLogRequest(
             home_id=home_id, device_id=device_0_id, tail=10))
@@ -14,6 +14,7 @@
 
 from concurrent import futures
 
+import json
 import sys
 import atexit
 import socket
@@ -29,8 +30,14 @@ import cirque.proto.service_pb2 as service_pb2
 import cirque.proto.service_pb2_grpc as service_pb2_grpc
 
 from cirque.common.cirquelog import CirqueLog
+from cirque.common.exceptions import AdmissionError, NoDockerEndpointError
 from cirque.common.taskrunner import TaskRunner
-from cirque.home.home import CirqueHome
+from cirque.common.timing import BUCKETS, Histograms
+from cirque.common.tracing import Tracer
+from cirque.home.home import CirqueHome, destroy_homes, restore_homes
+from cirque.home.registry import HomeRegistry
+from cirque.home.scheduler import Scheduler
+from cirque.nodes.containerpool import ContainerPool
 
 logger = None
 
@@ -49,7 +56,12 @@ def convert_to_device_pb(device):
       ),
       device_id=device['id'],
       device_name=device['name'],
-      device_description=device_pb2.DeviceDescription(**describs))
+      device_description=device_pb2.DeviceDescription(**describs),
+      timings=[
+          device_pb2.PhaseTiming(
+              phase=timing['phase'], seconds=timing['seconds'])
+          for timing in device.get('timings', [])
+      ])
   if 'Weave' in device['capability']:
     device_pb.device_specification.weave_capability.CopyFrom(
         convert_weave_capability_to_pb(device['capability']['Weave']))
@@ -185,24 +197,80 @@ def convert_mount_capability_to_pb(capability_description):
   return mount_pb
 
 
+def convert_specification_to_config(specification):
+  device_config = {
+      'type': specification.device_type,
+      'capability': [],
+  }
+  if specification.base_image:
+    device_config['base_image'] = specification.base_image
+  if specification.WhichOneof('optional_weave_capability'):
+    add_weave_capability_to_config(device_config,
+                                   specification.weave_capability)
+  if specification.WhichOneof('optional_thread_capability'):
+    add_thread_capability_to_config(device_config,
+                                    specification.thread_capability)
+  if specification.WhichOneof('optional_wifi_capability'):
+    add_wifi_capability_to_config(device_config, specification.wifi_capability)
+  if specification.WhichOneof('optional_xvnc_capability'):
+    add_xvnc_capability_to_config(device_config, specification.xvnc_capability)
+  if specification.WhichOneof('optional_interactive_capability'):
+    add_interactive_capability_to_config(
+        device_config, specification.interactive_capability)
+  if specification.WhichOneof('optional_lan_access_capability'):
+    add_lan_access_capability_to_config(device_config,
+                                        specification.lan_access_capability)
+  if specification.WhichOneof('optional_mount_capability'):
+    add_mount_capability_to_config(device_config,
+                                   specification.mount_capability)
+  if specification.WhichOneof('optional_trafficcontrol_capability'):
+    add_trafficcontrol_capability_to_config(
+        device_config, specification.trafficcontrol_capability)
+  return device_config
+
+
 cirque_service = None
 
 
 def __exit_handler():
   global cirque_service
-  for home in cirque_service.homes.values():
-    home.destroy_home()
-  taskrunner.TaskRunner.stop()
+  cirque_service.StopAllCirqueHomes(None, None)
+  ContainerPool.drain()
+  TaskRunner.stop()
+
+
+def queue_timeout(request, context):
+  # a queued request holds one of the server workers, it never waits past
+  # the deadline of its call.
+  timeout = request.queue_timeout_sec or Scheduler.timeout
+  remaining = context.time_remaining()
+  return timeout if remaining is None else min(timeout, remaining)
+
+
+def admission_status(error):
+  return rpc_status.to_status(
+      status_pb2.Status(code=code_pb2.RESOURCE_EXHAUSTED, message=str(error)))
 
 
 class CirqueService(service_pb2_grpc.CirqueServiceServicer):
 
   def __init__(self):
-    self.homes = dict()
-    self.__next_home_id = 0
+    self.registry = HomeRegistry.open_default()
+    self.homes = restore_homes(self.registry)
+    self.__next_home_id = max(
+        [int(home_id) + 1 for home_id in self.homes if home_id.isdigit()],
+        default=0)
 
-  def CreateCirqueHome(self, _, context):
-    home = CirqueHome(str(self.__next_home_id))
+  def CreateCirqueHome(self, request, context):
+    try:
+      home = CirqueHome(
+          str(self.__next_home_id),
+          registry=self.registry,
+          local=request.local_endpoint)
+    except NoDockerEndpointError:
+      context.abort_with_status(
+          rpc_status.to_status(status_pb2.Status(code=code_pb2.UNAVAILABLE)))
+      return service_pb2.CreateCirqueHomeResponse()
     self.__next_home_id += 1
     self.homes[home.home_id] = home
     return service_pb2.CreateCirqueHomeResponse(home_id=home.home_id)
@@ -218,39 +286,20 @@ class CirqueService(service_pb2_grpc.CirqueServiceServicer):
               status_pb2.Status(code=code_pb2.INVALID_ARGUMENT)))
       return service_pb2.CreateCirqueDeviceResponse()
     else:
-      specification = request.specification
-      device_config = {
-          'type': specification.device_type,
-          'capability': [],
-      }
-      if specification.base_image:
-        device_config['base_image'] = specification.base_image
-      if specification.WhichOneof('optional_weave_capability'):
-        add_weave_capability_to_config(device_config,
-                                       specification.weave_capability)
-      if specification.WhichOneof('optional_thread_capability'):
-        add_thread_capability_to_config(device_config,
-                                        specification.thread_capability)
-      if specification.WhichOneof('optional_wifi_capability'):
-        add_wifi_capability_to_config(device_config,
-                                      specification.wifi_capability)
-      if specification.WhichOneof('optional_xvnc_capability'):
-        add_xvnc_capability_to_config(device_config,
-                                      specification.xvnc_capability)
-      if specification.WhichOneof('optional_interactive_capability'):
-        add_interactive_capability_to_config(
-            device_config, specification.interactive_capability)
-      if specification.WhichOneof('optional_lan_access_capability'):
-        add_lan_access_capability_to_config(device_config,
-                                            specification.lan_access_capability)
-      if specification.WhichOneof('optional_mount_capability'):
-        add_mount_capability_to_config(device_config,
-                                       specification.mount_capability)
-      if specification.WhichOneof('optional_trafficcontrol_capability'):
-        add_trafficcontrol_capability_to_config(
-            device_config, specification.trafficcontrol_capability)
-
-      device_id = self.homes[request.home_id].add_device(device_config)
+      device_config = convert_specification_to_config(request.specification)
+      try:
+        device_id = self.homes[request.home_id].add_device(
+            device_config,
+            priority=request.priority,
+            queue_timeout=queue_timeout(request, context))
+      except ValueError:
+        context.abort_with_status(
+            rpc_status.to_status(
+                status_pb2.Status(code=code_pb2.INVALID_ARGUMENT)))
+        return service_pb2.CreateCirqueDeviceResponse()
+      except AdmissionError as e:
+        context.abort_with_status(admission_status(e))
+        return service_pb2.CreateCirqueDeviceResponse()
       if device_id is None:
         context.abort_with_status(
             rpc_status.to_status(status_pb2.Status(code=code_pb2.INTERNAL)))
@@ -260,6 +309,37 @@ class CirqueService(service_pb2_grpc.CirqueServiceServicer):
         return service_pb2.CreateCirqueDeviceResponse(
             device=convert_to_device_pb(device))
 
+  def CreateCirqueDevices(self, request, context):
+    if request.home_id is None or request.home_id not in self.homes:
+      context.abort_with_status(
+          rpc_status.to_status(status_pb2.Status(code=code_pb2.NOT_FOUND)))
+      return
+    home = self.homes[request.home_id]
+    device_config = convert_specification_to_config(request.specification)
+    try:
+      results = home.add_devices(
+          device_config,
+          request.replicas,
+          priority=request.priority,
+          queue_timeout=queue_timeout(request, context))
+    except ValueError:
+      context.abort_with_status(
+          rpc_status.to_status(
+              status_pb2.Status(code=code_pb2.INVALID_ARGUMENT)))
+      return
+    try:
+      for replica, result in results:
+        if 'error' in result:
+          yield service_pb2.CreateCirqueDevicesResponse(
+              replica=replica, error=result['error'])
+        else:
+          device = home.get_device_state(result['id'])
+          yield service_pb2.CreateCirqueDevicesResponse(
+              replica=replica, device=convert_to_device_pb(device))
+    except AdmissionError as e:
+      # admission only happens once the results are consumed.
+      context.abort_with_status(admission_status(e))
+
   def ExecuteDeviceCommand(self, request, context):
     if request.home_id is None or \
        request.home_id not in self.homes or \
@@ -306,6 +386,146 @@ class CirqueService(service_pb2_grpc.CirqueServiceServicer):
     return service_pb2.QueryCirqueDeviceResponse(
         device=convert_to_device_pb(device))
 
+  def WaitCirqueDeviceReady(self, request, context):
+    if request.home_id is None or \
+       request.home_id not in self.homes or \
+       request.device_id is None or \
+       request.device_id not in self.homes[request.home_id].devices:
+      context.abort_with_status(
+          rpc_status.to_status(status_pb2.Status(code=code_pb2.NOT_FOUND)))
+      return service_pb2.WaitCirqueDeviceReadyResponse()
+    home = self.homes[request.home_id]
+    kwargs = {'thread_roles': list(request.thread_roles)}
+    if request.timeout_sec:
+      kwargs['timeout'] = request.timeout_sec
+    try:
+      readiness = home.wait_ready(request.device_id, **kwargs)
+    except ValueError:
+      context.abort_with_status(
+          rpc_status.to_status(
+              status_pb2.Status(code=code_pb2.INVALID_ARGUMENT)))
+      return service_pb2.WaitCirqueDeviceReadyResponse()
+    return service_pb2.WaitCirqueDeviceReadyResponse(
+        ready=readiness['ready'], pending_probes=readiness['pending'])
+
+  def ListQueuedRequests(self, request, context):
+    return service_pb2.ListQueuedRequestsResponse(requests=[
+        service_pb2.QueuedRequest(
+            home_id=pending['owner'],
+            priority=pending['priority'],
+            position=pending['position'],
+            demand=pending['demand']) for pending in Scheduler.pending()
+    ])
+
+  def GetTimingHistograms(self, request, context):
+    return service_pb2.GetTimingHistogramsResponse(histograms=[
+        service_pb2.PhaseHistogram(
+            phase=phase,
+            count=histogram['count'],
+            sum_sec=histogram['sum'],
+            bucket_bounds=BUCKETS,
+            bucket_counts=histogram['buckets'])
+        for phase, histogram in sorted(Histograms.snapshot().items())
+    ])
+
+  def GetCirqueHomeTrace(self, request, context):
+    if request.home_id is None or request.home_id not in self.homes:
+      context.abort_with_status(
+          rpc_status.to_status(status_pb2.Status(code=code_pb2.NOT_FOUND)))
+      return service_pb2.GetCirqueHomeTraceResponse()
+    return service_pb2.GetCirqueHomeTraceResponse(
+        trace_json=json.dumps(Tracer.chrome_trace(request.home_id)))
+
+  def ConnectWiFi(self, request, context):
+    if request.home_id is None or request.home_id not in self.homes:
+      context.abort_with_status(
+          rpc_status.to_status(status_pb2.Status(code=code_pb2.NOT_FOUND)))
+      return
+    kwargs = {'timeout': request.timeout_sec} if request.timeout_sec else {}
+    try:
+      results = self.homes[request.home_id].connect_wifi(
+          request.device_id, request.ssid or None, request.psk or None,
+          **kwargs)
+    except ValueError:
+      context.abort_with_status(
+          rpc_status.to_status(
+              status_pb2.Status(code=code_pb2.INVALID_ARGUMENT)))
+      return
+    for device_id, result in results:
+      yield service_pb2.ConnectWiFiResponse(
+          device_id=device_id,
+          ipv4_addr=result.get('ipv4_addr', ''),
+          error=result.get('error', ''))
+
+  def StreamWiFiEvents(self, request, context):
+    if request.home_id is None or request.home_id not in self.homes:
+      context.abort_with_status(
+          rpc_status.to_status(status_pb2.Status(code=code_pb2.NOT_FOUND)))
+      return
+    for event in self.homes[request.home_id].wifi_events(heartbeat=1):
+      if event is None:
+        if not context.is_active():
+          return
+        continue
+      yield service_pb2.WiFiEvent(**event)
+
+  def SetThreadLink(self, request, context):
+    if request.home_id is None or request.home_id not in self.homes:
+      context.abort_with_status(
+          rpc_status.to_status(status_pb2.Status(code=code_pb2.NOT_FOUND)))
+      return
+    try:
+      link = self.homes[request.home_id].set_thread_link(
+          request.source_device_id, request.destination_device_id,
+          request.rssi if request.set_rssi else None,
+          request.loss if request.set_loss else None,
+          not request.asymmetric)
+    except ValueError:
+      context.abort_with_status(
+          rpc_status.to_status(
+              status_pb2.Status(code=code_pb2.INVALID_ARGUMENT)))
+      return
+    return service_pb2.SetThreadLinkResponse(**link)
+
+  def SetThreadClock(self, request, context):
+    if request.home_id is None or request.home_id not in self.homes:
+      context.abort_with_status(
+          rpc_status.to_status(status_pb2.Status(code=code_pb2.NOT_FOUND)))
+      return
+    paused = True if request.pause else (False if request.resume else None)
+    try:
+      clock = self.homes[request.home_id].set_thread_clock(
+          request.thread_petition,
+          request.speed if request.set_speed else None, paused,
+          request.step_ms)
+    except ValueError:
+      context.abort_with_status(
+          rpc_status.to_status(
+              status_pb2.Status(code=code_pb2.INVALID_ARGUMENT)))
+      return
+    return service_pb2.ThreadClock(**clock)
+
+  def StreamThreadCapture(self, request, context):
+    if request.home_id is None or request.home_id not in self.homes:
+      context.abort_with_status(
+          rpc_status.to_status(status_pb2.Status(code=code_pb2.NOT_FOUND)))
+      return
+    try:
+      capture = self.homes[request.home_id].capture_thread(
+          request.thread_petition, list(request.node_id), heartbeat=1)
+    except ValueError:
+      context.abort_with_status(
+          rpc_status.to_status(
+              status_pb2.Status(code=code_pb2.FAILED_PRECONDITION)))
+      return
+    for block in capture:
+      if block is None:
+        if not context.is_active():
+          capture.close()
+          return
+        continue
+      yield service_pb2.ThreadCaptureChunk(pcapng=block)
+
   def StopCirqueDevice(self, request, context):
     if request.home_id is None or \
        request.home_id not in self.homes or \
@@ -327,6 +547,12 @@ class CirqueService(service_pb2_grpc.CirqueServiceServicer):
       del self.homes[request.home_id]
     return empty_pb2.Empty()
 
+  def StopAllCirqueHomes(self, request, context):
+    homes = list(self.homes.values())
+    self.homes.clear()
+    destroy_homes(homes)
+    return empty_pb2.Empty()
+
   def GetCirqueDeviceLog(self, request, context):
     if request.home_id is None or \
        request.home_id not in self.homes or \
@@ -15,17 +15,44 @@
 import atexit
 import docker
 import os
+import queue
 import time
 import uuid
 
+from concurrent import futures
+from threading import Lock
+
+import cirque.common.labels as labels
 import cirque.nodes as nodes
 
 from cirque.common.cirquelog import CirqueLog
+from cirque.common.exceptions import HomeBringupError, NoDockerEndpointError
+from cirque.common.labels import home_labels, label_filters, service_labels
+from cirque.common.readiness import ThreadStateProbe
+from cirque.common.timing import PhaseTimer, phase_name
+from cirque.common.tracing import Tracer, bind, span
+from cirque.connectivity.bluetoothhost import (BluetoothHost,
+                                               DEFAULT_CONTROLLERS)
 from cirque.connectivity.homelan import HomeLan
-from cirque.connectivity.threadsimpipe import ThreadSimPipe
+from cirque.connectivity.hwsim import Radios
+from cirque.connectivity.netfilter import Netfilter
+from cirque.connectivity.radiomedium import RadioMediums
+from cirque.connectivity.threadallocator import (ThreadAllocator,
+                                                 ThreadLease, recorded_lease)
+from cirque.connectivity.threadcapture import (CAPTURE_DIR, RING_FILE_SIZE,
+                                               RING_FILES, RingWriter,
+                                               ThreadRecording, ThreadTap,
+                                               capture_header)
+from cirque.connectivity.wifievents import WiFiEvents
+from cirque.home.placement import Placement, needs_local_host
+from cirque.home.scheduler import (Scheduler, device_demand, home_demand,
+                                   total_demand)
 from cirque.nodes.wifiapnode import WiFiAPNode
+from cirque.nodes.containerpool import ContainerPool
+from cirque.nodes.dockerevents import DockerEventWatcher
 from cirque.nodes.dockernode import DockerNode
 from cirque.capabilities.bluetoothcapability import BlueToothCapability
+from cirque.capabilities.restoredcapability import RestoredCapability
 from cirque.capabilities.dockernetworkcapability import DockerNetworkCapability
 from cirque.capabilities.interactivecapability import InteractiveCapability
 from cirque.capabilities.lanaccesscapability import LanAccessCapability
@@ -37,46 +64,444 @@ from cirque.capabilities.xvnccapability import XvncCapability
 from cirque.capabilities.trafficcontrolcapability \
     import TrafficControlCapability
 
+BRINGUP_WORKERS = 8
+READY_TIMEOUT = 30
+
+
+def bringup_stages(home_config):
+  # WiFi stations can only enable their capability once the access points
+  # of the home are beaconing, everything else may declare its own
+  # ordering with a 'depends_on' list of device names.
+  ap_names = {
+      name for name, config in home_config.items()
+      if config.get('type') == 'wifi_ap'
+  }
+  dependencies = {}
+  for name, config in home_config.items():
+    depends_on = set(config.get('depends_on', []))
+    if name not in ap_names and 'WiFi' in config.get('capability', []):
+      depends_on |= ap_names
+    unknown = depends_on - set(home_config)
+    if unknown:
+      raise ValueError('device {} depends on unknown devices: {}'.format(
+          name, sorted(unknown)))
+    dependencies[name] = depends_on
+  stages = []
+  while dependencies:
+    ready = sorted(name for name, deps in dependencies.items() if not deps)
+    if not ready:
+      raise ValueError('circular device dependencies: {}'.format(
+          sorted(dependencies)))
+    stages.append(ready)
+    dependencies = {
+        name: deps.difference(ready)
+        for name, deps in dependencies.items()
+        if name not in ready
+    }
+  return stages
+
+
+def _remove_docker_objects(objects):
+  logger = CirqueLog.get_cirque_logger('home')
+
+  def remove(docker_object):
+    try:
+      if isinstance(docker_object, docker.models.containers.Container):
+        docker_object.remove(force=True)
+      else:
+        docker_object.remove()
+    except docker.errors.NotFound:
+      pass
+    except docker.errors.APIError as e:
+      logger.error('failed to remove {}: {!r}'.format(docker_object.id, e))
+
+  with futures.ThreadPoolExecutor(max_workers=BRINGUP_WORKERS) as executor:
+    list(executor.map(remove, objects))
+
+
+def remove_labelled_containers(docker_client, labels):
+  _remove_docker_objects(
+      docker_client.containers.list(all=True, filters=label_filters(labels)))
+
+
+def remove_labelled_networks(docker_client, labels):
+  _remove_docker_objects(
+      docker_client.networks.list(filters=label_filters(labels)))
+
+
+def destroy_homes(homes):
+  with futures.ThreadPoolExecutor(max_workers=BRINGUP_WORKERS) as executor:
+    list(executor.map(lambda home: home.destroy_home(), homes))
+  # sweep anything left behind by homes this process no longer tracks
+  for endpoint in Placement.endpoints:
+    remove_labelled_containers(endpoint.client, service_labels())
+    remove_labelled_networks(endpoint.client, service_labels())
+
+
+def restore_homes(registry):
+  homes = {}
+  if registry is None:
+    return homes
+  if 'CIRQUE_SERVICE_ID' not in os.environ:
+    # homes recorded before ids were stored carry the old shared label.
+    default = labels.LEGACY_SERVICE_ID if registry.homes() else \
+        labels.SERVICE_ID
+    labels.use_service_id(registry.service_id(default))
+  for home_id, endpoint, lans in registry.homes():
+    try:
+      homes[home_id] = CirqueHome.restore(registry, home_id,
+                                          Placement.endpoint(endpoint), lans)
+    except (docker.errors.DockerException, NoDockerEndpointError) as e:
+      CirqueLog.get_cirque_logger('home').error(
+          'failed to restore home {}: {!r}'.format(home_id, e))
+  return homes
+
 
 class CirqueHome:
 
-  def __init__(self, home_id=None):
-    self.docker_client = docker.from_env()
+  def __init__(self, home_id=None, registry=None, endpoint=None, local=False):
     if home_id is None:
       self.home_id = str(uuid.uuid4())
     else:
       self.home_id = home_id
+    # a home never spans docker endpoints, its LANs only exist on one daemon.
+    if endpoint is None:
+      self.endpoint = Placement.place(self.home_id, local=local)
+    else:
+      self.endpoint = endpoint
+      Placement.assign(self.home_id, endpoint)
+    self.docker_client = self.endpoint.client
+    self.labels = home_labels(self.home_id)
+    self.event_watcher = DockerEventWatcher(self.docker_client, self.labels)
     self.home = {'home_id': self.home_id, 'devices': {}}
-    self.thread_petitions = {}
     # network
     self.external_lan = None
     self.internal_lan = None
     self.ipv6_lan = None
     self.ipvlan_lan = None
+    self.bringup_results = {}
+    self.timings = PhaseTimer()
+    self.__reservations = {}
+    self.__recordings = {}
+    self.__lan_lock = Lock()
+    self.__devices_lock = Lock()
+    self.registry = registry
+    if self.registry is not None:
+      self.registry.add_home(self.home_id, self.endpoint.url)
     atexit.register(self.destroy_home)
     self.logger = CirqueLog.get_cirque_logger('home')
 
-  def __next_thread_node_id(self, petition):
-    if petition in self.thread_petitions:
-      petition_id = self.thread_petitions[petition]['petition_id']
+  @classmethod
+  def restore(cls, registry, home_id, endpoint, lans):
+    home = cls(home_id, registry=registry, endpoint=endpoint)
+    home.logger.info('restoring home: {}'.format(home_id))
+    for attribute, lan in lans.items():
+      setattr(
+          home, attribute,
+          HomeLan(
+              lan['name'],
+              internal=lan['internal'],
+              ipv6=lan['ipv6'],
+              labels=home.labels,
+              create=False,
+              docker_host=endpoint.url,
+              owner=home_id))
+    containers = {
+        container.id: container
+        for container in home.docker_client.containers.list(
+            all=True, filters=label_filters(home.labels))
+    }
+    for record in registry.devices(home_id):
+      container = containers.get(record['node_id'])
+      if container is None:
+        home.logger.warning('device {} of home {} is gone'.format(
+            record['node_id'], home_id))
+        registry.remove_device(record['node_id'])
+        continue
+      home.__restore_device(record, container)
+    return home
+
+  def __restore_device(self, record, container):
+    device_config = record['config']
+    base_image = device_config.get('base_image', device_config['type'])
+    if device_config['type'] == 'wifi_ap':
+      device_node = WiFiAPNode(
+          self.docker_client,
+          ssid=device_config.get('ssid'),
+          password=device_config.get('psk'),
+          base_image=base_image,
+          labels=self.labels,
+          medium=self.home_id,
+          subnet=device_config.get('subnet'),
+          config_dir=device_config.get('config_dir'))
     else:
-      petition_id = ThreadSimPipe.get_next_petition()
-      self.thread_petitions[petition] = {
-          'petition_id': petition_id,
-          'ncp_id': 0
-      }
-    self.thread_petitions[petition]['ncp_id'] += 1
-    return self.thread_petitions[petition]['ncp_id']
+      capabilities = [
+          RestoredCapability(c['name'], c['description'], c['resources'])
+          for c in record['capabilities']
+      ]
+      device_node = DockerNode(
+          self.docker_client,
+          device_config['type'],
+          capabilities,
+          base_image=base_image,
+          labels=self.labels)
+    device_node.attach(container)
+    for capability in record['capabilities']:
+      resources = capability['resources']
+      if capability['name'] == 'Thread' and resources:
+        ThreadAllocator.restore(
+            (self.home_id, device_config.get('thread_petition', 0)),
+            recorded_lease(resources))
+    self.event_watcher.start()
+    self.event_watcher.subscribe(device_node)
+    with self.__devices_lock:
+      self.home['devices'][device_node.id] = device_node
+      self.__reservations[device_node.id] = Scheduler.claim(
+          device_demand(device_config))
 
-  def create_home(self, home_config):
+  def __record_device(self, device_config, device_node):
+    if self.registry is None:
+      return
+    if device_node.type == 'wifi_ap':
+      device_config = dict(
+          device_config,
+          ssid=device_node.ssid,
+          psk=device_node.password,
+          subnet=str(device_node.subnet),
+          config_dir=device_node.config_dir)
+    capabilities = [{
+        'name': capability.name,
+        'description': capability.description,
+        'resources': capability.host_resources,
+    } for capability in device_node.capabilities]
+    self.registry.add_device(self.home_id, device_node.id, device_config,
+                             capabilities)
+
+  def __record_lans(self):
+    if self.registry is None:
+      return
+    lans = {}
+    for attribute in ('external_lan', 'internal_lan', 'ipv6_lan',
+                      'ipvlan_lan'):
+      lan = getattr(self, attribute)
+      if lan is not None:
+        lans[attribute] = {
+            'name': lan.name,
+            'internal': lan.internal,
+            'ipv6': lan.ipv6,
+        }
+    self.registry.update_home_lans(self.home_id, lans)
+
+  def create_home(self,
+                  home_config,
+                  max_workers=BRINGUP_WORKERS,
+                  priority=0,
+                  queue_timeout=None):
     self.logger.info('creating home: {}'.format(self.home_id))
+    stages = bringup_stages(home_config)
     for device_config in home_config.values():
-      self.add_device(device_config)
+      self.__check_endpoint(device_config)
+    Placement.expect(self.home_id, len(home_config))
+    with span('create_home', 'home', home=self.home_id):
+      # the whole home is admitted at once so that it never comes up half
+      # way because another request took the remaining radios or adapters.
+      with span('admission', 'home'):
+        demand = home_demand(home_config)
+        reservation = Scheduler.acquire(
+            demand,
+            owner=self.home_id,
+            priority=priority,
+            timeout=queue_timeout)
+      self.bringup_results = {}
+      try:
+        if demand['ble']:
+          # every controller of the home comes from a single btvirt.
+          BluetoothHost.reserve(self.home_id, int(demand['ble']))
+        return self.__bringup(home_config, stages, reservation, max_workers)
+      except HomeBringupError:
+        raise
+      except Exception as e:
+        # the LANs, rules and BLE bus taken so far go with the home.
+        self.logger.exception('failed to bring up home {}'.format(
+            self.home_id))
+        self.destroy_home()
+        raise HomeBringupError(
+            'failed to bring up home {}: {!r}'.format(self.home_id, e),
+            self.bringup_results) from e
+      finally:
+        reservation.release()
+
+  def __bringup(self, home_config, stages, reservation, max_workers):
+    for device_config in home_config.values():
+      self.__make_network_capability(device_config)
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+      for stage in stages:
+        pending = {
+            executor.submit(
+                bind(self.add_device), home_config[name],
+                reservation.split(device_demand(home_config[name]))): name
+            for name in stage
+        }
+        for future in futures.as_completed(pending):
+          name = pending[future]
+          try:
+            device_id = future.result()
+          except Exception as e:
+            self.logger.exception('failed to bring up device {}'.format(name))
+            self.bringup_results[name] = {'error': '{!r}'.format(e)}
+            continue
+          if device_id is None:
+            self.bringup_results[name] = {'error': 'device was not created'}
+          else:
+            self.bringup_results[name] = {'id': device_id}
+        failed = sorted(name for name, result in self.bringup_results.items()
+                        if 'error' in result)
+        if failed:
+          # nothing of a half built home is kept, not even its LANs, rules
+          # or registry record.
+          self.logger.info('tearing down home {} after failed bring-up'.format(
+              self.home_id))
+          self.destroy_home()
+          raise HomeBringupError(
+              'failed to bring up devices {} in home {}'.format(
+                  failed, self.home_id), self.bringup_results)
     return self.home_id
 
-  def add_device(self, device_config):
+  def __check_endpoint(self, device_config):
+    if needs_local_host(device_config) and not self.endpoint.local:
+      raise ValueError(
+          'device {} needs resources of the service host but home {} is on '
+          'docker endpoint {}'.format(device_config.get('type'), self.home_id,
+                                      self.endpoint.url))
+
+  def add_device(self,
+                 device_config,
+                 reservation=None,
+                 priority=0,
+                 queue_timeout=None):
     self.logger.info('Adding device to home {}: {}'.format(
         self.home_id, device_config))
+    if 'type' not in device_config:
+      self.logger.critical('Cannot create device, type unspecified')
+      if reservation is not None:
+        reservation.release()
+      return
+    try:
+      self.__check_endpoint(device_config)
+    except ValueError:
+      if reservation is not None:
+        reservation.release()
+      raise
+    with span('add_device', 'device', home=self.home_id):
+      if reservation is None:
+        with span('admission', 'device'):
+          reservation = Scheduler.acquire(
+              device_demand(device_config),
+              owner=self.home_id,
+              priority=priority,
+              timeout=queue_timeout)
+      try:
+        network_capability = self.__make_network_capability(device_config)
+      except Exception:
+        reservation.release()
+        raise
+      return self.__launch_device(device_config, network_capability,
+                                  reservation)
+
+  def add_devices(self,
+                  device_config,
+                  replicas,
+                  max_workers=BRINGUP_WORKERS,
+                  priority=0,
+                  queue_timeout=None):
+    self.logger.info('Adding {} replicas to home {}: {}'.format(
+        replicas, self.home_id, device_config))
+    if 'type' not in device_config:
+      raise ValueError('device type unspecified')
+    if replicas < 1:
+      raise ValueError('invalid replica count {}'.format(replicas))
+    self.__check_endpoint(device_config)
+    # nothing is admitted until the results are consumed, a stream that is
+    # dropped before it starts holds no resources.
+    return self.__add_replicas(device_config, replicas, max_workers,
+                               priority, queue_timeout)
+
+  def __add_replicas(self, device_config, replicas, max_workers, priority,
+                     queue_timeout):
+    demand = device_demand(device_config)
+    reservation = Scheduler.acquire(
+        total_demand([demand] * replicas),
+        owner=self.home_id,
+        priority=priority,
+        timeout=queue_timeout)
+    reservations = []
+    leases = []
+    try:
+      if demand['ble']:
+        BluetoothHost.reserve(self.home_id, replicas)
+      reservations = [reservation.split(demand) for _ in range(replicas)]
+      replica_configs = [dict(device_config) for _ in range(replicas)]
+      if 'Thread' in device_config.get('capability', []):
+        leases = ThreadAllocator.lease_many(
+            (self.home_id, device_config.get('thread_petition', 0)),
+            replicas,
+            network_size=device_config.get('thread_network_size'))
+        for replica_config, lease in zip(replica_configs, leases):
+          replica_config['thread_lease'] = list(lease)
+      # the home LAN is resolved once and its capability shared by every
+      # replica, it only contributes the network run argument.
+      network_capability = self.__make_network_capability(device_config)
+    except Exception:
+      for held in [reservation] + reservations:
+        held.release()
+      for lease in leases:
+        ThreadAllocator.release(lease)
+      raise
+    # once launched, every replica owns its reservation and lease.
+    yield from self.__launch_replicas(replica_configs, network_capability,
+                                      reservations, max_workers)
+
+  def __launch_replicas(self, replica_configs, network_capability,
+                        reservations, max_workers):
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+      pending = {
+          executor.submit(
+              bind(self.__launch_device), replica_config, network_capability,
+              reservations[replica]): replica
+          for replica, replica_config in enumerate(replica_configs)
+      }
+      for future in futures.as_completed(pending):
+        replica = pending[future]
+        try:
+          device_id = future.result()
+        except Exception as e:
+          self.logger.exception(
+              'failed to bring up replica {}'.format(replica))
+          yield replica, {'error': '{!r}'.format(e)}
+          continue
+        if device_id is None:
+          yield replica, {'error': 'device was not created'}
+        else:
+          yield replica, {'id': device_id}
+
+  def __launch_device(self, device_config, network_capability, reservation):
+    try:
+      with span(
+          'launch_device',
+          'device',
+          home=self.home_id,
+          type=device_config['type']) as current:
+        node_id = self.__start_device(device_config, network_capability,
+                                      reservation)
+        current.args['device'] = node_id
+    except Exception:
+      reservation.release()
+      raise
+    if node_id is None:
+      reservation.release()
+    return node_id
+
+  def __start_device(self, device_config, network_capability, reservation):
     capabilities = []
     device_type = device_config['type']
     if 'base_image' in device_config:
@@ -84,48 +509,56 @@ class CirqueHome:
     else:
       base_image = device_config['type']
 
-    # configure docker network
-    # bluetooth feature uses host network, can not create customize
-    # networks.
-    if 'Bluetooth' in device_config['capability']:
-      pass
-    elif 'docker_network' in device_config and \
-            device_config['docker_network'] == 'Internal':
-      if not self.internal_lan:
-          self.internal_lan = HomeLan(
-            '{}_internal'.format(self.home_id), internal=True)
-      capabilities.append(self.__make_internal_network_capability())
-    elif 'docker_network' in device_config and \
-            device_config['docker_network'] == 'Ipv6':
-      if not self.ipv6_lan:
-        self.ipv6_lan = HomeLan('{}_ipv6'.format(self.home_id), ipv6=True)
-      capabilities.append(self.__make_ipv6_network_capability())
-    elif 'docker_network' in device_config and \
-            device_config['docker_network'] == 'IpvLan':
-      if not self.ipvlan_lan:
-        self.ipvlan_lan = HomeLan('{}_ipvlan'.format(self.home_id))
-      capabilities.append(self.__make_ipvlan_network_capability())
-    else:
-      if not self.external_lan:
-        self.external_lan = HomeLan('{}_external'.format(self.home_id))
-      capabilities.append(self.__make_external_network_capability())
-
-    if 'type' not in device_config:
-      self.logger.critical('Cannot create device, type unspecified')
-      return
-    if 'capability' in device_config:
-      for capability_name in device_config['capability']:
-        capability = self.__make_capability(capability_name, device_config)
-        if capability is not None:
-          capabilities.append(capability)
+    self.event_watcher.start()
+    if network_capability is not None:
+      capabilities.append(network_capability)
+
+    timer = PhaseTimer()
+    if device_type == 'wifi_ap' and device_config.get('capability'):
+      # an access point node takes no capabilities, none are created so
+      # that none hold a lease or a process.
+      self.logger.warning('ignoring capabilities {} of wifi_ap'.format(
+          device_config['capability']))
+    elif 'capability' in device_config:
+      try:
+        for capability_name in device_config['capability']:
+          start = time.monotonic()
+          capability = self.__make_capability(capability_name, device_config)
+          if capability is not None:
+            timer.record(
+                phase_name(capability, 'create'), time.monotonic() - start)
+            capabilities.append(capability)
+      except Exception:
+        # no node owns the capabilities yet, they are given back here.
+        for capability in capabilities:
+          capability.abort_capability(None)
+        raise
     if device_type == 'wifi_ap':
-      device_node = WiFiAPNode(self.docker_client, base_image=base_image)
+      device_node = WiFiAPNode(
+          self.docker_client,
+          base_image=base_image,
+          labels=self.labels,
+          timer=timer,
+          medium=self.home_id)
     else:
       device_node = DockerNode(
-          self.docker_client, device_type, capabilities, base_image=base_image)
-    device_node.run()
+          self.docker_client,
+          device_type,
+          capabilities,
+          base_image=base_image,
+          labels=self.labels,
+          timer=timer)
+    try:
+      device_node.run()
+    except Exception:
+      device_node.stop()
+      raise
     if device_node.id is not None:
-      self.home['devices'][device_node.id] = device_node
+      self.event_watcher.subscribe(device_node)
+      with self.__devices_lock:
+        self.home['devices'][device_node.id] = device_node
+        self.__reservations[device_node.id] = reservation
+      self.__record_device(device_config, device_node)
     return device_node.id
 
   def __make_capability(self, capability, device_config):
@@ -146,6 +579,45 @@ class CirqueHome:
     else:
       return factory_functions[capability](capability, device_config)
 
+  def __make_network_capability(self, device_config):
+    # raw HCI sockets only work in the host network, devices which need
+    # them can not join a home network.
+    if 'Bluetooth' in device_config.get('capability', []) and \
+       device_config.get('bluetooth_host_network'):
+      return None
+    docker_network = device_config.get('docker_network')
+    with self.__lan_lock:
+      network_capability = self.__make_home_lan(docker_network)
+      self.__record_lans()
+      return network_capability
+
+  def __make_home_lan(self, docker_network):
+    if docker_network == 'Internal':
+      if not self.internal_lan:
+        self.internal_lan = self.__make_lan('internal', internal=True)
+      return self.__make_internal_network_capability()
+    elif docker_network == 'Ipv6':
+      if not self.ipv6_lan:
+        self.ipv6_lan = self.__make_lan('ipv6', ipv6=True)
+      return self.__make_ipv6_network_capability()
+    elif docker_network == 'IpvLan':
+      if not self.ipvlan_lan:
+        self.ipvlan_lan = self.__make_lan('ipvlan')
+      return self.__make_ipvlan_network_capability()
+    else:
+      if not self.external_lan:
+        self.external_lan = self.__make_lan('external')
+      return self.__make_external_network_capability()
+
+  def __make_lan(self, suffix, **kwargs):
+    with self.timings.phase('HomeLan.create'):
+      return HomeLan(
+          '{}_{}'.format(self.home_id, suffix),
+          labels=self.labels,
+          docker_host=self.endpoint.url,
+          owner=self.home_id,
+          **kwargs)
+
   # 4 network settings
   def __make_external_network_capability(self):
     return DockerNetworkCapability(self.external_lan.name, 'external')
@@ -160,8 +632,11 @@ class CirqueHome:
     return DockerNetworkCapability(self.ipvlan_lan.name, 'ipvlan')
 
   def __make_bluetooth_capability(self, capability, device_config):
-      num_infs = device_config.get('num_infs', 2)
-      return BlueToothCapability(num_btvirts=num_infs)
+    num_infs = device_config.get('num_infs', DEFAULT_CONTROLLERS)
+    return BlueToothCapability(
+        self.home_id,
+        num_btvirts=num_infs,
+        host_network=bool(device_config.get('bluetooth_host_network')))
 
   def __make_interactive_capability(self, capability, device_config):
     return InteractiveCapability()
@@ -184,8 +659,15 @@ class CirqueHome:
     daemons = device_config['thread_daemon'] \
         if 'thread_daemon' in device_config else ['wpantund']
     rcp = 'rcp_mode' in device_config and device_config['rcp_mode']
-    node_id = self.__next_thread_node_id(petition)
-    return ThreadCapability(node_id, petition, daemons=daemons, rcp=rcp)
+    virtual_time = device_config.get('thread_virtual_time', False)
+    if 'thread_lease' in device_config:
+      lease = ThreadLease(*device_config['thread_lease'])
+    else:
+      lease = ThreadAllocator.lease((self.home_id, petition),
+                                    device_config.get('thread_node_id'),
+                                    device_config.get('thread_network_size'))
+    return ThreadCapability(
+        lease, daemons=daemons, rcp=rcp, virtual_time=virtual_time)
 
   def __make_trafficcontrolcapability(self, capability, device_config):
     return TrafficControlCapability(
@@ -204,7 +686,7 @@ class CirqueHome:
     return WeaveCapability(weave_provision_path, target_path)
 
   def __make_wifi_capability(self, capability, device_config):
-    return WiFiCapability()
+    return WiFiCapability(medium=self.home_id)
 
   def __make_xvnc_capability(self, capability, device_config):
     localhost = device_config['xvnc_localhost'] \
@@ -231,6 +713,156 @@ class CirqueHome:
         return ssid_psk(node)
     return ''
 
+  def connect_wifi(self,
+                   node_ids,
+                   ssid=None,
+                   psk=None,
+                   timeout=WiFiCapability.CONNECT_TIMEOUT,
+                   max_workers=BRINGUP_WORKERS):
+    if ssid is None or psk is None:
+      wifiap = self.get_wifiap_ssid_psk()
+      if not wifiap:
+        raise ValueError('home {} has no wifi ap'.format(self.home_id))
+      ssid = wifiap[0] if ssid is None else ssid
+      psk = wifiap[1] if psk is None else psk
+    stations = []
+    for node_id in node_ids:
+      node = self.home['devices'].get(node_id)
+      capability = None if node is None or node.type == 'wifi_ap' else next(
+          (c for c in node.capabilities if c.name == 'WiFi'), None)
+      if capability is None:
+        raise ValueError('device {} is not a wifi station'.format(node_id))
+      stations.append((node, capability))
+    return self.__join_stations(stations, ssid, psk, timeout, max_workers)
+
+  def __join_stations(self, stations, ssid, psk, timeout, max_workers):
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+      pending = {
+          executor.submit(
+              bind(self.__join_station), node, capability, ssid, psk,
+              timeout): node.id for node, capability in stations
+      }
+      for future in futures.as_completed(pending):
+        node_id = pending[future]
+        try:
+          result = future.result()
+        except Exception as e:
+          self.logger.exception('{} failed to join {}'.format(node_id, ssid))
+          yield node_id, {'error': '{!r}'.format(e)}
+          continue
+        yield node_id, result
+
+  def __join_station(self, node, capability, ssid, psk, timeout):
+    with span('connect_wifi', 'device', home=self.home_id, device=node.id):
+      return capability.connect(node, ssid, psk, timeout)
+
+  def wifi_events(self, heartbeat=None):
+    events = WiFiEvents.subscribe(self.home_id)
+    try:
+      while True:
+        try:
+          message = events.get(timeout=heartbeat)
+        except queue.Empty:
+          # lets the caller check that its client is still there.
+          yield None
+          continue
+        if message is None:
+          return
+        yield message
+    finally:
+      WiFiEvents.unsubscribe(self.home_id, events)
+
+  def __thread_endpoint(self, node_id):
+    node = self.home['devices'].get(node_id)
+    capability = None if node is None else next(
+        (c for c in node.capabilities if c.name == 'Thread'), None)
+    endpoint = getattr(capability, 'thread_endpoint', None)
+    if endpoint is None:
+      raise ValueError('device {} has no thread radio'.format(node_id))
+    return endpoint
+
+  def set_thread_link(self,
+                      source_id,
+                      destination_id,
+                      rssi=None,
+                      loss=None,
+                      symmetric=True):
+    source = self.__thread_endpoint(source_id)
+    destination = self.__thread_endpoint(destination_id)
+    if source.petition_id != destination.petition_id:
+      raise ValueError('{} and {} are not on the same thread medium'.format(
+          source_id, destination_id))
+    medium = RadioMediums.get(source.petition_id)
+    if medium is None:
+      raise ValueError('thread petition {} has no radio medium'.format(
+          source.petition_id))
+    medium.table.set_link(source.node_id, destination.node_id, rssi, loss)
+    if symmetric:
+      medium.table.set_link(destination.node_id, source.node_id, rssi, loss)
+    return medium.table.link(source.node_id, destination.node_id)
+
+  def __thread_medium(self, petition):
+    petition_id = ThreadAllocator.petition_id((self.home_id, petition))
+    medium = None if petition_id is None else RadioMediums.get(petition_id)
+    if medium is None:
+      raise ValueError('thread petition {} has no radio medium'.format(
+          petition))
+    return medium
+
+  def set_thread_clock(self,
+                       petition=0,
+                       speed=None,
+                       paused=None,
+                       step_ms=None):
+    medium = self.__thread_medium(petition)
+    if speed is not None:
+      medium.clock.set_speed(speed)
+    if paused:
+      medium.clock.pause()
+    elif paused is not None:
+      medium.clock.resume()
+    if step_ms:
+      medium.clock.step(int(step_ms * 1000))
+    return medium.clock.state()
+
+  def capture_thread(self, petition=0, nodes=None, heartbeat=None):
+    medium = self.__thread_medium(petition)
+    tap = ThreadTap(nodes)
+    medium.add_tap(tap)
+    return self.__stream_capture(medium, tap, heartbeat)
+
+  def __stream_capture(self, medium, tap, heartbeat):
+    try:
+      yield capture_header()
+      yield from tap.packets(timeout=heartbeat)
+    finally:
+      medium.remove_tap(tap)
+      self.logger.info('thread capture ended: {}'.format(tap.stats))
+
+  def start_thread_recording(self,
+                             petition=0,
+                             nodes=None,
+                             file_size=RING_FILE_SIZE,
+                             files=RING_FILES):
+    medium = self.__thread_medium(petition)
+    directory = os.path.join(
+        os.environ.get('CIRQUE_CAPTURE_DIR', CAPTURE_DIR),
+        '{}-{}'.format(self.home_id, petition))
+    with self.__devices_lock:
+      if petition in self.__recordings:
+        raise ValueError('thread petition {} is already recorded'.format(
+            petition))
+      self.__recordings[petition] = ThreadRecording(
+          medium, RingWriter(directory, file_size, files), nodes).start()
+    return directory
+
+  def stop_thread_recording(self, petition=0):
+    with self.__devices_lock:
+      recording = self.__recordings.pop(petition, None)
+    if recording is None:
+      raise ValueError('thread petition {} is not recorded'.format(petition))
+    return recording.stop()
+
   def get_home_devices(self):
     return {
         node.id: self.get_device_state(node.id)
@@ -249,15 +881,33 @@ class CirqueHome:
               cap.name: cap.description for cap in node.capabilities
           },
           'description': node.description,
+          'state': dict(node.state),
+          'timings': node.timings.as_list(),
       }
     else:
       return None
 
-  def stop_device(self, node_id):
+  def wait_ready(self, node_id, timeout=READY_TIMEOUT, thread_roles=None):
     if node_id not in self.home['devices']:
-      return ''
-    self.home['devices'][node_id].stop()
-    del self.home['devices'][node_id]
+      return None
+    # e.g. wait until a Thread node has attached as a leader, router or child
+    probes = [ThreadStateProbe(thread_roles)] if thread_roles else []
+    pending = self.home['devices'][node_id].wait_ready(timeout, probes)
+    return {'ready': not pending, 'pending': pending}
+
+  def stop_device(self, node_id):
+    with self.__devices_lock:
+      if node_id not in self.home['devices']:
+        return ''
+      node = self.home['devices'].pop(node_id)
+      reservation = self.__reservations.pop(node_id, None)
+    self.event_watcher.unsubscribe(node_id)
+    if self.registry is not None:
+      self.registry.remove_device(node_id)
+    with span('stop_device', 'device', home=self.home_id, device=node_id):
+      node.stop()
+    if reservation is not None:
+      reservation.release()
     return node_id
 
   def get_device_log(self, node_id, tail='all'):
@@ -268,13 +918,31 @@ class CirqueHome:
   def destroy_home(self):
     if not self.home:
       return
-    for node in self.home['devices'].values():
-      node.stop()
+    self.event_watcher.stop()
+    # every isolation rule and grant of the home goes in one transaction.
+    Netfilter.release(self.home_id)
+    for petition in list(self.__recordings):
+      self.stop_thread_recording(petition)
+    with futures.ThreadPoolExecutor(max_workers=BRINGUP_WORKERS) as executor:
+      list(executor.map(lambda node: node.stop(),
+                        self.home['devices'].values()))
+    remove_labelled_containers(self.docker_client, self.labels)
+    Radios.close_medium(self.home_id)
+    WiFiEvents.close(self.home_id)
+    ThreadAllocator.close(self.home_id)
+    BluetoothHost.close(self.home_id)
     for lan in ('external_lan', 'internal_lan', 'ipv6_lan', 'ipvlan_lan'):
       if getattr(self, lan):
+        ContainerPool.drain(network=getattr(self, lan).name)
         getattr(self, lan).close()
-    self.docker_client.containers.prune()
-    self.docker_client.networks.prune()
+    remove_labelled_networks(self.docker_client, self.labels)
+    for reservation in self.__reservations.values():
+      reservation.release()
+    self.__reservations = {}
+    Placement.release(self.home_id)
+    Tracer.discard(self.home_id)
+    if self.registry is not None:
+      self.registry.remove_home(self.home_id)
     self.home = None
     return self.home_id
 
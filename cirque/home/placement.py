@@ -0,0 +1,142 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from threading import Lock
+
+import docker
+
+from cirque.common.cirquelog import CirqueLog
+from cirque.common.exceptions import NoDockerEndpointError
+
+# containers an endpoint is expected to run per CPU / per GiB of memory.
+CONTAINERS_PER_CPU = 8
+CONTAINERS_PER_GIB = 4
+# containers a home is expected to run until it tells how many devices it
+# brings up.
+HOME_CONTAINERS = 4
+# the daemon of the service host, whose containers share its pts, /proc,
+# iptables, radios and bluetoothd.
+LOCAL_DOCKER_URL = 'unix:///var/run/docker.sock'
+# capabilities which are backed by resources of the service host: Thread
+# ptys, hwsim radios and control sockets, DOCKER-USER rules, bluetoothd and
+# the X servers of Xvnc.
+HOST_CAPABILITIES = ('Bluetooth', 'LanAccess', 'Thread', 'WiFi', 'Xvnc')
+
+
+def needs_local_host(device_config):
+  # access points render their config on the service host as well.
+  return device_config.get('type') == 'wifi_ap' or any(
+      capability in HOST_CAPABILITIES
+      for capability in device_config.get('capability', []))
+
+
+class DockerEndpoint:
+
+  def __init__(self, url=None):
+    self.url = url
+    if url:
+      self.client = docker.DockerClient(base_url=url)
+    else:
+      self.client = docker.from_env()
+    # home id -> containers the home is expected to run
+    self.homes = {}
+
+  @property
+  def local(self):
+    return not self.url or self.url == LOCAL_DOCKER_URL
+
+  def free_capacity(self):
+    info = self.client.info()
+    slots = min(info['NCPU'] * CONTAINERS_PER_CPU,
+                info['MemTotal'] * CONTAINERS_PER_GIB // (1 << 30))
+    # homes placed a moment ago have no containers running yet.
+    return slots - max(info['ContainersRunning'], sum(self.homes.values()))
+
+
+class _Placement:
+
+  def __init__(self):
+    self.logger = CirqueLog.get_cirque_logger(self.__class__.__name__)
+    self.__lock = Lock()
+    self.__endpoints = None
+    self.__homes = {}
+
+  @staticmethod
+  def configured_urls():
+    urls = os.environ.get('CIRQUE_DOCKER_ENDPOINTS', '')
+    return [url.strip() for url in urls.split(',') if url.strip()] or [None]
+
+  @property
+  def endpoints(self):
+    with self.__lock:
+      if self.__endpoints is None:
+        self.__endpoints = [
+            DockerEndpoint(url) for url in self.configured_urls()
+        ]
+      return list(self.__endpoints)
+
+  def endpoint(self, url):
+    for endpoint in self.endpoints:
+      if endpoint.url == url or (not url and not endpoint.url):
+        return endpoint
+    raise NoDockerEndpointError(
+        'docker endpoint {} is not configured'.format(url))
+
+  def place(self, home_id, local=False):
+    endpoints = [e for e in self.endpoints if e.local or not local]
+    if not endpoints:
+      raise NoDockerEndpointError('no local docker endpoint is configured')
+    # scored and assigned in one go, so that a burst of new homes does not
+    # see the same free capacity and pile onto one endpoint.
+    with self.__lock:
+      scores = []
+      for endpoint in endpoints:
+        try:
+          capacity = endpoint.free_capacity()
+        except docker.errors.DockerException as e:
+          self.logger.error('docker endpoint {} unavailable: {!r}'.format(
+              endpoint.url or 'default', e))
+          continue
+        scores.append((capacity, -len(endpoint.homes), endpoint))
+      if not scores:
+        raise NoDockerEndpointError('no docker endpoint is available')
+      _, _, endpoint = max(scores, key=lambda score: score[:2])
+      self.__assign(home_id, endpoint)
+    self.logger.info('placing home {} on docker endpoint {}'.format(
+        home_id, endpoint.url or 'default'))
+    return endpoint
+
+  def __assign(self, home_id, endpoint):
+    endpoint.homes[home_id] = HOME_CONTAINERS
+    self.__homes[home_id] = endpoint
+
+  def assign(self, home_id, endpoint):
+    with self.__lock:
+      self.__assign(home_id, endpoint)
+
+  def expect(self, home_id, containers):
+    with self.__lock:
+      endpoint = self.__homes.get(home_id)
+      if endpoint is not None:
+        endpoint.homes[home_id] = containers
+
+  def release(self, home_id):
+    with self.__lock:
+      endpoint = self.__homes.pop(home_id, None)
+      if endpoint is not None:
+        endpoint.homes.pop(home_id, None)
+
+
+Placement = _Placement()
@@ -0,0 +1,121 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import sqlite3
+import time
+from threading import Lock
+
+from cirque.common.cirquelog import CirqueLog
+
+DEFAULT_REGISTRY_PATH = '/var/lib/cirque/registry.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS homes (
+  home_id TEXT PRIMARY KEY,
+  endpoint TEXT NOT NULL,
+  lans TEXT NOT NULL,
+  created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS devices (
+  node_id TEXT PRIMARY KEY,
+  home_id TEXT NOT NULL,
+  config TEXT NOT NULL,
+  capabilities TEXT NOT NULL,
+  created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS service (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+'''
+
+
+class HomeRegistry:
+
+  @classmethod
+  def open_default(cls):
+    path = os.environ.get('CIRQUE_REGISTRY_PATH', DEFAULT_REGISTRY_PATH)
+    try:
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      return cls(path)
+    except (OSError, sqlite3.Error) as e:
+      CirqueLog.get_cirque_logger('registry').error(
+          'home registry {} unavailable: {!r}'.format(path, e))
+      return None
+
+  def __init__(self, path):
+    self.path = path
+    self.__lock = Lock()
+    self.__db = sqlite3.connect(path, check_same_thread=False)
+    self.__db.executescript(SCHEMA)
+    self.__db.commit()
+
+  def __execute(self, statement, args=()):
+    with self.__lock:
+      cursor = self.__db.execute(statement, args)
+      self.__db.commit()
+      return cursor.fetchall()
+
+  def service_id(self, default):
+    # the first id stored wins, later calls return it.
+    self.__execute('INSERT OR IGNORE INTO service (key, value) VALUES (?, ?)',
+                   ('service_id', default))
+    return self.__execute('SELECT value FROM service WHERE key = ?',
+                          ('service_id',))[0][0]
+
+  def add_home(self, home_id, endpoint=None):
+    self.__execute(
+        'INSERT OR IGNORE INTO homes (home_id, endpoint, lans, created) '
+        'VALUES (?, ?, ?, ?)', (home_id, endpoint or '', '{}', time.time()))
+
+  def update_home_lans(self, home_id, lans):
+    self.__execute('UPDATE homes SET lans = ? WHERE home_id = ?',
+                   (json.dumps(lans), home_id))
+
+  def remove_home(self, home_id):
+    self.__execute('DELETE FROM devices WHERE home_id = ?', (home_id,))
+    self.__execute('DELETE FROM homes WHERE home_id = ?', (home_id,))
+
+  def add_device(self, home_id, node_id, config, capabilities):
+    self.__execute(
+        'INSERT OR REPLACE INTO devices '
+        '(node_id, home_id, config, capabilities, created) '
+        'VALUES (?, ?, ?, ?, ?)',
+        (node_id, home_id, json.dumps(config, default=str),
+         json.dumps(capabilities, default=str), time.time()))
+
+  def remove_device(self, node_id):
+    self.__execute('DELETE FROM devices WHERE node_id = ?', (node_id,))
+
+  def homes(self):
+    rows = self.__execute(
+        'SELECT home_id, endpoint, lans FROM homes ORDER BY created')
+    return [(home_id, endpoint or None, json.loads(lans))
+            for home_id, endpoint, lans in rows]
+
+  def devices(self, home_id):
+    rows = self.__execute(
+        'SELECT node_id, config, capabilities FROM devices '
+        'WHERE home_id = ? ORDER BY created', (home_id,))
+    return [{
+        'node_id': node_id,
+        'config': json.loads(config),
+        'capabilities': json.loads(capabilities),
+    } for node_id, config, capabilities in rows]
+
+  def close(self):
+    with self.__lock:
+      self.__db.close()
@@ -0,0 +1,233 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import os
+from threading import Condition
+
+from cirque.common.cirquelog import CirqueLog
+from cirque.common.exceptions import AdmissionError
+from cirque.connectivity.hwsim import MAX_RADIOS
+
+RESOURCES = ('cpu', 'memory', 'phy', 'ble', 'display', 'thread')
+
+# what a single device container costs the host, in cores and MiB.
+DEVICE_CPU = 0.125
+DEVICE_MEMORY = 64
+
+# a queued request holds a worker of the service, it must give up eventually
+# so that the requests which free capacity can still be served.
+DEFAULT_QUEUE_TIMEOUT = 60
+
+DEFAULT_BLE_ADAPTERS = 8
+DEFAULT_DISPLAYS = 64
+DEFAULT_THREAD_NODES = 256
+
+
+def device_demand(device_config):
+  capabilities = device_config.get('capability', [])
+  demand = dict.fromkeys(RESOURCES, 0)
+  demand['cpu'] = DEVICE_CPU
+  demand['memory'] = DEVICE_MEMORY
+  if device_config.get('type') == 'wifi_ap' or 'WiFi' in capabilities:
+    demand['phy'] = 1
+  if 'Bluetooth' in capabilities:
+    demand['ble'] = 1
+  if 'Xvnc' in capabilities:
+    demand['display'] = 1
+  if 'Thread' in capabilities:
+    demand['thread'] = 1
+  return demand
+
+
+def total_demand(demands):
+  total = dict.fromkeys(RESOURCES, 0)
+  for demand in demands:
+    for resource, amount in demand.items():
+      total[resource] += amount
+  return total
+
+
+def home_demand(home_config):
+  return total_demand(device_demand(config) for config in home_config.values())
+
+
+def memory_total_mib():
+  with open('/proc/meminfo') as meminfo:
+    for line in meminfo:
+      if line.startswith('MemTotal:'):
+        return int(line.split()[1]) // 1024
+  return 0
+
+
+def host_capacity():
+  capacity = {
+      'cpu': os.cpu_count() or 1,
+      'memory': memory_total_mib(),
+      'phy': MAX_RADIOS,
+      'ble': DEFAULT_BLE_ADAPTERS,
+      'display': DEFAULT_DISPLAYS,
+      'thread': DEFAULT_THREAD_NODES,
+  }
+  # e.g. CIRQUE_CAPACITY=cpu=16,phy=64
+  for item in os.environ.get('CIRQUE_CAPACITY', '').split(','):
+    if '=' in item:
+      resource, amount = item.split('=', 1)
+      if resource.strip() not in capacity:
+        raise ValueError('unknown resource {} in CIRQUE_CAPACITY'.format(
+            resource))
+      capacity[resource.strip()] = float(amount)
+  return capacity
+
+
+def fits(demand, available):
+  return all(amount <= available[resource]
+             for resource, amount in demand.items())
+
+
+class Reservation:
+
+  def __init__(self, scheduler, demand):
+    self.scheduler = scheduler
+    self.demand = dict(demand)
+
+  def split(self, demand):
+    return self.scheduler.split(self, demand)
+
+  def release(self):
+    self.scheduler.release(self)
+
+
+class _Ticket:
+
+  def __init__(self, seq, owner, priority, demand):
+    self.seq = seq
+    self.owner = owner
+    self.priority = priority
+    self.demand = demand
+    self.admitted = False
+
+
+class _Scheduler:
+
+  def __init__(self):
+    self.logger = CirqueLog.get_cirque_logger(self.__class__.__name__)
+    self.policy = os.environ.get('CIRQUE_SCHEDULER_POLICY', 'priority')
+    self.timeout = float(
+        os.environ.get('CIRQUE_SCHEDULER_TIMEOUT', DEFAULT_QUEUE_TIMEOUT))
+    self.__capacity = None
+    self.__in_use = dict.fromkeys(RESOURCES, 0)
+    self.__queue = []
+    self.__seq = itertools.count()
+    self.__cv = Condition()
+
+  @property
+  def capacity(self):
+    with self.__cv:
+      if self.__capacity is None:
+        self.__capacity = host_capacity()
+      return dict(self.__capacity)
+
+  @capacity.setter
+  def capacity(self, capacity):
+    with self.__cv:
+      self.__capacity = dict(capacity)
+      self.__admit()
+
+  def __available(self):
+    return {
+        resource: self.__capacity[resource] - self.__in_use[resource]
+        for resource in RESOURCES
+    }
+
+  def __sort_key(self, ticket):
+    if self.policy == 'fifo':
+      return ticket.seq
+    return (-ticket.priority, ticket.seq)
+
+  def acquire(self, demand, owner=None, priority=0, timeout=None):
+    if timeout is None:
+      timeout = self.timeout
+    capacity = self.capacity
+    if not fits(demand, capacity):
+      raise AdmissionError('request {} of {} exceeds host capacity {}'.format(
+          demand, owner, capacity))
+    with self.__cv:
+      ticket = _Ticket(next(self.__seq), owner, priority, demand)
+      self.__queue.append(ticket)
+      self.__queue.sort(key=self.__sort_key)
+      self.__admit()
+      if not ticket.admitted:
+        self.logger.info('queued request of {} at position {}'.format(
+            owner, self.__queue.index(ticket)))
+      if not self.__cv.wait_for(lambda: ticket.admitted, timeout):
+        position = self.__queue.index(ticket)
+        self.__queue.remove(ticket)
+        self.__admit()
+        raise AdmissionError(
+            'request of {} timed out after {}s at queue position {}'.format(
+                owner, timeout, position), position)
+    return Reservation(self, demand)
+
+  def claim(self, demand):
+    # accounts for resources already in use, e.g. by reattached devices.
+    with self.__cv:
+      if self.__capacity is None:
+        self.__capacity = host_capacity()
+      for resource, amount in demand.items():
+        self.__in_use[resource] += amount
+    return Reservation(self, demand)
+
+  def __admit(self):
+    # only the head of the queue is admitted so that large requests are not
+    # starved by a stream of small ones.
+    while self.__queue and fits(self.__queue[0].demand, self.__available()):
+      ticket = self.__queue.pop(0)
+      for resource, amount in ticket.demand.items():
+        self.__in_use[resource] += amount
+      ticket.admitted = True
+    self.__cv.notify_all()
+
+  def split(self, reservation, demand):
+    with self.__cv:
+      for resource, amount in demand.items():
+        if amount > reservation.demand.get(resource, 0):
+          raise AdmissionError('{} exceeds reservation {}'.format(
+              demand, reservation.demand))
+      for resource, amount in demand.items():
+        reservation.demand[resource] -= amount
+    return Reservation(self, demand)
+
+  def release(self, reservation):
+    with self.__cv:
+      for resource, amount in reservation.demand.items():
+        self.__in_use[resource] -= amount
+      reservation.demand = dict.fromkeys(RESOURCES, 0)
+      self.__admit()
+
+  def in_use(self):
+    with self.__cv:
+      return dict(self.__in_use)
+
+  def pending(self):
+    with self.__cv:
+      return [{
+          'owner': ticket.owner,
+          'priority': ticket.priority,
+          'position': position,
+          'demand': dict(ticket.demand),
+      } for position, ticket in enumerate(self.__queue)]
+
+
+Scheduler = _Scheduler()
@@ -0,0 +1,233 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import unittest
+from unittest import mock
+
+from cirque.common.exceptions import ConnectivityError, HomeBringupError
+from cirque.connectivity.threadallocator import ThreadAllocator
+from cirque.home.home import CirqueHome
+from cirque.home.scheduler import _Scheduler, host_capacity
+
+
+@mock.patch('cirque.home.home.Placement')
+@mock.patch('cirque.home.home.ThreadCapability')
+@mock.patch('cirque.home.home.DockerNode')
+@mock.patch('cirque.home.home.HomeLan')
+@mock.patch('cirque.home.home.DockerEventWatcher')
+@mock.patch('cirque.home.home.docker')
+class TestAddDevices(unittest.TestCase):
+
+  def setUp(self):
+    self.scheduler = _Scheduler()
+    self.scheduler.capacity = dict(host_capacity(), cpu=64, memory=1 << 16)
+    patcher = mock.patch('cirque.home.home.Scheduler', new=self.scheduler)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def __make_nodes(self, docker_node):
+    ids = itertools.count()
+
+    def make_node(*args, **kwargs):
+      node = mock.MagicMock()
+      node.id = 'node{}'.format(next(ids))
+      return node
+
+    docker_node.side_effect = make_node
+
+  def test_replicas_get_a_block_of_thread_node_ids(self, _docker, _watcher,
+                                                   home_lan, docker_node,
+                                                   thread_capability,
+                                                   _placement):
+    self.__make_nodes(docker_node)
+    home = CirqueHome('home')
+    results = dict(
+        home.add_devices({
+            'type': 'generic_node_image',
+            'capability': ['Thread'],
+        }, 5))
+    self.assertEqual(sorted(results), list(range(5)))
+    self.assertEqual(
+        sorted(result['id'] for result in results.values()),
+        ['node{}'.format(i) for i in range(5)])
+    node_ids = sorted(
+        call.args[0].node_id for call in thread_capability.call_args_list)
+    self.assertEqual(node_ids, [1, 2, 3, 4, 5])
+    self.assertEqual(home_lan.call_count, 1)
+    self.assertEqual(len(home.devices), 5)
+    home.destroy_home()
+
+  def test_failed_replicas_are_reported(self, _docker, _watcher, _home_lan,
+                                        docker_node, _thread_capability,
+                                        _placement):
+    failing = mock.MagicMock()
+    failing.run.side_effect = RuntimeError('no more containers')
+    docker_node.side_effect = [mock.MagicMock(id='node0'), failing]
+    home = CirqueHome('home')
+    results = dict(
+        home.add_devices({'type': 'generic_node_image'}, 2, max_workers=1))
+    self.assertEqual(results[0], {'id': 'node0'})
+    self.assertIn('no more containers', results[1]['error'])
+    failing.stop.assert_called_once()
+    home.destroy_home()
+
+  def test_unconsumed_stream_holds_nothing(self, *_):
+    home = CirqueHome('home')
+    results = home.add_devices({
+        'type': 'generic_node_image',
+        'capability': ['Thread'],
+    }, 3)
+    self.assertFalse(any(self.scheduler.in_use().values()))
+    self.assertNotIn(('home', 0), ThreadAllocator.leases())
+    results.close()
+    home.destroy_home()
+
+  def test_failed_lease_releases_reservation(self, *_):
+    home = CirqueHome('home')
+    with mock.patch('cirque.home.home.ThreadAllocator.lease_many',
+                    side_effect=ConnectivityError('no room')):
+      with self.assertRaises(ConnectivityError):
+        list(
+            home.add_devices({
+                'type': 'generic_node_image',
+                'capability': ['Thread'],
+            }, 3))
+    self.assertFalse(any(self.scheduler.in_use().values()))
+    home.destroy_home()
+
+  def test_failed_bringup_destroys_home(self, _docker, _watcher, home_lan,
+                                       docker_node, _thread_capability,
+                                       _placement):
+    started = mock.MagicMock(id='node0')
+    failing = mock.MagicMock()
+    failing.run.side_effect = RuntimeError('no more containers')
+    docker_node.side_effect = [started, failing]
+    home = CirqueHome('home')
+    registry = home.registry = mock.MagicMock()
+    with self.assertRaises(HomeBringupError) as raised:
+      home.create_home(
+          {
+              'device0': {
+                  'type': 'generic_node_image'
+              },
+              'device1': {
+                  'type': 'generic_node_image',
+                  'depends_on': ['device0'],
+              },
+          },
+          max_workers=1)
+    self.assertEqual(raised.exception.results['device0'], {'id': 'node0'})
+    self.assertIsNone(home.home)
+    started.stop.assert_called_once()
+    home_lan.return_value.close.assert_called_once()
+    registry.remove_home.assert_called_once_with('home')
+    self.assertFalse(any(self.scheduler.in_use().values()))
+
+  def test_failed_lan_destroys_home(self, _docker, _watcher, home_lan,
+                                    docker_node, _thread_capability,
+                                    _placement):
+    external = mock.MagicMock()
+    home_lan.side_effect = [external, ConnectivityError('no subnet left')]
+    home = CirqueHome('home')
+    registry = home.registry = mock.MagicMock()
+    with mock.patch('cirque.home.home.BluetoothHost') as bluetooth_host, \
+        self.assertRaises(HomeBringupError):
+      home.create_home({
+          'device0': {
+              'type': 'generic_node_image',
+              'capability': ['Bluetooth'],
+          },
+          'device1': {
+              'type': 'generic_node_image',
+              'docker_network': 'Internal',
+          },
+      })
+    docker_node.assert_not_called()
+    bluetooth_host.reserve.assert_called_once_with('home', 1)
+    bluetooth_host.close.assert_called_once_with('home')
+    external.close.assert_called_once()
+    registry.remove_home.assert_called_once_with('home')
+    self.assertFalse(any(self.scheduler.in_use().values()))
+
+  def test_failed_capability_aborts_created_ones(self, _docker, _watcher,
+                                                 _home_lan, docker_node,
+                                                 thread_capability,
+                                                 _placement):
+    home = CirqueHome('home')
+    with self.assertRaises(AttributeError):
+      home.add_device({
+          'type': 'generic_node_image',
+          'capability': ['Thread', 'TrafficControl'],
+      })
+    thread_capability.return_value.abort_capability.assert_called_once()
+    docker_node.assert_not_called()
+    self.assertFalse(any(self.scheduler.in_use().values()))
+    home.destroy_home()
+
+  def test_wifi_ap_creates_no_capabilities(self, _docker, _watcher,
+                                           _home_lan, _docker_node,
+                                           thread_capability, _placement):
+    home = CirqueHome('home')
+    with mock.patch('cirque.home.home.WiFiAPNode') as wifi_ap_node:
+      wifi_ap_node.return_value.id = 'ap'
+      self.assertEqual(
+          home.add_device({
+              'type': 'wifi_ap',
+              'capability': ['Thread'],
+          }), 'ap')
+    thread_capability.assert_not_called()
+    home.destroy_home()
+
+  def test_failed_lan_releases_device_reservation(self, _docker, _watcher,
+                                                  home_lan, docker_node,
+                                                  _thread_capability,
+                                                  _placement):
+    home_lan.side_effect = ConnectivityError('no subnet left')
+    home = CirqueHome('home')
+    with self.assertRaises(ConnectivityError):
+      home.add_device({'type': 'generic_node_image'})
+    docker_node.assert_not_called()
+    self.assertFalse(any(self.scheduler.in_use().values()))
+    home.destroy_home()
+
+  def test_remote_home_rejects_host_capabilities(self, _docker, _watcher,
+                                                 _home_lan, docker_node,
+                                                 _thread_capability,
+                                                 placement):
+    placement.place.return_value.local = False
+    home = CirqueHome('home')
+    with self.assertRaises(ValueError):
+      home.add_devices({
+          'type': 'generic_node_image',
+          'capability': ['Thread'],
+      }, 2)
+    with self.assertRaises(ValueError):
+      home.create_home({'ap': {'type': 'wifi_ap'}})
+    docker_node.assert_not_called()
+    self.assertFalse(any(self.scheduler.in_use().values()))
+    home.destroy_home()
+
+  def test_invalid_specification(self, *_):
+    home = CirqueHome('home')
+    with self.assertRaises(ValueError):
+      home.add_devices({'capability': ['Thread']}, 2)
+    with self.assertRaises(ValueError):
+      home.add_devices({'type': 'generic_node_image'}, 0)
+    home.destroy_home()
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestAddDevices)
+  unittest.TextTestRunner(verbosity=2).run(suite)
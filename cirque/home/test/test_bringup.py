@@ -0,0 +1,84 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from cirque.home.home import bringup_stages
+
+
+class TestBringupStages(unittest.TestCase):
+
+  def test_independent_devices_share_a_stage(self):
+    stages = bringup_stages({
+        'device0': {
+            'type': 'generic_node_image',
+            'capability': ['Thread'],
+        },
+        'device1': {
+            'type': 'generic_node_image',
+        },
+    })
+    self.assertEqual(stages, [['device0', 'device1']])
+
+  def test_wifi_stations_wait_for_access_points(self):
+    stages = bringup_stages({
+        'station': {
+            'type': 'generic_node_image',
+            'capability': ['WiFi'],
+        },
+        'thread': {
+            'type': 'generic_node_image',
+            'capability': ['Thread'],
+        },
+        'ap': {
+            'type': 'wifi_ap',
+        },
+    })
+    self.assertEqual(stages, [['ap', 'thread'], ['station']])
+
+  def test_explicit_dependencies(self):
+    stages = bringup_stages({
+        'a': {
+            'type': 'generic_node_image',
+            'depends_on': ['b'],
+        },
+        'b': {
+            'type': 'generic_node_image',
+            'depends_on': ['c'],
+        },
+        'c': {
+            'type': 'generic_node_image',
+        },
+    })
+    self.assertEqual(stages, [['c'], ['b'], ['a']])
+
+  def test_invalid_dependencies(self):
+    with self.assertRaises(ValueError):
+      bringup_stages({'a': {'type': 'node', 'depends_on': ['missing']}})
+    with self.assertRaises(ValueError):
+      bringup_stages({
+          'a': {
+              'type': 'node',
+              'depends_on': ['b']
+          },
+          'b': {
+              'type': 'node',
+              'depends_on': ['a']
+          },
+      })
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestBringupStages)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -18,7 +18,7 @@ import unittest
 
 from cirque.common.cirquelog import CirqueLog
 from cirque.home.home import CirqueHome
-from cirque.common.utils import sleep_time, host_run
+from cirque.common.utils import host_run
 
 
 class TestHome(unittest.TestCase):
@@ -58,7 +58,7 @@ class TestHome(unittest.TestCase):
                       if desc['type'] == 'wifi_ap')
     self.assertIsNotNone(generic_node_id)
     self.assertIsNotNone(wifi_ap_id)
-    sleep_time(self.home.logger, 20, 'waiting for processes to be launched')
+    self.assertTrue(self.home.wait_ready(generic_node_id, 20)['ready'])
     self.__verify_process_in_container(generic_node_id, 'otbr-agent')
     self.__verify_process_in_container(generic_node_id, 'wpa_supplicant')
     if self.weave_crt_path is not None:
@@ -76,7 +76,7 @@ class TestHome(unittest.TestCase):
     node_id = self.home.add_device(device_config)
     self.assertIsNotNone(node_id)
     self.home.logger.info('{}'.format(device_config))
-    sleep_time(self.home.logger, 20, 'waiting for processes to be launched')
+    self.assertTrue(self.home.wait_ready(node_id, 20)['ready'])
     self.__verify_process_in_container(node_id, 'otbr-agent')
     self.__verify_process_in_container(node_id, 'wpa_supplicant')
 
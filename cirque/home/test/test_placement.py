@@ -0,0 +1,145 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+from unittest import mock
+
+import docker
+
+from cirque.common.exceptions import NoDockerEndpointError
+from cirque.home.placement import (LOCAL_DOCKER_URL, DockerEndpoint,
+                                   _Placement, needs_local_host)
+
+GIB = 1 << 30
+
+
+def make_endpoint(url, ncpu, memory_gib, running):
+  with mock.patch('cirque.home.placement.docker.DockerClient'):
+    endpoint = DockerEndpoint(url)
+  endpoint.client.info.return_value = {
+      'NCPU': ncpu,
+      'MemTotal': memory_gib * GIB,
+      'ContainersRunning': running,
+  }
+  return endpoint
+
+
+class TestPlacement(unittest.TestCase):
+
+  def setUp(self):
+    self.placement = _Placement()
+
+  def __use(self, *endpoints):
+    patcher = mock.patch.object(
+        _Placement,
+        'endpoints',
+        new_callable=mock.PropertyMock,
+        return_value=list(endpoints))
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  @mock.patch.dict(os.environ, {
+      'CIRQUE_DOCKER_ENDPOINTS': 'unix:///a.sock, tcp://dind0:2375,'
+  })
+  def test_configured_urls(self):
+    self.assertEqual(self.placement.configured_urls(),
+                     ['unix:///a.sock', 'tcp://dind0:2375'])
+
+  @mock.patch.dict(os.environ, {'CIRQUE_DOCKER_ENDPOINTS': ''})
+  def test_default_endpoint(self):
+    self.assertEqual(self.placement.configured_urls(), [None])
+
+  def test_places_on_most_free_capacity(self):
+    busy = make_endpoint('tcp://busy', 4, 64, 30)
+    idle = make_endpoint('tcp://idle', 4, 64, 2)
+    self.__use(busy, idle)
+    self.assertIs(self.placement.place('home0'), idle)
+    self.assertEqual(set(idle.homes), {'home0'})
+
+  def test_memory_bounds_capacity(self):
+    small = make_endpoint('tcp://small', 32, 2, 0)
+    large = make_endpoint('tcp://large', 4, 64, 0)
+    self.__use(small, large)
+    self.assertIs(self.placement.place('home0'), large)
+
+  def test_ties_go_to_endpoint_with_fewer_homes(self):
+    first = make_endpoint('tcp://first', 4, 64, 0)
+    second = make_endpoint('tcp://second', 4, 64, 0)
+    self.__use(first, second)
+    self.placement.place('home0')
+    self.placement.place('home1')
+    self.assertEqual(len(first.homes), 1)
+    self.assertEqual(len(second.homes), 1)
+    self.placement.release('home0')
+    self.assertEqual(len(first.homes) + len(second.homes), 1)
+
+  def test_burst_of_homes_is_spread(self):
+    first = make_endpoint('tcp://first', 4, 64, 0)
+    second = make_endpoint('tcp://second', 4, 64, 2)
+    self.__use(first, second)
+    # none of the homes has started a container yet
+    for i in range(8):
+      self.placement.place('home{}'.format(i))
+    self.assertEqual(len(first.homes), 4)
+    self.assertEqual(len(second.homes), 4)
+
+  def test_expected_containers_count_against_capacity(self):
+    first = make_endpoint('tcp://first', 4, 64, 0)
+    second = make_endpoint('tcp://second', 4, 64, 0)
+    self.__use(first, second)
+    big = self.placement.place('big')
+    self.placement.expect('big', 20)
+    for i in range(4):
+      self.assertIsNot(self.placement.place('home{}'.format(i)), big)
+
+  def test_host_capabilities_stay_on_local_endpoint(self):
+    local = make_endpoint(LOCAL_DOCKER_URL, 4, 64, 30)
+    remote = make_endpoint('tcp://dind0:2375', 4, 64, 0)
+    self.__use(local, remote)
+    self.assertIs(self.placement.place('home0', local=True), local)
+    self.assertIs(self.placement.place('home1'), remote)
+    self.__use(remote)
+    with self.assertRaises(NoDockerEndpointError):
+      self.placement.place('home2', local=True)
+
+  def test_needs_local_host(self):
+    self.assertTrue(needs_local_host({'type': 'wifi_ap'}))
+    self.assertTrue(
+        needs_local_host({
+            'type': 'generic_node_image',
+            'capability': ['Interactive', 'Thread']
+        }))
+    self.assertFalse(
+        needs_local_host({
+            'type': 'generic_node_image',
+            'capability': ['Interactive', 'TrafficControl']
+        }))
+
+  def test_unreachable_endpoints_are_skipped(self):
+    down = make_endpoint('tcp://down', 64, 64, 0)
+    down.client.info.side_effect = docker.errors.DockerException('down')
+    up = make_endpoint('tcp://up', 1, 1, 0)
+    self.__use(down, up)
+    self.assertIs(self.placement.place('home0'), up)
+    down.client.info.side_effect = None
+    up.client.info.side_effect = docker.errors.DockerException('down')
+    self.__use(up)
+    with self.assertRaises(NoDockerEndpointError):
+      self.placement.place('home1')
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestPlacement)
+  unittest.TextTestRunner(verbosity=2).run(suite)
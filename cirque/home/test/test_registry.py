@@ -0,0 +1,70 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+
+from cirque.home.registry import HomeRegistry
+
+
+class TestHomeRegistry(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.tmpdir.name, 'registry.db')
+    self.registry = HomeRegistry(self.path)
+
+  def tearDown(self):
+    self.registry.close()
+    self.tmpdir.cleanup()
+
+  def test_records_survive_reopen(self):
+    lans = {'external_lan': {'name': 'h_external', 'internal': False,
+                             'ipv6': False}}
+    capabilities = [{'name': 'Thread', 'description': {},
+                     'resources': {'pids': [10], 'node_id': 1,
+                                   'petition_id': 0}}]
+    self.registry.add_home('h', 'tcp://dind0:2375')
+    self.registry.update_home_lans('h', lans)
+    self.registry.add_device('h', 'abc', {'type': 'mobile'}, capabilities)
+    self.registry.close()
+    self.registry = HomeRegistry(self.path)
+    self.assertEqual(self.registry.homes(), [('h', 'tcp://dind0:2375', lans)])
+    self.assertEqual(self.registry.devices('h'), [{
+        'node_id': 'abc',
+        'config': {'type': 'mobile'},
+        'capabilities': capabilities,
+    }])
+
+  def test_service_id_is_kept(self):
+    self.assertEqual(self.registry.service_id('first'), 'first')
+    self.registry.close()
+    self.registry = HomeRegistry(self.path)
+    self.assertEqual(self.registry.service_id('second'), 'first')
+
+  def test_remove_device_and_home(self):
+    self.registry.add_home('h')
+    self.registry.add_device('h', 'a', {'type': 'mobile'}, [])
+    self.registry.add_device('h', 'b', {'type': 'mobile'}, [])
+    self.registry.remove_device('a')
+    self.assertEqual([d['node_id'] for d in self.registry.devices('h')], ['b'])
+    self.registry.remove_home('h')
+    self.assertEqual(self.registry.homes(), [])
+    self.assertEqual(self.registry.devices('h'), [])
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestHomeRegistry)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,138 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from cirque.common.exceptions import AdmissionError
+from cirque.home.scheduler import (RESOURCES, _Scheduler, device_demand,
+                                   home_demand, host_capacity)
+
+
+def demand(**amounts):
+  return dict(dict.fromkeys(RESOURCES, 0), **amounts)
+
+
+class TestScheduler(unittest.TestCase):
+
+  def setUp(self):
+    self.scheduler = _Scheduler()
+    self.scheduler.capacity = demand(cpu=1, memory=1024, phy=2)
+
+  def __acquire_in_background(self, request, owner, priority=0):
+    admitted = threading.Event()
+
+    def acquire():
+      self.scheduler.acquire(request, owner=owner, priority=priority)
+      admitted.set()
+
+    threading.Thread(target=acquire, daemon=True).start()
+    deadline = time.monotonic() + 5
+    while owner not in [p['owner'] for p in self.scheduler.pending()] and \
+        not admitted.is_set():
+      self.assertLess(time.monotonic(), deadline)
+      time.sleep(0.01)
+    return admitted
+
+  def test_device_demand(self):
+    self.assertEqual(
+        device_demand({
+            'type': 'generic_node_image',
+            'capability': ['WiFi', 'Thread', 'Xvnc']
+        })['phy'], 1)
+    self.assertEqual(device_demand({'type': 'wifi_ap'})['phy'], 1)
+    total = home_demand({
+        'a': {
+            'type': 'node',
+            'capability': ['Bluetooth']
+        },
+        'b': {
+            'type': 'node',
+            'capability': ['Thread']
+        },
+    })
+    self.assertEqual(total['ble'], 1)
+    self.assertEqual(total['thread'], 1)
+    self.assertEqual(total['cpu'], 0.25)
+
+  @mock.patch.dict(os.environ, {'CIRQUE_CAPACITY': 'phy=64, cpu=2'})
+  def test_capacity_overrides(self):
+    capacity = host_capacity()
+    self.assertEqual(capacity['phy'], 64)
+    self.assertEqual(capacity['cpu'], 2)
+
+  def test_oversized_request_is_rejected(self):
+    with self.assertRaises(AdmissionError):
+      self.scheduler.acquire(demand(phy=3), owner='home')
+
+  def test_queued_until_released(self):
+    first = self.scheduler.acquire(demand(phy=2), owner='first')
+    admitted = self.__acquire_in_background(demand(phy=1), 'second')
+    self.assertFalse(admitted.is_set())
+    self.assertEqual(self.scheduler.pending()[0]['position'], 0)
+    first.release()
+    self.assertTrue(admitted.wait(5))
+    self.assertEqual(self.scheduler.in_use()['phy'], 1)
+
+  def test_priority_order(self):
+    first = self.scheduler.acquire(demand(phy=2), owner='first')
+    low = self.__acquire_in_background(demand(phy=2), 'low')
+    high = self.__acquire_in_background(demand(phy=2), 'high', priority=1)
+    self.assertEqual([p['owner'] for p in self.scheduler.pending()],
+                     ['high', 'low'])
+    first.release()
+    self.assertTrue(high.wait(5))
+    self.assertFalse(low.is_set())
+
+  def test_fifo_policy_ignores_priority(self):
+    self.scheduler.policy = 'fifo'
+    first = self.scheduler.acquire(demand(phy=2), owner='first')
+    self.__acquire_in_background(demand(phy=2), 'low')
+    self.__acquire_in_background(demand(phy=2), 'high', priority=1)
+    self.assertEqual([p['owner'] for p in self.scheduler.pending()],
+                     ['low', 'high'])
+    first.release()
+
+  def test_timeout_leaves_queue(self):
+    self.scheduler.acquire(demand(phy=2), owner='first')
+    with self.assertRaises(AdmissionError):
+      self.scheduler.acquire(demand(phy=1), owner='second', timeout=0.05)
+    self.assertEqual(self.scheduler.pending(), [])
+
+  def test_default_timeout_reports_position(self):
+    self.scheduler.acquire(demand(phy=2), owner='first')
+    self.scheduler.timeout = 0.05
+    with self.assertRaises(AdmissionError) as raised:
+      self.scheduler.acquire(demand(phy=1), owner='second')
+    self.assertEqual(raised.exception.position, 0)
+    self.assertEqual(self.scheduler.pending(), [])
+
+  def test_split_and_release(self):
+    reservation = self.scheduler.acquire(demand(phy=2, cpu=0.5), owner='h')
+    device = reservation.split(demand(phy=1, cpu=0.125))
+    with self.assertRaises(AdmissionError):
+      reservation.split(demand(phy=2))
+    reservation.release()
+    self.assertEqual(self.scheduler.in_use()['phy'], 1)
+    device.release()
+    device.release()
+    self.assertEqual(self.scheduler.in_use()['phy'], 0)
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestScheduler)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,110 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import threading
+
+import docker
+
+from cirque.common.cirquelog import CirqueLog
+
+POOL_LABEL = 'cirque.pool'
+# Run args which are only known once the device exists (e.g. the pts of a
+# Thread radio) cannot be satisfied by a container created in advance.
+PER_INSTANCE_RUN_ARGS = ('devices', 'name')
+
+
+class _ContainerPool:
+
+  def __init__(self):
+    self.logger = CirqueLog.get_cirque_logger(self.__class__.__name__)
+    self.size = int(os.environ.get('CIRQUE_CONTAINER_POOL_SIZE', 0))
+    self.__lock = threading.Lock()
+    self.__specs = {}
+    self.__idle = {}
+    self.__refilling = set()
+
+  @staticmethod
+  def pool_key(image, run_args):
+    return (image, json.dumps(run_args, sort_keys=True, default=str))
+
+  def is_poolable(self, run_args):
+    return self.size > 0 and \
+        all(arg not in run_args for arg in PER_INSTANCE_RUN_ARGS)
+
+  def claim(self, docker_client, image, run_args):
+    if not self.is_poolable(run_args):
+      return None
+    key = self.pool_key(image, run_args)
+    with self.__lock:
+      self.__specs[key] = (docker_client, image, dict(run_args))
+      idle = self.__idle.get(key)
+      container = idle.pop() if idle else None
+    self.logger.info('{} container for image {}'.format(
+        'claimed pooled' if container else 'no pooled', image))
+    self.__schedule_refill(key)
+    return container
+
+  def idle_count(self, image, run_args):
+    with self.__lock:
+      return len(self.__idle.get(self.pool_key(image, run_args), []))
+
+  def __schedule_refill(self, key):
+    with self.__lock:
+      if key in self.__refilling:
+        return
+      self.__refilling.add(key)
+    threading.Thread(target=self.__refill, args=(key,), daemon=True).start()
+
+  def __refill(self, key):
+    try:
+      while True:
+        with self.__lock:
+          if key not in self.__specs or \
+             len(self.__idle.get(key, [])) >= self.size:
+            return
+          docker_client, image, run_args = self.__specs[key]
+        kwargs = dict(run_args)
+        kwargs['labels'] = dict(
+            kwargs.get('labels', {}), **{POOL_LABEL: image})
+        container = docker_client.containers.run(image, detach=True, **kwargs)
+        with self.__lock:
+          if key in self.__specs:
+            self.__idle.setdefault(key, []).append(container)
+            continue
+        # the pool was drained while this container was being created
+        container.remove(force=True)
+    except docker.errors.DockerException as e:
+      self.logger.error('failed to refill pool for {}: {!r}'.format(key[0], e))
+    finally:
+      with self.__lock:
+        self.__refilling.discard(key)
+
+  def drain(self, network=None):
+    removed = []
+    with self.__lock:
+      for key, (_, _, run_args) in list(self.__specs.items()):
+        if network is None or run_args.get('network') == network:
+          del self.__specs[key]
+          removed += self.__idle.pop(key, [])
+    for container in removed:
+      try:
+        container.remove(force=True)
+      except docker.errors.DockerException as e:
+        self.logger.error('failed to remove pooled container {}: {!r}'.format(
+            container.id, e))
+
+
+ContainerPool = _ContainerPool()
@@ -0,0 +1,133 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+import docker
+
+from cirque.common.cirquelog import CirqueLog
+from cirque.common.labels import label_filters
+
+RECONNECT_DELAY = 1
+
+
+class DockerEventWatcher:
+
+  def __init__(self, docker_client, labels=None):
+    self._client = docker_client
+    self.labels = labels
+    self.logger = CirqueLog.get_cirque_logger(self.__class__.__name__)
+    self.__nodes = {}
+    self.__lock = threading.Lock()
+    self.__events = None
+    self.__thread = None
+
+  def __open(self):
+    # network events do not carry the labels of their network or container,
+    # so a labelled stream only has container events; network changes are
+    # picked up when the container starts or the stream is resynced.
+    if self.labels:
+      filters = dict(label_filters(self.labels), type=['container'])
+    else:
+      filters = {'type': ['container', 'network']}
+    return self._client.events(decode=True, filters=filters)
+
+  def start(self):
+    with self.__lock:
+      if self.__events is not None:
+        return
+      self.__events = self.__open()
+      self.__thread = threading.Thread(
+          target=self.__run, args=(self.__events,), daemon=True)
+      self.__thread.start()
+
+  def subscribe(self, node):
+    with self.__lock:
+      self.__nodes[node.id] = node
+    # anything that happened to the container before it was subscribed,
+    # e.g. while its capabilities were enabled, never reaches the cache.
+    self.__refresh(node)
+
+  def unsubscribe(self, node_id):
+    with self.__lock:
+      self.__nodes.pop(node_id, None)
+
+  def stop(self):
+    with self.__lock:
+      events, self.__events = self.__events, None
+      thread, self.__thread = self.__thread, None
+      self.__nodes.clear()
+    if events is not None:
+      events.close()
+    if thread is not None and thread is not threading.current_thread():
+      thread.join(timeout=2)
+
+  @staticmethod
+  def container_id(event):
+    if event.get('Type') == 'network':
+      return event['Actor']['Attributes'].get('container')
+    return event.get('id', event['Actor']['ID'])
+
+  def __refresh(self, node):
+    try:
+      node.refresh_state()
+    except docker.errors.NotFound:
+      node.state = dict(node.state, status='removed')
+    except docker.errors.DockerException as e:
+      self.logger.error('failed to inspect {}: {!r}'.format(node.id, e))
+
+  def __run(self, events):
+    while events is not None:
+      try:
+        for event in events:
+          with self.__lock:
+            node = self.__nodes.get(self.container_id(event))
+          if node is None:
+            continue
+          try:
+            node.apply_event(event)
+          except docker.errors.DockerException as e:
+            self.logger.error('failed to apply event {}: {!r}'.format(
+                event.get('Action'), e))
+      except docker.errors.DockerException as e:
+        if self.__events is events:
+          self.logger.error('docker event stream closed: {!r}'.format(e))
+      events = self.__reconnect(events)
+
+  def __reconnect(self, closed):
+    while True:
+      with self.__lock:
+        if self.__events is not closed:
+          return None
+      time.sleep(RECONNECT_DELAY)
+      try:
+        events = self.__open()
+      except docker.errors.DockerException as e:
+        self.logger.error('failed to reopen docker event stream: {!r}'.format(
+            e))
+        continue
+      with self.__lock:
+        if self.__events is not closed:
+          # stopped while reconnecting
+          events.close()
+          return None
+        self.__events = events
+        nodes = list(self.__nodes.values())
+      self.logger.info('docker event stream reopened, resyncing {} '
+                       'devices'.format(len(nodes)))
+      # events missed while the stream was down are only seen by inspecting.
+      for node in nodes:
+        self.__refresh(node)
+      return events
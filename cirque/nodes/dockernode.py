@@ -16,7 +16,11 @@ from functools import reduce
 
 import docker
 from cirque.common.cirquelog import CirqueLog
+from cirque.common.readiness import wait_ready
+from cirque.common.timing import PhaseTimer, phase_name
+from cirque.common.tracing import TracedContainer
 from cirque.common.utils import sleep_time
+from cirque.nodes.containerpool import ContainerPool
 
 
 class DockerNode:
@@ -25,14 +29,20 @@ class DockerNode:
                docker_client,
                node_type,
                capabilities=None,
-               base_image=None):
+               base_image=None,
+               labels=None,
+               timer=None):
     self._client = docker_client
+    self.timings = PhaseTimer() if timer is None else timer
+    self.labels = {} if labels is None else labels
     self.node_type = node_type
     if base_image:
       self.image_name = base_image
     else:
       self.image_name = node_type
     self.container = None
+    self.state = {'status': None, 'exit_code': None, 'pid': None}
+    self.__networks = {}
     self.capabilities = [] if capabilities is None else capabilities
     self.logger = CirqueLog.get_cirque_logger(self.__class__.__name__)
     self.logger.info('Capabilites: {}'.format(
@@ -54,28 +64,69 @@ class DockerNode:
           arg0[key] = item
       return arg0
 
-    capability_run_args = [
-        capability.get_docker_run_args(self) for capability in self.capabilities
-    ]
-    capability_run_args = reduce(merge_capapblity_arg, capability_run_args,
-                                 {'cap_add': ['SYS_TIME']})
-    kwargs.update(capability_run_args)
-    self.container = self._client.containers.run(
-        self.image_name, detach=True, **kwargs)
+    try:
+      capability_run_args = []
+      for capability in self.capabilities:
+        with self.timings.phase(phase_name(capability, 'run_args')):
+          capability_run_args.append(capability.get_docker_run_args(self))
+      with self.timings.phase(phase_name(self, 'merge_run_args')):
+        capability_run_args = reduce(merge_capapblity_arg,
+                                     capability_run_args,
+                                     {'cap_add': ['SYS_TIME']})
+      kwargs.update(capability_run_args)
+      if self.labels:
+        kwargs['labels'] = dict(kwargs.get('labels', {}), **self.labels)
+      with self.timings.phase(phase_name(self, 'container_run')):
+        self.container = ContainerPool.claim(self._client, self.image_name,
+                                             kwargs)
+        if self.container is None:
+          self.container = self._client.containers.run(
+              self.image_name, detach=True, **kwargs)
+    except Exception:
+      # stop() only disables the capabilities of a running container.
+      self.__abort_capabilities()
+      raise
+    if self.container is not None:
+      self.container = TracedContainer(self.container)
     self.logger.info('starting container with image {} args={}'.format(
         self.image_name, kwargs))
     if self.container is None:
       self.logger.error(
           'failed to create container: {}, please check and try again..'.format(
               self.name))
+      self.__abort_capabilities()
+    with self.timings.phase(phase_name(self, 'refresh_state')):
+      self.refresh_state()
     for capability in self.capabilities:
-      capability.enable_capability(self)
+      with self.timings.phase(phase_name(capability, 'enable')):
+        capability.enable_capability(self)
+
+  def __abort_capabilities(self):
+    for capability in self.capabilities:
+      capability.abort_capability(self)
+
+  def attach(self, container):
+    self.container = TracedContainer(container)
+    self.refresh_state()
+
+  def readiness_probes(self):
+    return [
+        probe for capability in self.capabilities
+        for probe in capability.readiness_probes(self)
+    ]
+
+  def wait_ready(self, timeout, probes=()):
+    if self.container is None:
+      return ['container']
+    return wait_ready(self, self.readiness_probes() + list(probes), timeout)
 
   def stop(self):
     if hasattr(self, 'container') and self.container:
       for capability in self.capabilities:
-        capability.disable_capability(self)
-      self.container.stop(timeout=2)
+        with self.timings.phase(phase_name(capability, 'disable')):
+          capability.disable_capability(self)
+      with self.timings.phase(phase_name(self, 'container_stop')):
+        self.container.stop(timeout=2)
     self.container = None
 
   def __del__(self):
@@ -102,10 +153,39 @@ class DockerNode:
   def base_image(self):
     return self.image_name
 
+  def refresh_state(self):
+    inspection = self.inspect()
+    self.state = {
+        'status': inspection['State']['Status'],
+        'exit_code': inspection['State']['ExitCode'],
+        'pid': inspection['State']['Pid'],
+    }
+    self.__networks = inspection['NetworkSettings']['Networks'] or {}
+
+  def apply_event(self, event):
+    action = event.get('Action', '')
+    attributes = event['Actor']['Attributes']
+    if event.get('Type') == 'network':
+      if action in ('connect', 'disconnect'):
+        self.refresh_state()
+    elif action == 'start':
+      self.refresh_state()
+    elif action == 'die':
+      self.state = {
+          'status': 'exited',
+          'exit_code': int(attributes.get('exitCode', 0)),
+          'pid': 0,
+      }
+    elif action in ('pause', 'unpause'):
+      self.state = dict(
+          self.state, status='paused' if action == 'pause' else 'running')
+    elif action == 'destroy':
+      self.state = dict(self.state, status='removed')
+
   @property
   def description(self):
-    inspection = self.inspect()
-    network_info = inspection['NetworkSettings']['Networks']
+    description = {}
+    network_info = self.__networks
     if network_info:
       network_name = next(iter(network_info.keys()))
       description = {
@@ -122,7 +202,7 @@ class DockerNode:
   def get_container_pid(self):
     if self.container is None:
       return None
-    return self.inspect()['State']['Pid']
+    return self.state['pid']
 
   def get_device_log(self, tail='all'):
     if self.container is not None:
@@ -0,0 +1,69 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+from unittest import mock
+
+from cirque.nodes.containerpool import _ContainerPool
+
+
+class TestContainerPool(unittest.TestCase):
+
+  def setUp(self):
+    self.pool = _ContainerPool()
+    self.pool.size = 2
+    self.client = mock.MagicMock()
+    self.client.containers.run.side_effect = \
+        lambda *args, **kwargs: mock.MagicMock()
+    self.run_args = {'network': 'home_external', 'cap_add': ['SYS_TIME']}
+
+  def tearDown(self):
+    self.pool.drain()
+
+  def __wait_for_idle(self, run_args, count):
+    deadline = time.monotonic() + 5
+    while self.pool.idle_count('image', run_args) < count:
+      self.assertLess(time.monotonic(), deadline)
+      time.sleep(0.01)
+
+  def test_claim_refills_pool(self):
+    self.assertIsNone(self.pool.claim(self.client, 'image', self.run_args))
+    self.__wait_for_idle(self.run_args, 2)
+    self.assertIsNotNone(self.pool.claim(self.client, 'image', self.run_args))
+    self.__wait_for_idle(self.run_args, 2)
+    labels = self.client.containers.run.call_args[1]['labels']
+    self.assertEqual(labels, {'cirque.pool': 'image'})
+
+  def test_creation_options_use_separate_keys(self):
+    self.pool.claim(self.client, 'image', self.run_args)
+    self.__wait_for_idle(self.run_args, 2)
+    privileged_args = dict(self.run_args, privileged=True)
+    self.assertIsNone(self.pool.claim(self.client, 'image', privileged_args))
+
+  def test_per_instance_args_are_not_pooled(self):
+    run_args = dict(self.run_args, devices=['/dev/pts/3:/dev/ttyUSB0'])
+    self.assertIsNone(self.pool.claim(self.client, 'image', run_args))
+    self.assertFalse(self.pool.is_poolable(run_args))
+
+  def test_drain_by_network(self):
+    self.pool.claim(self.client, 'image', self.run_args)
+    self.__wait_for_idle(self.run_args, 2)
+    self.pool.drain(network='home_external')
+    self.assertEqual(self.pool.idle_count('image', self.run_args), 0)
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestContainerPool)
+  unittest.TextTestRunner(verbosity=2).run(suite)
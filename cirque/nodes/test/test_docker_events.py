@@ -0,0 +1,150 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import unittest
+from unittest import mock
+
+import docker
+
+from cirque.nodes import dockerevents
+from cirque.nodes.dockerevents import DockerEventWatcher
+from cirque.nodes.dockernode import DockerNode
+
+
+def inspection(status, exit_code=0, pid=42, ip='172.18.0.2'):
+  return {
+      'State': {
+          'Status': status,
+          'ExitCode': exit_code,
+          'Pid': pid
+      },
+      'NetworkSettings': {
+          'Networks': {
+              'home_external': {
+                  'IPAddress': ip
+              }
+          }
+      },
+  }
+
+
+def container_event(container_id, action, **attributes):
+  return {
+      'Type': 'container',
+      'Action': action,
+      'id': container_id,
+      'Actor': {
+          'ID': container_id,
+          'Attributes': attributes
+      },
+  }
+
+
+class FakeStream:
+
+  def __init__(self, events=(), error=None):
+    self.events = events
+    self.error = error
+    self.closed = threading.Event()
+
+  def __iter__(self):
+    yield from self.events
+    if self.error is not None:
+      raise self.error
+    # a live stream only ends when it is closed
+    self.closed.wait(5)
+
+  def close(self):
+    self.closed.set()
+
+
+class TestDockerEvents(unittest.TestCase):
+
+  def setUp(self):
+    self.client = mock.MagicMock()
+    self.client.containers.run.return_value = mock.Mock(id='c0')
+    self.client.api.inspect_container.return_value = inspection('running')
+    self.node = DockerNode(self.client, 'generic_node_image')
+    self.node.run()
+
+  def test_state_is_served_from_cache(self):
+    self.assertEqual(self.node.description, {'ipv4_addr': '172.18.0.2'})
+    self.assertEqual(self.node.get_container_pid(), 42)
+    self.assertEqual(self.client.api.inspect_container.call_count, 1)
+
+  def test_die_event_updates_state(self):
+    self.node.apply_event(container_event('c0', 'die', exitCode='137'))
+    self.assertEqual(self.node.state['status'], 'exited')
+    self.assertEqual(self.node.state['exit_code'], 137)
+
+  def test_watcher_dispatches_to_subscribed_nodes(self):
+    applied = threading.Event()
+    self.client.events.return_value = FakeStream([
+        container_event('other', 'die', exitCode='1'),
+        container_event('c0', 'die', exitCode='2'),
+    ])
+    watcher = DockerEventWatcher(self.client)
+    watcher.subscribe(self.node)
+    with mock.patch.object(
+        self.node, 'apply_event',
+        side_effect=lambda e: applied.set()) as apply:
+      watcher.start()
+      self.assertTrue(applied.wait(5))
+    watcher.stop()
+    apply.assert_called_once()
+    self.assertEqual(apply.call_args[0][0]['id'], 'c0')
+
+  def test_subscribe_resyncs_state(self):
+    # the container died while its capabilities were being enabled
+    self.client.api.inspect_container.return_value = inspection(
+        'exited', exit_code=1, pid=0)
+    watcher = DockerEventWatcher(self.client)
+    watcher.subscribe(self.node)
+    self.assertEqual(self.node.state['status'], 'exited')
+
+  def test_labelled_stream_only_has_home_containers(self):
+    self.client.events.return_value = FakeStream()
+    watcher = DockerEventWatcher(self.client, {'cirque.home_id': 'home'})
+    watcher.start()
+    watcher.stop()
+    self.client.events.assert_called_once_with(
+        decode=True,
+        filters={
+            'label': ['cirque.home_id=home'],
+            'type': ['container']
+        })
+
+  def test_dropped_stream_reconnects_and_resyncs(self):
+    resynced = threading.Event()
+    streams = [
+        FakeStream(error=docker.errors.APIError('connection reset')),
+        FakeStream()
+    ]
+    self.client.events.side_effect = lambda **_: streams.pop(0)
+    watcher = DockerEventWatcher(self.client)
+    watcher.subscribe(self.node)
+    with mock.patch.object(dockerevents, 'RECONNECT_DELAY', 0), \
+         mock.patch.object(self.node, 'refresh_state',
+                           side_effect=resynced.set):
+      watcher.start()
+      self.assertTrue(resynced.wait(5))
+      watcher.stop()
+    self.assertEqual(self.client.events.call_count, 2)
+    self.assertEqual(streams, [])
+
+
+if __name__ == '__main__':
+  suite = unittest.TestLoader().loadTestsFromTestCase(TestDockerEvents)
+  unittest.TextTestRunner(verbosity=2).run(suite)
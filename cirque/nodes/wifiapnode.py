@@ -13,21 +13,64 @@
 # limitations under the License.
 
 import os
+import shutil
+import tempfile
 import time
 import random
 
-from subprocess import PIPE
+from pyroute2 import NetlinkError
 
-import cirque.common.utils as utils
 from cirque.capabilities.wificapability import WiFiCapability
+from cirque.common.readiness import HostapdProbe, ProcessProbe
 from cirque.common.exceptions import (
     ContainerExecError,
     IpNetnsExecError,
 )
+from cirque.connectivity.netlinkhandles import NetlinkHandles
+from cirque.connectivity.subnetpool import WiFiSubnets
+from cirque.connectivity.wpactrl import HOSTAPD_CTRL
 from cirque.nodes.dockernode import DockerNode
 
-RUNTIME_NAMESPACE = "/var/run/netns"
+READY_TIMEOUT = 10
 CHAR_SRC = "ABCDEFGHIJKLMNOPQRSTUVWXYZ123456789"
+CONFIG_DIR = "/var/lib/cirque/wifiap"
+HOSTAPD_CONF = "/etc/hostapd/hostapd.conf"
+DNSMASQ_CONF = "/etc/dnsmasq.conf"
+
+HOSTAPD_TEMPLATE = """interface=wlan0
+ctrl_interface=/var/run/hostapd
+driver=nl80211
+hw_mode=g
+channel=6
+macaddr_acl=0
+ignore_broadcast_ssid=0
+auth_algs=1
+wpa=2
+wpa_key_mgmt=WPA-PSK
+rsn_pairwise=TKIP
+ssid={ssid}
+wpa_passphrase={psk}
+"""
+
+DNSMASQ_TEMPLATE = """port=0
+interface=wlan0
+bind-interfaces
+dhcp-option=3,{gateway}
+dhcp-option=6,8.8.8.8,8.8.4.4
+dhcp-range={first},{last},{netmask},12h
+no-hosts
+"""
+
+# wlan0 is only in the container once the WiFi capability is enabled, so
+# the daemons are started by a single exec right after that.
+AP_INIT = " && ".join([
+    "iptables -t nat -A POSTROUTING -o eth0 -j MASQUERADE",
+    "iptables -A FORWARD -i eth0 -o wlan0 "
+    "-m state --state RELATED,ESTABLISHED -j ACCEPT",
+    "iptables -A FORWARD -i wlan0 -o eth0 -j ACCEPT",
+    "/usr/sbin/hostapd -B {}".format(HOSTAPD_CONF),
+    "/usr/sbin/dnsmasq -C {}".format(DNSMASQ_CONF),
+])
 
 
 class WiFiAPNode(DockerNode):
@@ -37,13 +80,26 @@ class WiFiAPNode(DockerNode):
                ssid=None,
                password=None,
                container_name=None,
-               base_image="mac80211_ap_image"):
-    super().__init__(docker_client, node_type="wifi_ap", base_image=base_image)
+               base_image="mac80211_ap_image",
+               labels=None,
+               timer=None,
+               medium=None,
+               subnet=None,
+               config_dir=None):
+    super().__init__(
+        docker_client,
+        node_type="wifi_ap",
+        base_image=base_image,
+        labels=labels,
+        timer=timer)
     random.seed(time.time())
     self.ssid = ssid
     self.password = password
     self.container_name = container_name
-    self.wifi_capability = WiFiCapability()
+    self.subnet = None if subnet is None else WiFiSubnets.reserve(subnet)
+    self.config_dir = config_dir
+    with self.timings.phase("WiFiCapability.create"):
+      self.wifi_capability = WiFiCapability(medium=medium)
     self.capabilities.append(self.wifi_capability)
     if not self.ssid:
       self.ssid = self.get_wifi_ssid()
@@ -60,14 +116,19 @@ class WiFiAPNode(DockerNode):
 
   @property
   def description(self):
-    inspection = self.inspect()
-    return {"type": "wifi_ap", "ssid": self.ssid, "psk": self.password}
+    return {
+        "type": "wifi_ap",
+        "ssid": self.ssid,
+        "psk": self.password,
+        "subnet": None if self.subnet is None else str(self.subnet),
+    }
 
   def stop(self):
     if hasattr(self, "container") and self.container:
       self.__teardown()
       self.container.stop()
       del self.container
+    self.__release_config()
 
   def run(self):
     kwargs = {"stdin_open": True, "cap_add": ["NET_ADMIN"]}
@@ -75,15 +136,26 @@ class WiFiAPNode(DockerNode):
     if self.container_name:
       kwargs.update({"name": self.container_name})
 
+    with self.timings.phase("WiFiAPNode.config"):
+      kwargs.update({"volumes": self.__render_config()})
     super().run(**kwargs)
-    self.logger.info("Creating WiFi AP node: {}".format(self.name))
-    self.__setup_namespace_networking_env()
-    self.__setup_network_forward_rules()
-    self.__update_hostapd_ssid()
-    self.__update_hostapd_password()
-    self.__run_hostapd()
-    self.__run_dnsmasq()
-    utils.sleep_time(self.logger, 2, "creating WiFi AP node")
+    self.logger.info("Creating WiFi AP node: {} on {}".format(
+        self.name, self.subnet))
+    with self.timings.phase("WiFiAPNode.networking"):
+      self.__setup_namespace_networking_env()
+    with self.timings.phase("WiFiAPNode.init"):
+      self.__run_init()
+      self.wifi_capability.watch_events(self, HOSTAPD_CTRL)
+    with self.timings.phase("WiFiAPNode.wait_ready"):
+      pending = self.wait_ready(READY_TIMEOUT)
+    if pending:
+      raise ContainerExecError("WiFi AP node {} is not ready".format(
+          self.name))
+
+  def readiness_probes(self):
+    return super().readiness_probes() + [
+        HostapdProbe(), ProcessProbe("dnsmasq")
+    ]
 
   def get_wifi_ssid(self):
     return self.ssid if self.ssid else \
@@ -94,64 +166,59 @@ class WiFiAPNode(DockerNode):
     return self.password if self.password else \
         "".join(random.choice(CHAR_SRC) for _ in range(8))
 
-  def __run_hostapd(self):
-    ret = self.container.exec_run(
-        "/usr/sbin/hostapd -B /etc/hostapd/hostapd.conf")
-    if ret.exit_code != 0:
-      raise ContainerExecError("unable to start up hostapd server!!")
-
-  def __run_dnsmasq(self):
-    ret = self.container.exec_run("/usr/sbin/dnsmasq -C /etc/dnsmasq.conf")
-    if ret.exit_code != 0:
-      raise ContainerExecError("unable to start up dnsmasq server!!")
-
-  def __setup_namespace_networking_env(self):
-    network_commands = [
-        "ip addr flush dev wlan0",
-        "ip addr add 10.0.1.1/24 dev wlan0",
-    ]
-
-    for command in network_commands:
-      ret = utils.netns_run(self.logger, command, self.name)
-      if ret.returncode != 0:
-        raise IpNetnsExecError("failed to run cmd: {}\n {}".format(
-            command, ret.stderr))
-
-    ret = self.container.exec_run("route add -net 10.0.1.0/24 gw 10.0.1.1")
-    if ret.exit_code != 0:
-      raise ContainerExecError("unable to set default gw for wlan0")
-
-  def __setup_network_forward_rules(self):
-    forward_rules = [
-        "iptables -t nat -A POSTROUTING -o eth0 -j MASQUERADE",
-        "iptables -A FORWARD -i eth0 -o wlan0 -m \
-                state --state RELATED,ESTABLISHED -j ACCEPT",
-        "iptables -A FORWARD -i wlan0 -o eth0 -j ACCEPT",
+  def __render_config(self):
+    if self.subnet is None:
+      self.subnet = WiFiSubnets.allocate()
+    base = os.environ.get("CIRQUE_WIFI_AP_CONFIG_DIR", CONFIG_DIR)
+    os.makedirs(base, exist_ok=True)
+    self.config_dir = tempfile.mkdtemp(prefix="ap-", dir=base)
+    hostapd_conf = os.path.join(self.config_dir, "hostapd.conf")
+    with open(hostapd_conf, "w") as f:
+      f.write(HOSTAPD_TEMPLATE.format(ssid=self.ssid, psk=self.password))
+    dnsmasq_conf = os.path.join(self.config_dir, "dnsmasq.conf")
+    with open(dnsmasq_conf, "w") as f:
+      f.write(
+          DNSMASQ_TEMPLATE.format(
+              gateway=self.subnet[1],
+              first=self.subnet[50],
+              last=self.subnet[200],
+              netmask=self.subnet.netmask))
+    return [
+        "{}:{}:ro".format(hostapd_conf, HOSTAPD_CONF),
+        "{}:{}:ro".format(dnsmasq_conf, DNSMASQ_CONF),
     ]
 
-    for rule in forward_rules:
-      ret = self.container.exec_run(rule)
-      if ret.exit_code != 0:
-        raise ContainerExecError("unable to set forward rule: {}".format(rule))
+  def __release_config(self):
+    if self.config_dir:
+      shutil.rmtree(self.config_dir, ignore_errors=True)
+      self.config_dir = None
+    if self.subnet is not None:
+      WiFiSubnets.release(self.subnet)
+      self.subnet = None
 
-  def __update_hostapd_ssid(self):
-    ret = self.container.exec_run("sed -i 's/ssid=/ssid={}/' \
-                /etc/hostapd/hostapd.conf".format(self.ssid))
+  def __run_init(self):
+    ret = self.container.exec_run(["sh", "-c", AP_INIT])
     if ret.exit_code != 0:
-      raise ContainerExecError("failed to set wifi ap ssid: {}".format(
-          self.ssid))
+      raise ContainerExecError("unable to start up wifi ap: {}".format(
+          ret.output.decode(errors="replace").strip()))
 
-  def __update_hostapd_password(self):
-    ret = self.container.exec_run(
-        "sed -i 's/wpa_passphrase=/wpa_passphrase={}/' \
-                /etc/hostapd/hostapd.conf".format(self.password))
-    if ret.exit_code != 0:
-      raise ContainerExecError("failed to set wifi ap password: {}".format(
-          self.pasword))
+  def __setup_namespace_networking_env(self):
+    try:
+      with NetlinkHandles.ipr(self.name) as ipr:
+        index = ipr.link_lookup(ifname="wlan0")[0]
+        ipr.flush_addr(index=index)
+        ipr.addr(
+            "add",
+            index=index,
+            address=str(self.subnet[1]),
+            prefixlen=self.subnet.prefixlen)
+    except (IndexError, NetlinkError) as e:
+      raise IpNetnsExecError("failed to address wlan0: {!r}".format(e))
 
   def __teardown(self):
     self.logger.info("stopping hostapd...")
     self.container.exec_run("killall hostapd")
     self.logger.info("stopping dnsmasq...")
     self.container.exec_run("killall dnsmasq")
-    self.wifi_capability.disable_capability(self)
+    with self.timings.phase("WiFiCapability.disable"):
+      self.wifi_capability.disable_capability(self)
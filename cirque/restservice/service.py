@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
+import json
 import os
 import atexit
 
@@ -21,8 +23,18 @@ from flask import request
 from flask import Response
 
 from cirque.common.cirquelog import CirqueLog
+from cirque.common.exceptions import (AdmissionError, HomeBringupError,
+                                      NoDockerEndpointError)
 from cirque.common.taskrunner import TaskRunner
-from cirque.home.home import CirqueHome
+from cirque.common.timing import BUCKETS, Histograms
+from cirque.common.tracing import Tracer
+from cirque.connectivity.threadcapture import keep_alive
+from cirque.home.home import CirqueHome, destroy_homes as destroy_all_homes
+from cirque.home.home import restore_homes
+from cirque.home.placement import needs_local_host
+from cirque.home.registry import HomeRegistry
+from cirque.home.scheduler import Scheduler
+from cirque.nodes.containerpool import ContainerPool
 
 app = Flask(__name__)
 CirqueLog.setup_cirque_logger()
@@ -30,14 +42,88 @@ logger = CirqueLog.get_cirque_logger('service')
 
 service_mode = os.environ.get('CIRQUE_DEBUG', 0)
 
-homes = {}
+registry = HomeRegistry.open_default()
+homes = restore_homes(registry)
+
+
+def queue_timeout(args):
+  # seconds a request may wait for admission, the scheduler default if unset
+  timeout = args.get('queue_timeout')
+  return float(timeout) if timeout else None
 
 
 @app.route('/create_home', methods=['POST'])
 def create_home():
-  home = CirqueHome()
+  local = any(needs_local_host(config) for config in request.json.values())
+  try:
+    home = CirqueHome(registry=registry, local=local)
+  except NoDockerEndpointError as e:
+    logger.error('{}'.format(e))
+    return jsonify({'error': str(e)}), 503
   homes[home.home_id] = home
-  return jsonify(home.create_home(request.json))
+  priority = int(request.args.get('priority', 0))
+  try:
+    return jsonify(
+        home.create_home(
+            request.json,
+            priority=priority,
+            queue_timeout=queue_timeout(request.args)))
+  except ValueError as e:
+    homes.pop(home.home_id).destroy_home()
+    return jsonify({'error': str(e)}), 400
+  except AdmissionError as e:
+    logger.error('{}'.format(e))
+    homes.pop(home.home_id).destroy_home()
+    return jsonify({'error': str(e), 'position': e.position}), 503
+  except HomeBringupError as e:
+    # the home has already been torn down.
+    logger.error('{}'.format(e))
+    homes.pop(home.home_id, None)
+    return jsonify({'home_id': home.home_id, 'devices': e.results}), 500
+
+
+@app.route('/create_devices/<home_id>', methods=['POST'])
+def create_devices(home_id):
+  if home_id not in homes:
+    return ''
+  replicas = int(request.args.get('replicas', 1))
+  priority = int(request.args.get('priority', 0))
+  try:
+    results = homes[home_id].add_devices(
+        request.json,
+        replicas,
+        priority=priority,
+        queue_timeout=queue_timeout(request.args))
+    # admission happens before the first result, its failure still gets a
+    # status of its own.
+    first = next(results)
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
+  except AdmissionError as e:
+    return jsonify({'error': str(e), 'position': e.position}), 503
+
+  def stream_results():
+    for replica, result in itertools.chain([first], results):
+      yield json.dumps(dict(result, replica=replica)) + '\n'
+
+  return Response(stream_results(), mimetype='application/x-ndjson')
+
+
+@app.route('/queue', methods=['GET'])
+def get_queue():
+  return jsonify(Scheduler.pending())
+
+
+@app.route('/timings', methods=['GET'])
+def get_timings():
+  return jsonify({'buckets': BUCKETS, 'histograms': Histograms.snapshot()})
+
+
+@app.route('/trace/<home_id>', methods=['GET'])
+def get_trace(home_id):
+  if home_id not in homes:
+    return ''
+  return jsonify(Tracer.chrome_trace(home_id))
 
 
 @app.route('/get_homes', methods=['GET'])
@@ -50,6 +136,117 @@ def get_wifi_ssid_psk(home_id):
   return jsonify(homes[home_id].get_wifiap_ssid_psk())
 
 
+@app.route('/connect_wifi/<home_id>', methods=['POST'])
+def connect_wifi(home_id):
+  if home_id not in homes:
+    return ''
+  kwargs = {}
+  if 'timeout' in request.json:
+    kwargs['timeout'] = int(request.json['timeout'])
+  try:
+    results = homes[home_id].connect_wifi(
+        request.json.get('devices', []), request.json.get('ssid'),
+        request.json.get('psk'), **kwargs)
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
+
+  def stream_results():
+    for device_id, result in results:
+      yield json.dumps(dict(result, device_id=device_id)) + '\n'
+
+  return Response(stream_results(), mimetype='application/x-ndjson')
+
+
+@app.route('/wifi_events/<home_id>', methods=['GET'])
+def wifi_events(home_id):
+  if home_id not in homes:
+    return ''
+  home = homes[home_id]
+
+  def stream_events():
+    for event in home.wifi_events(heartbeat=1):
+      if event is None:
+        # a blank keep-alive line, writing it is how a disconnected client
+        # is noticed and its subscription removed.
+        yield '\n'
+        continue
+      yield json.dumps(event) + '\n'
+
+  return Response(stream_events(), mimetype='application/x-ndjson')
+
+
+@app.route('/thread_link/<home_id>', methods=['POST'])
+def set_thread_link(home_id):
+  if home_id not in homes:
+    return ''
+  try:
+    return jsonify(homes[home_id].set_thread_link(
+        request.json['source'], request.json['destination'],
+        request.json.get('rssi'), request.json.get('loss'),
+        request.json.get('symmetric', True)))
+  except (KeyError, ValueError) as e:
+    return jsonify({'error': str(e)}), 400
+
+
+@app.route('/thread_clock/<home_id>', methods=['POST'])
+def set_thread_clock(home_id):
+  if home_id not in homes:
+    return ''
+  try:
+    return jsonify(homes[home_id].set_thread_clock(
+        request.json.get('petition', 0), request.json.get('speed'),
+        request.json.get('paused'), request.json.get('step_ms')))
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
+
+
+@app.route('/thread_capture/<home_id>', methods=['GET'])
+def thread_capture(home_id):
+  if home_id not in homes:
+    return ''
+  nodes = request.args.get('nodes')
+  try:
+    capture = homes[home_id].capture_thread(
+        int(request.args.get('petition', 0)),
+        [int(node) for node in nodes.split(',')] if nodes else None,
+        heartbeat=1)
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
+
+  def stream_capture():
+    # writing a keep-alive is how a disconnected client is noticed, which
+    # closes the capture and removes its tap from the medium.
+    try:
+      for block in capture:
+        yield keep_alive() if block is None else block
+    finally:
+      capture.close()
+
+  return Response(stream_capture(), mimetype='application/x-pcapng')
+
+
+@app.route('/thread_recording/<home_id>', methods=['POST'])
+def thread_recording(home_id):
+  if home_id not in homes:
+    return ''
+  petition = request.json.get('petition', 0)
+  try:
+    if request.json.get('stop'):
+      return jsonify(homes[home_id].stop_thread_recording(petition))
+    kwargs = {
+        key: int(request.json[key])
+        for key in ('file_size', 'files')
+        if key in request.json
+    }
+    return jsonify({
+        'directory':
+            homes[home_id].start_thread_recording(
+                petition, request.json.get('nodes'), **kwargs)
+    })
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
+
+
 @app.route('/home_devices/<home_id>', methods=['GET'])
 def get_home_devices(home_id):
   if home_id not in homes:
@@ -78,6 +275,23 @@ def execute_device_cmd(home_id, device_id, cmd):
           }))
 
 
+@app.route('/wait_ready/<home_id>/<device_id>', methods=['GET'])
+def wait_ready(home_id, device_id):
+  if home_id not in homes:
+    return ''
+  timeout = request.args.get('timeout', None)
+  kwargs = {}
+  if timeout is not None and timeout.isdigit():
+    kwargs['timeout'] = int(timeout)
+  thread_roles = request.args.get('thread_roles')
+  if thread_roles:
+    kwargs['thread_roles'] = thread_roles.split(',')
+  try:
+    return jsonify(homes[home_id].wait_ready(device_id, **kwargs))
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
+
+
 @app.route('/stop_device/<home_id>/<device_id>', methods=['GET'])
 def stop_device(home_id, device_id):
   if home_id not in homes:
@@ -109,13 +323,11 @@ def destroy_home(home_id):
 
 @app.route('/')
 def destroy_homes():
-  global homes
   logger.info('removing all the homes..')
-  temp_homes = list(homes.keys())
-  for home_id in temp_homes:
-    homes[home_id].destroy_home()
-    del homes[home_id]
-  del homes
+  temp_homes = list(homes.values())
+  homes.clear()
+  destroy_all_homes(temp_homes)
+  ContainerPool.drain()
   return ''
 
 
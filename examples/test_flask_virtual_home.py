@@ -30,12 +30,12 @@
 #    $ python3 example/test_flask_virtual_home.py
 #
 
+import json
 import logging
 import unittest
 import os
 import re
 import requests
-import time
 
 from urllib.parse import urljoin
 
@@ -113,6 +113,12 @@ class TestFlaskVirtualHome(unittest.TestCase):
 
     for device in home_devices:
       device_types.add(device['type'])
+      readiness = requests.get(
+          urljoin(SERVICE_URL, 'wait_ready/{}/{}?timeout=30'.format(
+              home_id, device['id']))).json()
+      self.assertTrue(readiness['ready'],
+                      'device {} is not ready: {}'.format(
+                          device['id'], readiness['pending']))
 
     self.logger.info('\ncreated device types: {}'.format(device_types))
 
@@ -139,7 +145,15 @@ class TestFlaskVirtualHome(unittest.TestCase):
                              ot-ctl thread start'", False)),
           stream=False)
     self.logger.info('Waiting for Thread network to be formed...')
-    time.sleep(10)
+    for device_id in device_ids:
+      readiness = requests.get(
+          urljoin(
+              SERVICE_URL,
+              'wait_ready/{}/{}?timeout=30&thread_roles={}'.format(
+                  home_id, device_id, 'leader,router,child'))).json()
+      self.assertTrue(readiness['ready'],
+                      'device {} did not attach: {}'.format(
+                          device_id, readiness['pending']))
     roles = set()
     for device_id in device_ids:
       reply = requests.get(
@@ -193,11 +207,6 @@ class TestFlaskVirtualHome(unittest.TestCase):
 
     home_id = list(requests.get(urljoin(SERVICE_URL, 'get_homes')).json())[0]
 
-    ssid, psk = requests.get(
-        urljoin(SERVICE_URL, 'wifi_ssid_psk/{}'.format(home_id))).json()
-
-    self.logger.info('\nwifi ap ssid: {}, psk: {}'.format(ssid, psk))
-
     home_devices = requests.get(
         urljoin(SERVICE_URL,
                 'home_devices/{}'.format(home_id))).json().values()
@@ -206,58 +215,28 @@ class TestFlaskVirtualHome(unittest.TestCase):
         device['id'] for device in home_devices if device['type'] != 'wifi_ap'
     ]
 
-    for device_id in device_ids:
-      self.logger.info('\ndevice: {}\n connecting to desired ssid: {}'.format(
-          device_id, ssid))
-      ret = write_psk_to_wpa_supplicant_config(self.logger, home_id, device_id,
-                                               ssid, psk)
-      self.assertEqual(ret['return_code'], '0',
-                       'failed writing ssid, psk to wpa_supplicant config!!')
-
-      ret = kill_existing_wpa_supplicant(self.logger, home_id, device_id)
-      self.assertEqual(ret['return_code'], '0',
-                       'failed kill existing wpa_supplicant')
-
-      ret = start_wpa_supplicant(self.logger, home_id, device_id)
-      self.assertEqual(ret['return_code'], '0',
-                       'unable to start wpa_supplicant!!')
-    time.sleep(5)
+    # every station joins the ap of the home at once, each result comes
+    # back once its station associated and got a dhcp lease.
+    ret = requests.post(
+        urljoin(SERVICE_URL, 'connect_wifi/{}'.format(home_id)),
+        json={'devices': device_ids},
+        stream=True)
+    TestFlaskVirtualHome.dev_addrs = list()
+    for line in ret.iter_lines():
+      result = json.loads(line)
+      self.assertNotIn('error', result,
+                       'device: {} failed to join wifi!!'.format(
+                           result['device_id']))
+      self.logger.info('\ndevice: {}\nip address leased: {}'.format(
+          result['device_id'], result['ipv4_addr']))
+      TestFlaskVirtualHome.dev_addrs.append(
+          (result['device_id'], result['ipv4_addr']))
+    self.assertEqual(len(self.dev_addrs), len(device_ids))
 
   def test_006_device_connectivity(self):
 
     home_id = list(requests.get(urljoin(SERVICE_URL, 'get_homes')).json())[0]
-
-    home_devices = requests.get(
-        urljoin(SERVICE_URL,
-                'home_devices/{}'.format(home_id))).json().values()
-
-    device_ids = [
-        device['id'] for device in home_devices if device['type'] != 'wifi_ap'
-    ]
-
-    dev_addrs = list()
-    request_addr_command = 'dhcpcd wlan0'
-
-    for device_id in device_ids:
-      self.logger.info(
-          '\nrequesting ip address from wifi ap by\ndevice:{}'.format(
-              device_id))
-      ret = requests.get(
-          urljoin(
-              SERVICE_URL,
-              'device_cmd/{}/{}/{}?stream={}'.format(home_id, device_id,
-                                                     request_addr_command,
-                                                     False)),
-          stream=False).json()
-      self.assertEqual(ret['return_code'], '0',
-                       'unable to request ip address from wifi ap')
-      ipaddr = re.search(
-          r'wlan0: leased (\d+\.\d+\.\d+\.\d+) for (\d+) seconds',
-          ret['output']).group(1)
-
-      self.logger.info('\nip address requested: {}'.format(ipaddr))
-
-      dev_addrs.append((device_id, ipaddr))
+    dev_addrs = self.dev_addrs
 
     self.logger.info('\npinging from device: {} to\ndevice: {}'.format(
         dev_addrs[0][0], dev_addrs[1][0]))
@@ -279,60 +258,6 @@ class TestFlaskVirtualHome(unittest.TestCase):
     self.logger.info('ping loss rate: {}%'.format(loss))
 
 
-def start_wpa_supplicant(logger, home_id, device_id):
-
-  logger.info(
-      '\ndevice id: {}\nstarting wpa_supplicant on device'.format(device_id))
-
-  start_wpa_supplicant_command = ''.join([
-      'wpa_supplicant -B -i wlan0 ',
-      '-c /etc/wpa_supplicant/wpa_supplicant.conf ',
-      '-f /var/log/wpa_supplicant.log -t -dd'
-  ])
-
-  return requests.get(
-      urljoin(
-          SERVICE_URL,
-          'device_cmd/{}/{}/{}?stream={}'.format(home_id, device_id,
-                                                 start_wpa_supplicant_command,
-                                                 False)),
-      stream=False).json()
-
-
-def write_psk_to_wpa_supplicant_config(logger, home_id, device_id, ssid, psk):
-
-  logger.info(
-      '\ndevice id: {}\nwriting ssid, psk to wpa_supplicant config'.format(
-          device_id))
-
-  write_psk_command = ''.join([
-      "sh -c 'wpa_passphrase {} {} >> ".format(ssid, psk),
-      "/etc/wpa_supplicant/wpa_supplicant.conf'"
-  ])
-
-  return requests.get(
-      urljoin(
-          SERVICE_URL,
-          'device_cmd/{}/{}/{}?stream={}'.format(home_id, device_id,
-                                                 write_psk_command, False)),
-      stream=False).json()
-
-
-def kill_existing_wpa_supplicant(logger, home_id, device_id):
-
-  logger.info('\ndevice id: {}\nkill existing wpa_supplicant'.format(device_id))
-
-  kill_wpa_supplicant_command = 'killall wpa_supplicant'
-
-  return requests.get(
-      urljoin(
-          SERVICE_URL,
-          'device_cmd/{}/{}/{}?stream={}'.format(home_id, device_id,
-                                                 kill_wpa_supplicant_command,
-                                                 False)),
-      stream=False).json()
-
-
 if __name__ == '__main__':
   suite = unittest.TestLoader().loadTestsFromTestCase(TestFlaskVirtualHome)
   unittest.TextTestRunner(verbosity=2).run(suite)
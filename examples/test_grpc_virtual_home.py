@@ -120,7 +120,8 @@ class TestGrpcVirtualHome(unittest.TestCase):
 
   def test_001_create_home(self):
     home_id = self.stub.CreateCirqueHome(
-        service_pb2.CreateCirqueHomeRequest()).home_id
+        service_pb2.CreateCirqueHomeRequest(
+            local_endpoint=True)).home_id
 
     self.logger.info('\nhome id: {} created!'.format(home_id))
 
@@ -146,6 +147,14 @@ class TestGrpcVirtualHome(unittest.TestCase):
 
       device_ids.add(device_id)
 
+    for device_id in device_ids:
+      readiness = self.stub.WaitCirqueDeviceReady(
+          service_pb2.WaitCirqueDeviceReadyRequest(
+              home_id=home_id, device_id=device_id, timeout_sec=30))
+      self.assertTrue(readiness.ready,
+                      'device {} is not ready: {}'.format(
+                          device_id, readiness.pending_probes))
+
     self.logger.info('\ncreated device ids:')
     list(map(print, device_ids))
 
@@ -177,7 +186,16 @@ class TestGrpcVirtualHome(unittest.TestCase):
                              ot-ctl ifconfig up && \
                              ot-ctl thread start'"))
     self.logger.info('Waiting for Thread network to be formed...')
-    time.sleep(10)
+    for device in devices:
+      readiness = self.stub.WaitCirqueDeviceReady(
+          service_pb2.WaitCirqueDeviceReadyRequest(
+              home_id=home_id,
+              device_id=device.device_id,
+              timeout_sec=30,
+              thread_roles=['leader', 'router', 'child']))
+      self.assertTrue(readiness.ready,
+                      'device {} did not attach: {}'.format(
+                          device.device_id, readiness.pending_probes))
     roles = set()
     for device in devices:
       reply = self.stub.ExecuteDeviceCommand(
@@ -128,9 +128,30 @@ function run_unit_tests() {
   echo "running unit tests.."
   source "${VENV}"/bin/activate
   export PATH="${PATH}":"${OPENTHREAD_DIR}"/output/x86_64-unknown-linux-gnu/bin/
+  python3 cirque/capabilities/test/test_bluetooth_capability.py
   python3 cirque/capabilities/test/test_mount_capability.py
   python3 cirque/capabilities/test/test_trafficcontrol_capability.py
   python3 cirque/capabilities/test/test_xvnc_capability.py
+  python3 cirque/common/test/test_readiness.py
+  python3 cirque/common/test/test_timing.py
+  python3 cirque/common/test/test_tracing.py
+  python3 cirque/connectivity/test/test_netfilter.py
+  python3 cirque/connectivity/test/test_hwsim.py
+  python3 cirque/connectivity/test/test_netlink_handles.py
+  python3 cirque/connectivity/test/test_wifi_events.py
+  python3 cirque/connectivity/test/test_subnet_pool.py
+  python3 cirque/connectivity/test/test_ptypair.py
+  python3 cirque/connectivity/test/test_radio_medium.py
+  python3 cirque/connectivity/test/test_thread_allocator.py
+  python3 cirque/connectivity/test/test_thread_capture.py
+  python3 cirque/connectivity/test/test_bluetooth_host.py
+  python3 cirque/home/test/test_bringup.py
+  python3 cirque/home/test/test_placement.py
+  python3 cirque/home/test/test_add_devices.py
+  python3 cirque/home/test/test_registry.py
+  python3 cirque/home/test/test_scheduler.py
+  python3 cirque/nodes/test/test_container_pool.py
+  python3 cirque/nodes/test/test_docker_events.py
   # python3 cirque/capabilities/test/test_wifi_capability.py
   # python3 cirque/home/test/test_home.py
   deactivate